@@ -0,0 +1,221 @@
+# agents/analytics_agent.py
+
+import asyncio
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from master_store import STORE_PATH, MasterStore
+from startup import timed
+
+# === Columns the engine keeps in memory (float32 unless noted) ===
+METRICS = {
+    "delay_probability": ["delay", "delayed", "late"],
+    "driver_fatigue": ["fatigue", "fatigued", "tired", "drowsy"],  # 1 - fatigue_monitoring_score
+    "fuel_consumption_rate": ["fuel", "diesel"],
+    "shipping_costs": ["cost", "costs", "expensive", "spend"],
+    "traffic_congestion_level": ["traffic"],
+    "port_congestion_level": ["port"],
+    "route_risk_level": ["route risk", "risky", "riskiest", "dangerous"],
+    "disruption_likelihood_score": ["disruption"],
+    "customs_clearance_time": ["customs"],
+    "lead_time_days": ["lead time"],
+    "weather_condition_severity": ["weather", "storm"],
+    "warehouse_inventory_level": ["inventory", "stock"],
+    "historical_demand": ["demand"],
+    "eta_variation_hours": ["eta"],
+}
+SOURCE_COLUMNS = [m for m in METRICS if m != "driver_fatigue"] + ["fatigue_monitoring_score"]
+RISK_CLASSES = {"high": "High Risk", "moderate": "Moderate Risk", "low": "Low Risk"}
+GROUP_KEYS = {"risk": "risk_classification", "month": "month"}
+DEFAULT_TOP_N = 5
+MAX_TOP_N = 50
+
+
+class AnalyticsPlan:
+    def __init__(self, kind: str, metric: str = "delay_probability", top_n: int = DEFAULT_TOP_N,
+                 ascending: bool = False, risk: str | None = None, group_by: str | None = None):
+        self.kind = kind          # "top_n" | "group_by" | "drivers"
+        self.metric = metric
+        self.top_n = top_n
+        self.ascending = ascending
+        self.risk = risk
+        self.group_by = group_by
+
+    def __repr__(self):
+        return f"AnalyticsPlan({self.__dict__})"
+
+
+class AnalyticsResult:
+    def __init__(self, plan: AnalyticsPlan, description: str, table: pd.DataFrame, doc_ids: list[str] | None = None):
+        self.plan = plan
+        self.description = description
+        self.table = table
+        self.doc_ids = doc_ids or []
+
+    def to_text(self) -> str:
+        """Compact rendering handed to the reasoning LLM instead of raw summaries."""
+        return f"{self.description}\n{self.table.to_string(index=False, float_format=lambda v: f'{v:.3g}')}"
+
+
+def _metric_for(text: str, default: str = "delay_probability") -> str:
+    for metric, words in METRICS.items():
+        if any(re.search(rf"\b{re.escape(w)}\b", text) for w in words):
+            return metric
+    return default
+
+
+def parse_query(query: str) -> AnalyticsPlan | None:
+    """
+    Recognizes aggregate / top-N questions; returns None for anything else (semantic search).
+    """
+    q = query.lower()
+    risk = next((label for word, label in RISK_CLASSES.items() if re.search(rf"\b{word}[- ]risk\b", q)), None)
+
+    if re.search(r"\b(reasons?|causes?|drivers?|factors?|why)\b.*\bdelay", q) or re.search(r"\bwhat drives\b", q):
+        return AnalyticsPlan("drivers", risk=risk)
+
+    group = re.search(r"\b(?:by|per)\s+(risk|month)\b", q)
+    if group and re.search(r"\b(average|avg|mean|count|how many|breakdown|total)\b", q):
+        return AnalyticsPlan("group_by", metric=_metric_for(q), group_by=GROUP_KEYS[group.group(1)], risk=risk)
+
+    top = re.search(r"\b(top|highest|worst|most|lowest|least|bottom)\b\s*(\d+)?", q)
+    if top and re.search(r"\b(shipments?|records?|rows?|routes?|trips?|deliveries)\b", q):
+        n = min(int(top.group(2) or DEFAULT_TOP_N), MAX_TOP_N)
+        ascending = top.group(1) in ("lowest", "least", "bottom")
+        return AnalyticsPlan("top_n", metric=_metric_for(q), top_n=n, ascending=ascending, risk=risk)
+    return None
+
+
+class AnalyticsEngine:
+    """
+    Columnar, in-memory copy of the master telemetry (numpy arrays) for exact
+    filtered top-N, group-by and correlation queries over the whole dataset.
+    """
+
+    def __init__(self, frame: pd.DataFrame, store: MasterStore | None = None, version: int = 0):
+        self.store = store
+        self.version = version
+
+        self.doc_ids = frame["doc_id"].to_numpy(dtype=object)
+        self.risk = pd.Categorical(frame["risk_classification"])
+        self.month = pd.Categorical(pd.to_datetime(frame["timestamp"], errors="coerce").dt.strftime("%Y-%m"))
+        self.columns = {c: frame[c].to_numpy(dtype=np.float32) for c in SOURCE_COLUMNS}
+        self.columns["driver_fatigue"] = 1 - self.columns.pop("fatigue_monitoring_score")
+
+        # Correlation with delay doesn't change until the next ingest: compute it once
+        self.delay_drivers = self._correlations("delay_probability")
+
+    @classmethod
+    def from_store(cls, store: MasterStore) -> "AnalyticsEngine":
+        version = store.version
+        frame = store.read(columns=["doc_id", "timestamp", "risk_classification", *SOURCE_COLUMNS])
+        return cls(frame, store, version)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _correlations(self, target: str) -> pd.DataFrame:
+        names = [c for c in self.columns if c != target]
+        if len(self) < 2:
+            return pd.DataFrame(columns=["factor", "correlation"])
+        y = self.columns[target].astype(np.float64)
+        valid = ~np.isnan(y)
+        corr = []
+        for name in names:
+            x = self.columns[name].astype(np.float64)
+            mask = valid & ~np.isnan(x)
+            corr.append(np.corrcoef(x[mask], y[mask])[0, 1] if mask.sum() > 1 else np.nan)
+        table = pd.DataFrame({"factor": names, "correlation": corr})
+        return table.reindex(table["correlation"].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+    def _risk_mask(self, risk: str | None) -> np.ndarray | None:
+        if risk is None:
+            return None
+        return np.asarray(self.risk == risk)
+
+    def run(self, plan: AnalyticsPlan) -> AnalyticsResult:
+        if plan.kind == "drivers":
+            top = self.delay_drivers.head(DEFAULT_TOP_N)
+            return AnalyticsResult(plan, f"Strongest correlates of delay_probability across {len(self):,} shipments:", top)
+
+        mask = self._risk_mask(plan.risk)
+        scope = f" among {plan.risk} shipments" if plan.risk else ""
+        values = self.columns[plan.metric]
+
+        if plan.kind == "group_by":
+            keys = self.risk if plan.group_by == "risk_classification" else self.month
+            frame = pd.DataFrame({plan.group_by: keys, plan.metric: values})
+            if mask is not None:
+                frame = frame[mask]
+            table = frame.groupby(plan.group_by, observed=True)[plan.metric].agg(["count", "mean"]).reset_index()
+            return AnalyticsResult(plan, f"{plan.metric} by {plan.group_by}{scope}:", table)
+
+        # top_n: argpartition over the (filtered) column, then sort only the N winners
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(values))
+        candidates = candidates[~np.isnan(values[candidates])]
+        scores = values[candidates] if plan.ascending else -values[candidates]
+        n = min(plan.top_n, len(candidates))
+        if n == 0:
+            return AnalyticsResult(plan, f"No shipments found{scope}.", pd.DataFrame())
+        best = np.argpartition(scores, n - 1)[:n]
+        best = candidates[best[np.argsort(scores[best])]]
+
+        ids = self.doc_ids[best].tolist()
+        table = pd.DataFrame({
+            "doc_id": ids,
+            "risk_classification": np.asarray(self.risk[best]),
+            plan.metric: values[best],
+        })
+        order = "lowest" if plan.ascending else "highest"
+        return AnalyticsResult(plan, f"Top {n} shipments by {order} {plan.metric}{scope}:", table, doc_ids=ids)
+
+    def documents(self, result: AnalyticsResult) -> list[dict]:
+        """Retriever-shaped documents (ID + summary) for the shipments a top-N result points at."""
+        if not result.doc_ids or self.store is None:
+            return []
+        rows = self.store.fetch(result.doc_ids, columns=["doc_id", "summary"])
+        return [{"id": i, "summary": s} for i, s in zip(rows["doc_id"], rows["summary"])]
+
+
+# === Engine lifecycle: built on first use, rebuilt when the master store changes ===
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AnalyticsEngine:
+    global _engine
+    with _engine_lock:
+        store = _engine.store if _engine is not None else MasterStore(STORE_PATH)
+        if _engine is None or _engine.version != store.version:
+            with timed("analytics_engine"):
+                start = time.perf_counter()
+                _engine = AnalyticsEngine.from_store(store)
+                print(f"📊 Analytics engine loaded {len(_engine):,} rows in {time.perf_counter() - start:.2f}s")
+    return _engine
+
+
+def run_analytics(query: str) -> AnalyticsResult | None:
+    plan = parse_query(query)
+    if plan is None:
+        return None
+    engine = get_engine()
+    if not len(engine):
+        return None
+    return engine.run(plan)
+
+
+def answer_with_analytics(query: str) -> dict | None:
+    """
+    Graph entry point: {"documents": [...], "analytics": text} for analytic questions, else None.
+    """
+    result = run_analytics(query)
+    if result is None:
+        return None
+    return {"documents": get_engine().documents(result), "analytics": result.to_text()}
+
+
+async def aanswer_with_analytics(query: str) -> dict | None:
+    return await asyncio.to_thread(answer_with_analytics, query)
@@ -0,0 +1,174 @@
+# agents/context_builder.py
+
+import math
+import re
+
+import pandas as pd
+
+from config import CONTEXT_DEDUP_THRESHOLD, CONTEXT_MODE, CONTEXT_TOKEN_BUDGET
+from agents.retriever_agent import fetch_records
+from summaries import classify_column
+
+# Compact rendering: one table row per shipment, with the same facts the summary prose states.
+# header -> (column, kind): "level" = low/moderate/high bucket (as in summaries.py), "inv_level"
+# buckets 1 - value (fatigue), "num<d>" = number rounded to d decimals, "time" / "risk" = shortened text.
+TABLE_FIELDS = {
+    "time": ("timestamp", "time"),
+    "lat": ("vehicle_gps_latitude", "num2"),
+    "lon": ("vehicle_gps_longitude", "num2"),
+    "delay_p": ("delay_probability", "num2"),
+    "risk": ("risk_classification", "risk"),
+    "traffic": ("traffic_congestion_level", "level"),
+    "fuel": ("fuel_consumption_rate", "level"),
+    "fatigue": ("fatigue_monitoring_score", "inv_level"),
+    "supplier": ("supplier_reliability_score", "level"),
+    "inventory": ("warehouse_inventory_level", "level"),
+    "cost": ("shipping_costs", "level"),
+    "weather": ("weather_condition_severity", "level"),
+    "customs_h": ("customs_clearance_time", "num1"),
+    "port": ("port_congestion_level", "level"),
+    "route_risk": ("route_risk_level", "level"),
+    "driver": ("driver_behavior_score", "level"),
+    "temp_c": ("iot_temperature", "num1"),
+    "demand": ("historical_demand", "num0"),
+    "lead_d": ("lead_time_days", "num1"),
+    "fulfil": ("order_fulfillment_status", "level"),
+    "disrupt": ("disruption_likelihood_score", "level"),
+    "cargo": ("cargo_condition_status", "level"),
+    "equip": ("handling_equipment_availability", "level"),
+    "loading": ("loading_unloading_time", "level"),
+}
+CONTEXT_COLUMNS = list(dict.fromkeys(column for column, _ in TABLE_FIELDS.values()))
+IDENTITY_FIELDS = ["time", "lat", "lon"]  # ignored when looking for near-duplicates
+LEGEND = "Levels: L=low, M=moderate, H=high, ?=unknown."
+SHINGLE = 3  # words per shingle for near-duplicate prose
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token (what BPE tokenizers average on English prose and tables)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+# === Near-duplicates ===
+def _shingles(text: str) -> set:
+    words = re.findall(r"[\w.]+", text.lower())
+    return {" ".join(words[i:i + SHINGLE]) for i in range(max(1, len(words) - SHINGLE + 1))}
+
+
+def dedupe_texts(texts: list[str], threshold: float = CONTEXT_DEDUP_THRESHOLD) -> tuple[list[int], int]:
+    """
+    Indexes of the texts to keep (first occurrence wins) and how many were dropped because
+    their word-shingle Jaccard similarity to a kept text reached `threshold`.
+    """
+    kept, kept_shingles = [], []
+    for i, text in enumerate(texts):
+        s = _shingles(text)
+        if any(len(s & k) / max(1, len(s | k)) >= threshold for k in kept_shingles):
+            continue
+        kept.append(i)
+        kept_shingles.append(s)
+    return kept, len(texts) - len(kept)
+
+
+# === Table rendering ===
+def _cells(df: pd.DataFrame) -> pd.DataFrame:
+    out = {}
+    for header, (column, kind) in TABLE_FIELDS.items():
+        if column not in df:
+            out[header] = "?"
+            continue
+        values = df[column]
+        if kind in ("level", "inv_level"):
+            numeric = pd.to_numeric(values, errors="coerce")
+            labels = classify_column(1 - numeric if kind == "inv_level" else numeric)
+            out[header] = [label[0].upper() if label != "unknown" else "?" for label in labels]
+        elif kind.startswith("num"):
+            numeric = pd.to_numeric(values, errors="coerce").round(int(kind[3:]))
+            out[header] = [("?" if pd.isna(v) else f"{v:.{kind[3:]}f}") for v in numeric]
+        elif kind == "time":
+            out[header] = pd.to_datetime(values, errors="coerce").dt.strftime("%Y-%m-%d %H:%M").fillna("?").tolist()
+        else:  # risk: "High Risk" -> "High"
+            out[header] = values.astype(str).str.replace(" Risk", "", regex=False).tolist()
+    return pd.DataFrame(out, index=df.index)
+
+
+def _aggregate(df: pd.DataFrame, shown: int) -> str:
+    """One line over every retrieved row (including the ones the budget left out of the table)."""
+    parts = [f"All {len(df)} retrieved shipments ({len(df) - shown} not listed):"]
+    if "delay_probability" in df:
+        parts.append(f"mean delay_p {pd.to_numeric(df['delay_probability'], errors='coerce').mean():.2f}")
+    if "risk_classification" in df:
+        counts = df["risk_classification"].astype(str).str.replace(" Risk", "", regex=False).value_counts()
+        parts.append("risk " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    if "fatigue_monitoring_score" in df:
+        high = (classify_column(1 - pd.to_numeric(df["fatigue_monitoring_score"], errors="coerce")) == "high").mean()
+        parts.append(f"high fatigue {high:.0%}")
+    return f"{parts[0]} {'; '.join(parts[1:])}."
+
+
+def render_table(rows: list[dict], budget: int, dedupe: bool = True) -> tuple[str, dict]:
+    """Pipe table of `rows` (most relevant first) cut to `budget` tokens, plus an aggregate line if cut."""
+    df = pd.DataFrame(rows)
+    cells = _cells(df)
+    duplicates = 0
+    if dedupe:
+        profile = cells.drop(columns=IDENTITY_FIELDS)
+        keep = ~profile.duplicated(keep="first")
+        duplicates = int((~keep).sum())
+        cells = cells[keep]
+
+    header = " | ".join(TABLE_FIELDS)
+    lines = [LEGEND, header]
+    used = estimate_tokens("\n".join(lines))
+    reserve = estimate_tokens(_aggregate(df, 0)) if len(cells) > 1 else 0
+    shown = 0
+    for row in cells.itertuples(index=False):
+        line = " | ".join(row)
+        cost = estimate_tokens(line) + 1
+        # Always keep the best hit; stop before the aggregate line no longer fits
+        if shown and used + cost + reserve > budget:
+            break
+        lines.append(line)
+        used += cost
+        shown += 1
+    if shown < len(cells):
+        lines.append(_aggregate(df, shown))
+    return "\n".join(lines), {"docs_used": shown, "duplicates": duplicates}
+
+
+def render_texts(texts: list[str], budget: int, dedupe: bool = True) -> tuple[str, dict]:
+    """Texts (most relevant first) as they are, minus near-duplicates, cut to `budget` tokens (the first always stays)."""
+    keep, duplicates = dedupe_texts(texts) if dedupe else (list(range(len(texts))), 0)
+    lines, used = [], 0
+    for i in keep:
+        cost = estimate_tokens(texts[i]) + 1
+        if lines and used + cost > budget:
+            break
+        lines.append(texts[i])
+        used += cost
+    return "\n".join(lines), {"docs_used": len(lines), "duplicates": duplicates}
+
+
+# === Entry point ===
+def build_context(documents: list, budget: int = CONTEXT_TOKEN_BUDGET, mode: str = CONTEXT_MODE,
+                  rows: list[dict] | None = None) -> tuple[str, dict]:
+    """
+    Renders retrieved `documents` ({"id", "summary"} dicts, most relevant first) or plain
+    strings (e.g. an analytics table) for the reasoning prompt within `budget` tokens.
+
+    mode "table": key fields of each row from the master store (or `rows`, same order) as a
+    compact table; "summaries": the summary prose. Near-duplicates are dropped in both.
+    Returns (text, stats) with docs_in / docs_used / duplicates / tokens.
+    """
+    texts = [doc.get("summary", "") if isinstance(doc, dict) else str(doc) for doc in documents]
+    ids = [doc.get("id") for doc in documents if isinstance(doc, dict) and doc.get("id")]
+
+    if mode == "table" and ids and len(ids) == len(documents):
+        rows = rows if rows is not None else fetch_records(ids, CONTEXT_COLUMNS)
+        if rows:
+            text, stats = render_table(rows, budget)
+        else:  # rows not in the master store (e.g. stale index): fall back to the prose
+            text, stats = render_texts(texts, budget)
+    else:
+        text, stats = render_texts(texts, budget)
+    return text, {"docs_in": len(documents), **stats, "tokens": estimate_tokens(text)}
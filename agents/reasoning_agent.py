@@ -1,43 +1,155 @@
-import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+import asyncio
+import contextlib
+import threading
 from langchain_core.prompts import PromptTemplate
 
-load_dotenv()
+from answer_cache import get_answer_cache
+from config import CONTEXT_MODE, LLM_BASE_URL, LLM_MAX_RETRIES, LLM_MODEL, LLM_TIMEOUT_SECONDS, OPENROUTER_API_KEY
+from agents.context_builder import build_context, dedupe_texts
+from agents.retriever_agent import aencode_query, encode_query
+import deadline
+import metrics
+from startup import timed
 
-# ✅ Use OpenRouter key (set in .env)
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",  # or another supported by OpenRouter
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1"
-)
+# Bump whenever reasoning_prompt (or how documents are rendered into it) changes: keys the answer cache
+PROMPT_VERSION = f"v2-{CONTEXT_MODE}"
+FALLBACK_RECORDS = 3  # summaries quoted by the extractive answer
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+# ✅ Use OpenRouter key (set in .env); client is built on first use
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                with timed("reasoning_llm"):
+                    from langchain_openai import ChatOpenAI
+                    _llm = ChatOpenAI(
+                        model=LLM_MODEL,  # or another supported by OpenRouter
+                        api_key=OPENROUTER_API_KEY,
+                        base_url=LLM_BASE_URL,
+                        timeout=LLM_TIMEOUT_SECONDS,
+                        max_retries=LLM_MAX_RETRIES,
+                    )
+    return _llm
 
 # 🧠 Reasoning Prompt
 reasoning_prompt = PromptTemplate.from_template("""
 You are a reasoning expert analyzing logistics documents.
-Given the user query and the following summaries, generate a brief, concise answer using the most relevant information.
+Given the user query and the following shipment records (most relevant first), generate a brief, concise answer using the most relevant information.
 
 User Query: {query}
 
-Relevant Document Summaries:
+Relevant Records:
 {documents}
 
 Your Answer:
 """)
 
+def build_prompt(query: str, documents: list) -> str:
+    # Budgeted, deduplicated context (compact table by default, see context_builder.py)
+    context, _ = build_context(documents)
+    return reasoning_prompt.format(query=query, documents=context)
+
+
+async def abuild_prompt(query: str, documents: list) -> str:
+    # Table mode reads the master store: keep that off the event loop
+    return await asyncio.to_thread(build_prompt, query, documents)
+
+
+def extractive_answer(documents: list) -> str:
+    """
+    Answer built without the LLM, for when it times out or fails: the analytics table as
+    is, else the most relevant (deduplicated) record summaries. Never cached.
+    """
+    note = "The language model did not answer within the time budget, so here is what the data shows"
+    texts = [doc.get("summary", "") if isinstance(doc, dict) else str(doc) for doc in documents]
+    if not texts:
+        return f"{note}: no matching records were found."
+    if not isinstance(documents[0], dict):
+        return f"{note}:\n" + "\n".join(texts)
+    keep, _ = dedupe_texts(texts)
+    top = [texts[i] for i in keep[:FALLBACK_RECORDS]]
+    return f"{note} (the {len(top)} most relevant of {len(texts)} records):\n" + "\n".join(f"- {t}" for t in top)
+
+
 def analyze_documents(query: str, documents: list) -> str:
     """
     Accepts a list of document strings or dicts and returns an LLM-generated summary.
+    Repeated (or near-identical) questions over the same documents are served from the answer cache.
+    """
+    cache = get_answer_cache()
+    embedding = encode_query(query)
+    cached = cache.get_answer(query, documents, PROMPT_VERSION, embedding)
+    if cached is not None:
+        return cached
+
+    prompt = build_prompt(query, documents)
+    try:
+        with metrics.stage("reasoning_llm"):
+            response = deadline.call("reasoning_llm", lambda: get_llm().invoke(prompt))
+    except Exception as e:
+        deadline.degrade(f"reasoning LLM ({type(e).__name__}), extractive answer")
+        return extractive_answer(documents)
+    answer = response.content.strip()
+    cache.put_answer(query, documents, PROMPT_VERSION, answer, embedding)
+    return answer
+
+
+async def aanalyze_documents(query: str, documents: list) -> str:
     """
+    Async variant of `analyze_documents` (does not block the event loop).
+    """
+    cache = get_answer_cache()
+    embedding = await aencode_query(query)
+    cached = cache.get_answer(query, documents, PROMPT_VERSION, embedding)
+    if cached is not None:
+        return cached
+
+    prompt = await abuild_prompt(query, documents)
+    try:
+        with metrics.stage("reasoning_llm"):
+            response = await deadline.acall("reasoning_llm", lambda: get_llm().ainvoke(prompt))
+    except Exception as e:
+        deadline.degrade(f"reasoning LLM ({type(e).__name__}), extractive answer")
+        return extractive_answer(documents)
+    answer = response.content.strip()
+    cache.put_answer(query, documents, PROMPT_VERSION, answer, embedding)
+    return answer
+
 
-    # Normalize: extract string if document is a dict with 'document' key
-    normalized_docs = []
-    for doc in documents:
-        if isinstance(doc, dict) and "document" in doc:
-            normalized_docs.append(str(doc["document"]))
-        else:
-            normalized_docs.append(str(doc))
+async def astream_analysis(query: str, documents: list):
+    """
+    Streams the answer token by token as the LLM produces it (a cached answer arrives as one chunk).
+    Each chunk must arrive within the call timeout / request budget: with no tokens yet the
+    extractive answer is sent instead, otherwise the partial answer is cut off (neither is cached).
+    """
+    cache = get_answer_cache()
+    embedding = await aencode_query(query)
+    cached = cache.get_answer(query, documents, PROMPT_VERSION, embedding)
+    if cached is not None:
+        yield cached
+        return
 
-    joined_docs = "\n".join(normalized_docs[:5])  # Limit to top 5 for reasoning
-    response = llm.invoke(reasoning_prompt.format(query=query, documents=joined_docs))
-    return response.content.strip()
+    parts = []
+    stream = get_llm().astream(await abuild_prompt(query, documents)).__aiter__()
+    with metrics.stage("reasoning_llm"):  # includes time the consumer spends between tokens
+        while True:
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), deadline.call_timeout())
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                deadline.degrade(f"reasoning LLM stream ({type(e).__name__}), "
+                                 f"{'cut off' if parts else 'extractive answer'}")
+                with contextlib.suppress(Exception):
+                    await stream.aclose()
+                yield " …" if parts else extractive_answer(documents)
+                return
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+    cache.put_answer(query, documents, PROMPT_VERSION, "".join(parts).strip(), embedding)
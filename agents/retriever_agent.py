@@ -1,58 +1,202 @@
-import os
-from chromadb import PersistentClient
-from sentence_transformers import SentenceTransformer
-from dotenv import load_dotenv
+import asyncio
+import contextvars
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-load_dotenv()
+import pandas as pd
+
+from config import EMBEDDING_MODEL, ENCODE_WORKERS, QUERY_EMBEDDING_CACHE_SIZE, RECORD_COLUMNS, VECTOR_BACKEND
+import metrics
+from startup import timed
+from time_range import months_between, parse_time_range
+
+# === Lazily initialized resources (see get_model / get_backend) ===
+_model = None
+_backend = None
+_store = None
+_model_lock = threading.Lock()
+_backend_lock = threading.Lock()
+_store_lock = threading.Lock()
+
+# Query text -> embedding (LRU): routing, retrieval and the answer cache all encode the same query
+_query_embeddings: OrderedDict = OrderedDict()
+_query_embeddings_lock = threading.Lock()
+
+# Dedicated, bounded pool for CPU-bound encoding + vector search from async callers
+_executor = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="retriever")
 
-# === Config ===
-CHROMA_PATH = "/Users/shivanshusoni/Desktop/Bhawna/logisense/chroma_store"
-COLLECTION_NAME = "telemetry_docs"
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 # === Load SentenceTransformer Model ===
-model = SentenceTransformer(EMBEDDING_MODEL)
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                with timed("embedding_model"):
+                    from sentence_transformers import SentenceTransformer
+                    _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+
+# === Connect to the vector store (Chroma or the in-process mmap index, see VECTOR_BACKEND) ===
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                with timed("vector_store"):
+                    from vector_backends import open_backend
+                    _backend = open_backend(VECTOR_BACKEND)
+    return _backend
 
-# === Connect to Persistent ChromaDB ===
-client = PersistentClient(path=CHROMA_PATH)
-available_collections = [c.name for c in client.list_collections()]
-print("✅ Available collections:", available_collections)
 
-# === Error if collection missing ===
-if COLLECTION_NAME not in available_collections:
-    raise ValueError(f"❌ Collection '{COLLECTION_NAME}' not found in ChromaDB. Found: {available_collections}")
+# === Columnar sidecar: full rows live in the master store, keyed by doc ID ===
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from master_store import STORE_PATH, MasterStore
+                _store = MasterStore(STORE_PATH)
+    return _store
+
+
+def fetch_records(documents: list, columns: list[str] | None = None) -> list[dict]:
+    """
+    Full telemetry rows for retrieved `documents` or plain doc IDs (same order), reading only
+    `columns` (default RECORD_COLUMNS, or every raw column). Missing values come back as None.
+    """
+    ids = [doc.get("id") if isinstance(doc, dict) else doc for doc in documents]
+    ids = [str(i) for i in ids if i]
+    if not ids:
+        return []
+    columns = columns or RECORD_COLUMNS or None
+    with metrics.stage("fetch_records"):
+        frame = get_store().fetch(ids, columns=columns)
+    if columns is None:
+        frame = frame.drop(columns=["fingerprint", "summary"], errors="ignore")
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient="records")
+
+
+def unknown_columns(columns: list[str] | None) -> tuple[list[str], list[str]]:
+    """(requested `columns` the master store doesn't have, every column it has). Nothing is unknown before the first ingest."""
+    if not columns:
+        return [], []
+    valid = get_store().columns()
+    return ([c for c in columns if c not in valid] if valid else []), valid
+
+
+async def _run(fn, *args):
+    # Runs on the retriever pool in a copy of the caller's context, so stage timings reach its trace
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, contextvars.copy_context().run, fn, *args)
+
+
+async def afetch_records(documents: list, columns: list[str] | None = None) -> list[dict]:
+    return await _run(fetch_records, documents, columns)
+
+
+# === Query embeddings ===
+def encode_queries(queries: list[str]) -> list:
+    """
+    Embeds `queries` with one forward pass for every query not already in the LRU.
+    Returned vectors are shared with the cache: treat them as read-only.
+    """
+    with _query_embeddings_lock:
+        found = {}
+        for q in queries:
+            if q in _query_embeddings:
+                _query_embeddings.move_to_end(q)
+                found[q] = _query_embeddings[q]
+    missing = list(dict.fromkeys(q for q in queries if q not in found))
+
+    if missing:
+        with metrics.stage("embed"):
+            vectors = get_model().encode(missing)
+        with _query_embeddings_lock:
+            for q, vector in zip(missing, vectors):
+                found[q] = _query_embeddings[q] = vector
+                _query_embeddings.move_to_end(q)
+            while len(_query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+                _query_embeddings.popitem(last=False)
+    return [found[q] for q in queries]
+
+
+def clear_query_embeddings():
+    with _query_embeddings_lock:
+        _query_embeddings.clear()
+
+
+def encode_query(query: str):
+    return encode_queries([query])[0]
+
+
+async def aencode_query(query: str):
+    return await _run(encode_query, query)
+
+
+# === Time-partitioned search: which monthly shards a question needs ===
+def resolve_months(query: str, time_range=None) -> list[str] | None:
+    """
+    Shard months for an explicit `time_range` (start, end), else for a window mentioned
+    in the question ("last 2 weeks" is anchored at the newest ingested row). None = all.
+    """
+    if time_range is None:
+        watermark = get_store().watermark
+        time_range = parse_time_range(query, watermark if watermark is not None else pd.Timestamp.now())
+    return months_between(*map(pd.Timestamp, time_range)) if time_range else None
 
-# === Load Collection ===
-collection = client.get_collection(name=COLLECTION_NAME)
 
 # === Query Function ===
-def retrieve_documents(query: str, top_k: int = 5):
+def retrieve_documents(query: str, top_k: int = 5, time_range=None):
     """
     Returns list of dicts:
     [
         {
-            "summary": "...",              # The summary string used for reasoning
-            "metadata": {
-                "row": {...}               # The full original record
-            }
+            "id": "...",                   # Stable document ID (see master_store.row_ids)
+            "summary": "..."               # The summary string used for reasoning
         },
         ...
     ]
+    Full rows are not carried along: see `fetch_records`.
     """
     print(f"\n🔍 Query: {query}")
-    query_embedding = model.encode([query])[0]
+    return retrieve_documents_batch([query], top_k, [time_range])[0]
 
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=top_k,
-        include=["documents", "metadatas"]
-    )
 
-    documents = results.get("documents", [[]])[0]
-    metadatas = results.get("metadatas", [[]])[0]
+def retrieve_documents_batch(queries: list[str], top_k: int = 5, time_ranges: list | None = None):
+    """
+    `retrieve_documents` for many queries at once: one encode pass and one
+    multi-embedding vector store query per distinct set of shards. Returns one
+    result list per query, in order.
+    """
+    if not queries:
+        return []
+    embeddings = encode_queries(queries)
+    time_ranges = time_ranges or [None] * len(queries)
 
-    # Return paired summary + metadata
-    return [
-        {"summary": doc, "metadata": {"row": meta}}
-        for doc, meta in zip(documents, metadatas)
-    ]
+    groups: dict[tuple | None, list[int]] = {}
+    for i, (query, time_range) in enumerate(zip(queries, time_ranges)):
+        months = resolve_months(query, time_range)
+        groups.setdefault(tuple(months) if months is not None else None, []).append(i)
+
+    results = [None] * len(queries)
+    for months, rows in groups.items():
+        with metrics.stage("vector_search"):
+            hits = get_backend().query([embeddings[i] for i in rows], top_k, months=None if months is None else list(months))
+        for i, found in zip(rows, hits):
+            results[i] = [{"id": doc_id, "summary": doc} for doc_id, doc, _ in found]
+    return results
+
+
+async def aretrieve_documents(query: str, top_k: int = 5, time_range=None):
+    """
+    Async `retrieve_documents`: runs on the retriever pool so the event loop stays free.
+    """
+    return await _run(retrieve_documents, query, top_k, time_range)
+
+
+async def aretrieve_documents_batch(queries: list[str], top_k: int = 5, time_ranges: list | None = None):
+    return await _run(retrieve_documents_batch, queries, top_k, time_ranges)
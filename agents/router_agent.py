@@ -1,18 +1,100 @@
 # agents/router_agent.py
 
-import os
-from dotenv import load_dotenv
+import re
+import threading
+import numpy as np
 from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
 
-load_dotenv()
-
-# ✅ OpenRouter-compatible LLM setup
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",  # or any other OpenRouter-compatible model
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1"  # 🔥 required to prevent OpenAI error
+from config import (
+    LLM_BASE_URL, LLM_MAX_RETRIES, LLM_MODEL, OPENROUTER_API_KEY,
+    ROUTER_CONFIDENCE_THRESHOLD, ROUTER_LLM_FALLBACK, ROUTER_LLM_TIMEOUT_SECONDS, ROUTER_MODE,
 )
+from agents.retriever_agent import aencode_query, encode_query, get_model
+from answer_cache import get_answer_cache
+import deadline
+import metrics
+from startup import timed
+
+ROUTES = ["DELAY", "FATIGUE", "FUEL", "WEATHER", "RISK", "INVENTORY", "GENERAL"]
+DEFAULT_ROUTE = "GENERAL"  # when the LLM router times out or fails
+
+# 🧭 Labelled exemplars: each route's centroid is the mean of their embeddings
+ROUTE_EXEMPLARS = {
+    "DELAY": [
+        "Top reasons for delay",
+        "Why are shipments delayed?",
+        "Which shipments have the highest delay probability?",
+        "How long does customs clearance take?",
+        "Show late deliveries and ETA variation",
+        "What is causing lead time to increase?",
+    ],
+    "FATIGUE": [
+        "Plot map for high driver fatigue",
+        "Which drivers show signs of fatigue?",
+        "Where is driver fatigue highest?",
+        "Driver behavior and fatigue monitoring scores",
+        "Are tired drivers linked to delays?",
+    ],
+    "FUEL": [
+        "Which routes have high fuel consumption?",
+        "Show fuel consumption rate by shipment",
+        "How can we reduce fuel costs?",
+        "Vehicles burning the most fuel",
+        "Shipping costs and fuel usage",
+    ],
+    "WEATHER": [
+        "How does weather affect deliveries?",
+        "Shipments impacted by severe weather",
+        "Storms and weather condition severity on routes",
+        "What was the temperature during transport?",
+        "Weather related disruptions this month",
+    ],
+    "RISK": [
+        "Show top 3 high risk shipments",
+        "Which routes have the highest risk level?",
+        "Disruption likelihood across shipments",
+        "Risk classification of recent shipments",
+        "Where are the high risk zones?",
+        "Port congestion and route risk",
+    ],
+    "INVENTORY": [
+        "What is the warehouse inventory level?",
+        "Which warehouses are low on stock?",
+        "Historical demand versus inventory",
+        "Order fulfillment status and stock levels",
+        "Handling equipment availability at warehouses",
+    ],
+    "GENERAL": [
+        "Give me an overview of the supply chain",
+        "Summarize the logistics data",
+        "Hello, what can you do?",
+        "Show me some records",
+        "What does this dataset contain?",
+    ],
+}
+
+_llm = None
+_llm_lock = threading.Lock()
+_centroids = None
+_centroids_lock = threading.Lock()
+
+
+# ✅ OpenRouter-compatible LLM setup (built on first use)
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                with timed("router_llm"):
+                    from langchain_openai import ChatOpenAI
+                    _llm = ChatOpenAI(
+                        model=LLM_MODEL,  # or any other OpenRouter-compatible model
+                        api_key=OPENROUTER_API_KEY,
+                        base_url=LLM_BASE_URL,  # 🔥 required to prevent OpenAI error
+                        timeout=ROUTER_LLM_TIMEOUT_SECONDS,
+                        max_retries=LLM_MAX_RETRIES,
+                    )
+    return _llm
 
 # 🧭 Prompt template for routing
 router_prompt = PromptTemplate.from_template("""
@@ -24,6 +106,93 @@ Query: {query}
 Category:
 """)
 
+
+def parse_route(text: str) -> str:
+    """
+    Maps free-form LLM output onto a known route (first label mentioned wins).
+    """
+    match = re.search(r"\b(" + "|".join(ROUTES) + r")\b", text.upper())
+    return match.group(1) if match else DEFAULT_ROUTE
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# 🧭 Local router: reuses the retriever's MiniLM encoder
+def get_centroids() -> np.ndarray:
+    global _centroids
+    if _centroids is None:
+        with _centroids_lock:
+            if _centroids is None:
+                with timed("router_centroids"):
+                    model = get_model()
+                    _centroids = _normalize(np.stack([
+                        _normalize(model.encode(ROUTE_EXEMPLARS[route])).mean(axis=0) for route in ROUTES
+                    ]))
+    return _centroids
+
+
+def score_routes(query_embedding) -> tuple[str, float]:
+    """
+    Returns the nearest route centroid and its cosine similarity (the confidence).
+    """
+    sims = get_centroids() @ _normalize(query_embedding)
+    best = int(np.argmax(sims))
+    return ROUTES[best], float(sims[best])
+
+
+def llm_classify_query(query: str, fallback: str = DEFAULT_ROUTE) -> str:
+    """LLM routing within the request budget; `fallback` (not cached) if it times out or fails."""
+    cache = get_answer_cache()
+    route = cache.get_route(query)
+    if route is None:
+        prompt = router_prompt.format(query=query)
+        try:
+            with metrics.stage("router_llm"):
+                response = deadline.call("router_llm", lambda: get_llm().invoke(prompt), ROUTER_LLM_TIMEOUT_SECONDS)
+        except Exception as e:
+            deadline.degrade(f"router LLM ({type(e).__name__}), routed to {fallback}")
+            return fallback
+        route = parse_route(response.content)
+        cache.put_route(query, route)
+    return route
+
+
+async def allm_classify_query(query: str, fallback: str = DEFAULT_ROUTE) -> str:
+    cache = get_answer_cache()
+    route = cache.get_route(query)
+    if route is None:
+        prompt = router_prompt.format(query=query)
+        try:
+            with metrics.stage("router_llm"):
+                response = await deadline.acall("router_llm", lambda: get_llm().ainvoke(prompt), ROUTER_LLM_TIMEOUT_SECONDS)
+        except Exception as e:
+            deadline.degrade(f"router LLM ({type(e).__name__}), routed to {fallback}")
+            return fallback
+        route = parse_route(response.content)
+        cache.put_route(query, route)
+    return route
+
+
+def _needs_llm(confidence: float) -> bool:
+    return ROUTER_LLM_FALLBACK and confidence < ROUTER_CONFIDENCE_THRESHOLD
+
+
 def classify_query(query: str) -> str:
-    response = llm.invoke(router_prompt.format(query=query))
-    return response.content.strip().upper()
+    if ROUTER_MODE == "llm":
+        return llm_classify_query(query)
+
+    route, confidence = score_routes(encode_query(query))
+    # A low-confidence local route is still better than GENERAL if the LLM can't answer in time
+    return llm_classify_query(query, fallback=route) if _needs_llm(confidence) else route
+
+
+async def aclassify_query(query: str) -> str:
+    if ROUTER_MODE == "llm":
+        return await allm_classify_query(query)
+
+    route, confidence = score_routes(await aencode_query(query))
+    return await allm_classify_query(query, fallback=route) if _needs_llm(confidence) else route
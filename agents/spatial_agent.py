@@ -1,12 +1,56 @@
 import folium
+import numpy as np
 import pandas as pd
-from folium.plugins import MarkerCluster
+from folium.plugins import FastMarkerCluster, HeatMap
 import re
 import os
+import threading
+
+from config import GEO_INDEX_PATH, MAP_HEATMAP_THRESHOLD
+from geo_index import GeoIndex
+from map_cache import MapCache, map_key
+from summaries import classify_column
+
+# Columns the map needs (projection for fetch_records)
+MAP_COLUMNS = [
+    "timestamp", "vehicle_gps_latitude", "vehicle_gps_longitude",
+    "fatigue_monitoring_score", "delay_probability", "risk_classification",
+]
+COORD_DECIMALS = 5  # ~1 m; keeps the embedded JSON small
+
+# Markers are built client-side from one JSON array: [lat, lon, delayed, popup]
+MARKER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({markerColor: row[2] ? 'red' : 'green'});
+    return L.marker(new L.LatLng(row[0], row[1]), {icon: icon}).bindPopup(row[3], {maxWidth: 300});
+}
+"""
+
+
+# Which metric a dataset-wide hotspot map shows (see plot_hotspots); "delay" when none is named
+HOTSPOT_METRICS = {
+    "fatigue": ["fatigue", "fatigued", "tired", "drowsy"],
+    "risk": ["risk", "risky", "dangerous"],
+    "delay": ["delay", "delays", "delayed", "late"],
+}
+# Only wording like this asks for the whole dataset; anything else maps the retrieved rows
+DATASET_WIDE_PATTERN = re.compile(
+    r"\bhot\s?spots?\b|\bwhere\b.*\bmost\b|\bacross\s+(?:all|the\s+(?:whole|entire))\b"
+    r"|\b(?:whole|entire)\s+(?:dataset|network|fleet)\b|\ball\s+(?:shipments|vehicles|routes)\b|\beverywhere\b"
+)
+HOTSPOT_TOP_CELLS = 25  # worst cells also get a marker with their numbers
+
+_geo_index = None
+_geo_index_mtime = None
+_geo_index_lock = threading.Lock()
+_map_cache = None
+_map_cache_lock = threading.Lock()
+
 
 def parse_summary(summary: str) -> dict | None:
     """
     Extracts date, GPS coordinates, fatigue, delay probability, and risk classification from summary string.
+    Legacy path for callers that only have summaries; prefer passing rows to `plot_delay_clusters`.
     """
     match = re.search(
         r"on\s+(\d{4}-\d{2}-\d{2})[\s\d:]*.*?GPS\s*\(([\d\.-]+),\s*([\d\.-]+)\).*?"
@@ -29,40 +73,77 @@ def parse_summary(summary: str) -> dict | None:
             return None
     return None
 
-def plot_delay_clusters(summaries: list[str], output_path: str = "static/map.html") -> bool:
+
+def map_frame(records) -> pd.DataFrame:
+    """
+    Normalizes telemetry rows (list of dicts or DataFrame) into the columns the map
+    uses: date, lat, lon, fatigue, delay_prob, risk. Rows without coordinates are dropped.
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    if df.empty or "vehicle_gps_latitude" not in df.columns:
+        return pd.DataFrame(columns=["date", "lat", "lon", "fatigue", "delay_prob", "risk"])
+
+    frame = pd.DataFrame({
+        "date": pd.to_datetime(df["timestamp"], errors="coerce").dt.strftime("%Y-%m-%d") if "timestamp" in df else "",
+        "lat": pd.to_numeric(df["vehicle_gps_latitude"], errors="coerce"),
+        "lon": pd.to_numeric(df["vehicle_gps_longitude"], errors="coerce"),
+        "fatigue": (pd.Series(classify_column(1 - pd.to_numeric(df["fatigue_monitoring_score"], errors="coerce")),
+                              index=df.index).str.capitalize()
+                    if "fatigue_monitoring_score" in df else "Unknown"),
+        "delay_prob": pd.to_numeric(df.get("delay_probability", np.nan), errors="coerce"),
+        "risk": df["risk_classification"].astype(str) if "risk_classification" in df else "Unknown",
+    })
+    return frame.dropna(subset=["lat", "lon"])
+
+
+def build_map(df: pd.DataFrame, heatmap_threshold: int = MAP_HEATMAP_THRESHOLD) -> folium.Map:
+    """
+    Clustered markers (one JSON array, markers created in the browser) up to
+    `heatmap_threshold` points; a delay-weighted heatmap beyond that.
+    """
+    m = folium.Map(location=[df["lat"].mean(), df["lon"].mean()], zoom_start=5)
+    coords = df[["lat", "lon"]].to_numpy(dtype=float).round(COORD_DECIMALS)
+    delay = df["delay_prob"].to_numpy(dtype=float)
+
+    if len(df) > heatmap_threshold:
+        weights = np.nan_to_num(delay, nan=0.0).clip(0, 1).round(3)
+        HeatMap(np.column_stack([coords, weights]).tolist(), radius=8, blur=10, min_opacity=0.3).add_to(m)
+        return m
+
+    delay_text = np.where(np.isnan(delay), "n/a", np.round(delay, 2).astype(str))
+    popups = (
+        "📅 <b>Date:</b> " + df["date"].astype(str).to_numpy(dtype=object)
+        + "<br>😴 <b>Fatigue:</b> " + df["fatigue"].astype(str).to_numpy(dtype=object)
+        + "<br>🕒 <b>Delay Prob:</b> " + delay_text.astype(object)
+        + "<br>⚠️ <b>Risk:</b> " + df["risk"].astype(str).to_numpy(dtype=object)
+    )
+    data = [[lat, lon, bool(d > 0.5), p] for (lat, lon), d, p in zip(coords.tolist(), delay.tolist(), popups)]
+    FastMarkerCluster(data, callback=MARKER_CALLBACK).add_to(m)
+    return m
+
+
+def plot_delay_clusters(records, output_path: str = "static/map.html",
+                        heatmap_threshold: int = MAP_HEATMAP_THRESHOLD) -> bool:
     """
     Plots a Folium map of shipment delay clusters and saves to static folder for web use.
+    `records` are telemetry rows (dicts or a DataFrame, see MAP_COLUMNS); a list of
+    summary strings is still accepted and parsed.
     """
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
 
-    records = []
-    for s in summaries:
-        record = parse_summary(s)
-        if record:
-            records.append(record)
+    if not isinstance(records, pd.DataFrame):
+        records = list(records)
+    if isinstance(records, list) and records and isinstance(records[0], str):
+        df = pd.DataFrame([r for r in map(parse_summary, records) if r])
+    else:
+        df = map_frame(records)
 
-    if not records:
+    if df.empty:
         print("⚠️ No valid geospatial records found.")
         print("⚠️ Map file could not be saved.")
         return False
 
-    df = pd.DataFrame(records)
-
-    m = folium.Map(location=[df["lat"].mean(), df["lon"].mean()], zoom_start=5)
-    marker_cluster = MarkerCluster().add_to(m)
-
-    for _, row in df.iterrows():
-        popup_content = f"""
-            📅 <b>Date:</b> {row['date']}<br>
-            😴 <b>Fatigue:</b> {row['fatigue']}<br>
-            🕒 <b>Delay Prob:</b> {row['delay_prob']}<br>
-            ⚠️ <b>Risk:</b> {row['risk']}
-        """
-        folium.Marker(
-            location=[row["lat"], row["lon"]],
-            popup=folium.Popup(popup_content, max_width=300),
-            icon=folium.Icon(color="red" if row["delay_prob"] > 0.5 else "green")
-        ).add_to(marker_cluster)
+    m = build_map(df, heatmap_threshold)
 
     try:
         m.save(output_path)
@@ -71,3 +152,83 @@ def plot_delay_clusters(summaries: list[str], output_path: str = "static/map.htm
     except Exception as e:
         print(f"❌ Error saving map: {e}")
         return False
+
+
+# === Dataset-wide hotspots from the precomputed grid (geo_index.py) ===
+def get_geo_index() -> GeoIndex:
+    """Loaded on first use and reloaded when ingest rewrites it."""
+    global _geo_index, _geo_index_mtime
+    meta_path = os.path.join(GEO_INDEX_PATH, "meta.json")
+    mtime = os.stat(meta_path).st_mtime_ns if os.path.exists(meta_path) else None
+    with _geo_index_lock:
+        if _geo_index is None or mtime != _geo_index_mtime:
+            _geo_index = GeoIndex(GEO_INDEX_PATH)
+            _geo_index_mtime = mtime
+        return _geo_index
+
+
+def hotspot_metric(query: str) -> str | None:
+    """
+    The metric for a dataset-wide hotspot map ("delay hotspots", "where are drivers most
+    fatigued"), or None to map the retrieved records ("plot the top 5 delayed shipments").
+    """
+    q = query.lower()
+    if not DATASET_WIDE_PATTERN.search(q):
+        return None
+    for metric, words in HOTSPOT_METRICS.items():
+        if any(re.search(rf"\b{w}\b", q) for w in words):
+            return metric
+    return "delay"
+
+
+def plot_hotspots(metric: str, output_path: str = "static/map.html", min_count: int = 3) -> bool:
+    """
+    Heatmap of `metric` over every grid cell of the whole dataset, plus markers on
+    the worst cells. Reads only the grid aggregates, never the raw rows.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    cells = get_geo_index().hotspots(metric, min_count=min_count)
+    if cells.empty:
+        print("⚠️ Geo grid index is empty; run ingest.py first.")
+        return False
+
+    m = folium.Map(location=[cells["lat"].mean(), cells["lon"].mean()], zoom_start=5)
+    HeatMap(cells[["lat", "lon", "weight"]].round(4).to_numpy().tolist(), radius=12, blur=15,
+            min_opacity=0.3, name=f"{metric} hotspots").add_to(m)
+    worst = cells.nlargest(HOTSPOT_TOP_CELLS, "weight")
+    for lat, lon, weight, count in zip(worst["lat"], worst["lon"], worst["weight"], worst["count"]):
+        folium.CircleMarker(
+            location=[lat, lon], radius=6, color="red", fill=True,
+            popup=f"🔥 <b>{metric}:</b> {weight:.2f}<br>📦 <b>Shipments:</b> {count}",
+        ).add_to(m)
+
+    try:
+        m.save(output_path)
+        print(f"🗺️  Hotspot map saved to: {output_path}")
+        return True
+    except Exception as e:
+        print(f"❌ Error saving map: {e}")
+        return False
+
+
+# === Per-request artifacts: content-addressed, cached files (see map_cache.py) ===
+def get_map_cache() -> MapCache:
+    global _map_cache
+    if _map_cache is None:
+        with _map_cache_lock:
+            if _map_cache is None:
+                _map_cache = MapCache()
+    return _map_cache
+
+
+def cached_records_map(records: list[dict]) -> str | None:
+    """File name of the map for exactly these rows (rendered only if not cached)."""
+    key = map_key("records", {"records": records, "heatmap_threshold": MAP_HEATMAP_THRESHOLD})
+    return get_map_cache().get_or_create(key, lambda path: plot_delay_clusters(records, output_path=path))
+
+
+def cached_hotspot_map(metric: str) -> str | None:
+    """File name of the hotspot map for `metric` at the grid's current data version."""
+    index = get_geo_index()
+    key = map_key("hotspots", {"metric": metric, "version": index.store_version, "degrees": index.degrees})
+    return get_map_cache().get_or_create(key, lambda path: plot_hotspots(metric, output_path=path))
@@ -0,0 +1,260 @@
+# answer_cache.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_PATH, ANSWER_CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_THRESHOLD,
+)
+from master_store import STORE_PATH, MasterStore
+
+VERSION_CHECK_SECONDS = 1.0  # how often to look for new ingested data
+PERSIST_EVERY = 20           # writes between snapshots when ANSWER_CACHE_PATH is set
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", query.lower())).strip()
+
+
+def doc_key(doc) -> str:
+    if isinstance(doc, dict) and doc.get("id"):
+        return str(doc["id"])
+    return hashlib.blake2b(str(doc).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU map with a per-entry TTL and hit/miss counters.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or time.time() - item[0] > self.ttl:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: str, value, created: float | None = None):
+        with self._lock:
+            self._data[key] = (created or time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def items(self) -> list:
+        with self._lock:
+            return [(k, t, v) for k, (t, v) in self._data.items()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SemanticCache(LRUCache):
+    """
+    LRU/TTL cache looked up by cosine similarity of normalized query embeddings. An entry only
+    matches lookups over the same retrieved documents (its `docs` key): near-identical wording
+    ("... in 2024-01" vs "... in 2024-02", top 3 vs top 5) can be about different records.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, threshold: float):
+        super().__init__(max_entries, ttl)
+        self.threshold = threshold
+
+    def nearest(self, embedding: np.ndarray, docs: str):
+        with self._lock:
+            now = time.time()
+            live = [(k, v) for k, (t, v) in self._data.items() if now - t <= self.ttl and v.get("docs") == docs]
+            if live:
+                matrix = np.stack([v["embedding"] for _, v in live])
+                sims = matrix @ embedding
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    key = live[best][0]
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return live[best][1]["answer"]
+            self.misses += 1
+            return None
+
+
+class AnswerCache:
+    """
+    Two tiers in front of the reasoning LLM (plus a route tier for classify_query):
+
+    * exact    -> normalized query + retrieved doc IDs + prompt version
+    * semantic -> query embedding within SEMANTIC_CACHE_THRESHOLD cosine similarity, same doc IDs
+
+    Everything is dropped when the master store version changes (i.e. after ingest).
+    """
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, store_path: str = STORE_PATH):
+        self.exact = LRUCache(ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS)
+        self.semantic = SemanticCache(SEMANTIC_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, SEMANTIC_CACHE_THRESHOLD)
+        self.routes = LRUCache(ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS)
+        self.path = path
+        self.invalidations = 0
+        self._store_path = store_path
+        self._store = None
+        self._data_version = None
+        self._checked_at = 0.0
+        self._writes = 0
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    # === Invalidation ===
+    def _current_version(self) -> int:
+        if self._store is None:
+            self._store = MasterStore(self._store_path)
+        return self._store.version
+
+    def check_version(self):
+        """Clears every tier if new data was ingested since the answers were cached."""
+        now = time.time()
+        if now - self._checked_at < VERSION_CHECK_SECONDS:
+            return
+        with self._lock:
+            self._checked_at = now
+            version = self._current_version()
+            if self._data_version is not None and version != self._data_version:
+                self.clear()
+                self.invalidations += 1
+            self._data_version = version
+
+    def clear(self):
+        for tier in (self.exact, self.semantic, self.routes):
+            tier.clear()
+
+    # === Keys ===
+    @staticmethod
+    def exact_key(query: str, documents: list, prompt_version: str) -> str:
+        raw = json.dumps([normalize_query(query), [doc_key(d) for d in documents], prompt_version])
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def docs_key(documents: list, prompt_version: str) -> str:
+        raw = json.dumps([[doc_key(d) for d in documents], prompt_version])
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    # === Answers ===
+    def get_answer(self, query: str, documents: list, prompt_version: str, embedding: np.ndarray | None = None):
+        self.check_version()
+        answer = self.exact.get(self.exact_key(query, documents, prompt_version))
+        if answer is None and embedding is not None:
+            answer = self.semantic.nearest(_unit(embedding), self.docs_key(documents, prompt_version))
+        return answer
+
+    def put_answer(self, query: str, documents: list, prompt_version: str, answer: str, embedding: np.ndarray | None = None):
+        key = self.exact_key(query, documents, prompt_version)
+        self.exact.put(key, answer)
+        if embedding is not None:
+            docs = self.docs_key(documents, prompt_version)
+            self.semantic.put(key, {"embedding": _unit(embedding), "answer": answer, "docs": docs})
+        self._wrote()
+
+    # === Routes ===
+    def get_route(self, query: str):
+        self.check_version()
+        return self.routes.get(normalize_query(query))
+
+    def put_route(self, query: str, route: str):
+        self.routes.put(normalize_query(query), route)
+        self._wrote()
+
+    # === Persistence ===
+    def _wrote(self):
+        self._writes += 1
+        if self.path and self._writes % PERSIST_EVERY == 0:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        snapshot = {
+            "data_version": self._data_version,
+            "exact": self.exact.items(),
+            "routes": self.routes.items(),
+            "semantic": [
+                (k, t, {"embedding": v["embedding"].tolist(), "answer": v["answer"], "docs": v["docs"]})
+                for k, t, v in self.semantic.items()
+            ],
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            snapshot = json.load(f)
+        # Answers computed against older data are useless
+        if snapshot.get("data_version") != self._current_version():
+            return
+        self._data_version = snapshot["data_version"]
+        for k, t, v in snapshot.get("exact", []):
+            self.exact.put(k, v, created=t)
+        for k, t, v in snapshot.get("routes", []):
+            self.routes.put(k, v, created=t)
+        for k, t, v in snapshot.get("semantic", []):
+            if "docs" not in v:  # snapshot from before entries were tied to their documents
+                continue
+            embedding = np.asarray(v["embedding"], dtype=np.float32)
+            self.semantic.put(k, {"embedding": embedding, "answer": v["answer"], "docs": v["docs"]}, created=t)
+
+    def stats(self) -> dict:
+        tiers = {"exact": self.exact, "semantic": self.semantic, "routes": self.routes}
+        return {
+            **{
+                name: {"entries": len(t), "hits": t.hits, "misses": t.misses,
+                       "hit_rate": round(t.hits / (t.hits + t.misses), 4) if t.hits + t.misses else 0.0}
+                for name, t in tiers.items()
+            },
+            "invalidations": self.invalidations,
+            "data_version": self._data_version,
+        }
+
+
+def _unit(embedding) -> np.ndarray:
+    v = np.asarray(embedding, dtype=np.float32)
+    return v / max(float(np.linalg.norm(v)), 1e-12)
+
+
+# === Process-wide instance used by the agents (created on first use) ===
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache()
+    return _answer_cache
@@ -1,15 +1,19 @@
+import json
+import uuid
 import streamlit as st
 import requests
 import pandas as pd
 import streamlit.components.v1 as components
 
 # --- FastAPI Backend URL ---
-API_URL = "http://localhost:8000/query"  # Adjust if hosted remotely
-MAP_URL = "http://localhost:8000/static/map.html"  # Must match FastAPI static path
+STREAM_URL = "http://localhost:8000/query/stream"  # SSE: records first, then LLM tokens (adjust if hosted remotely)
 
 # --- Initialize session state ---
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "session_id" not in st.session_state:
+    # One backend session per browser session: follow-ups like "show top 3 records" see only our results
+    st.session_state.session_id = uuid.uuid4().hex
 
 st.set_page_config(page_title="Multi-Agent RAG Chatbot", layout="wide")
 
@@ -20,26 +24,35 @@ st.markdown("- `Plot map for high driver fatigue`")
 st.markdown("- `Show top 3 high risk shipments`")
 
 
-# --- User Input ---
-user_input = st.chat_input("Type your query here...")
+def render_records(records):
+    if records:
+        st.markdown("📄 **Supporting Records:**")
+        df = pd.DataFrame(records)
+        st.dataframe(df, use_container_width=True)
 
-# --- Process Query ---
-if user_input:
-    with st.spinner("Thinking... 🤔"):
+
+def render_map(map_url):
+    if map_url:
+        st.markdown("🗺️ **Map Preview:**")
         try:
-            response = requests.post(API_URL, json={"query": user_input})
-            response.raise_for_status()
-            result = response.json()
+            components.html(f'<iframe src="{map_url}" width="100%" height="500" style="border:none;"></iframe>', height=510)
+            st.markdown(f"[🌐 Open full map]({map_url})", unsafe_allow_html=True)
+        except Exception as e:
+            st.warning(f"⚠️ Unable to load map: {e}")
 
-            st.session_state.chat_history.append({
-                "user": user_input,
-                "response": result["response"],
-                "records": result.get("top_records", []),
-                "map": result.get("map_generated", False)
-            })
 
-        except Exception as e:
-            st.error(f"❌ Error from backend: {e}")
+def stream_events(query):
+    """Yields (event, data) pairs from the /query/stream Server-Sent Events endpoint."""
+    payload = {"query": query, "session_id": st.session_state.session_id}
+    with requests.post(STREAM_URL, json=payload, stream=True, timeout=(5, 300)) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+
 
 # --- Display Chat History ---
 for i, msg in enumerate(st.session_state.chat_history):
@@ -48,16 +61,43 @@ for i, msg in enumerate(st.session_state.chat_history):
 
     with st.chat_message("assistant"):
         st.markdown(f"📌 **Insight:**\n\n{msg['response']}")
+        render_records(msg["records"])
+        render_map(msg["map"])
+
 
-        if msg["records"]:
-            st.markdown("📄 **Supporting Records:**")
-            df = pd.DataFrame(msg["records"])
-            st.dataframe(df, use_container_width=True)
-
-        if msg["map"]:
-            st.markdown("🗺️ **Map Preview:**")
-            try:
-                components.html(f'<iframe src="{MAP_URL}" width="100%" height="500" style="border:none;"></iframe>', height=510)
-                st.markdown(f"[🌐 Open full map]({MAP_URL})", unsafe_allow_html=True)
-            except Exception as e:
-                st.warning(f"⚠️ Unable to load map: {e}")
+# --- User Input ---
+user_input = st.chat_input("Type your query here...")
+
+# --- Process Query (rendered incrementally as the backend streams) ---
+if user_input:
+    with st.chat_message("user"):
+        st.markdown(user_input)
+
+    with st.chat_message("assistant"):
+        answer_box = st.empty()
+        records_box = st.container()
+        answer_box.markdown("Thinking... 🤔")
+        message = {"user": user_input, "response": "", "records": [], "map": None}
+        tokens = []
+        try:
+            for event, data in stream_events(user_input):
+                if event == "records":
+                    message["records"] = data.get("top_records", [])
+                    with records_box:
+                        render_records(message["records"])
+                elif event == "token":
+                    tokens.append(data)
+                    answer_box.markdown(f"📌 **Insight:**\n\n{''.join(tokens)}▌")
+                elif event == "done":
+                    # Follow-ups ("show top 3 records") send no tokens, only the final response
+                    message["response"] = "".join(tokens).strip() if tokens else data.get("response", "")
+                    message["map"] = data.get("map_url")
+                elif event == "error":
+                    raise RuntimeError(data.get("detail"))
+
+            answer_box.markdown(f"📌 **Insight:**\n\n{message['response']}")
+            render_map(message["map"])
+            st.session_state.chat_history.append(message)
+
+        except Exception as e:
+            st.error(f"❌ Error from backend: {e}")
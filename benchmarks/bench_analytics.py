@@ -0,0 +1,39 @@
+"""
+Latency of the columnar analytics engine on synthetic telemetry.
+
+Usage: python -m benchmarks.bench_analytics [rows]
+"""
+import sys
+import time
+
+from agents.analytics_agent import AnalyticsEngine, parse_query
+from benchmarks.synthetic import make_telemetry
+from master_store import row_ids
+
+QUERIES = [
+    "Show top 3 high risk shipments",
+    "Top reasons for delay",
+    "Top 10 shipments with the highest fuel consumption",
+    "Average delay by risk",
+    "Average shipping costs per month for high risk shipments",
+    "Lowest 5 deliveries by inventory",
+]
+REPEATS = 20
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = make_telemetry(rows)
+    df["doc_id"] = row_ids(df)
+
+    start = time.perf_counter()
+    engine = AnalyticsEngine(df)
+    print(f"📊 Built engine over {rows:,} rows in {time.perf_counter() - start:.2f}s")
+
+    for query in QUERIES:
+        plan = parse_query(query)
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            result = engine.run(plan)
+        elapsed = (time.perf_counter() - start) / REPEATS * 1000
+        print(f"   {elapsed:8.2f}ms | {query} -> {plan.kind}, {len(result.table)} result rows")
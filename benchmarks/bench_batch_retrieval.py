@@ -0,0 +1,43 @@
+"""
+Per-query vs. batched retrieval (one encode pass + one multi-embedding Chroma query).
+
+Usage: python -m benchmarks.bench_batch_retrieval [--queries 256] [--top-k 5]
+Needs the ingested Chroma store; queries are drawn from the router eval set.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from agents import retriever_agent
+
+EVAL_PATH = "benchmarks/router_eval.csv"
+
+
+def run(name: str, fn, queries: list[str]) -> float:
+    retriever_agent.clear_query_embeddings()
+    start = time.perf_counter()
+    fn(queries)
+    elapsed = time.perf_counter() - start
+    print(f"📦 {name:<10} {len(queries):>5} queries in {elapsed:7.3f}s | {len(queries) / elapsed:8.1f} q/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    pool = pd.read_csv(EVAL_PATH)["query"].tolist()
+    # Distinct strings, so the embedding LRU can't hide the encode cost
+    queries = [f"{pool[i % len(pool)]} (report {i})" for i in range(args.queries)]
+
+    retriever_agent.retrieve_documents_batch(queries[:2], args.top_k)  # exclude model/store load
+    single = run("per-query", lambda qs: [retriever_agent.retrieve_documents(q, args.top_k) for q in qs], queries)
+    batched = run("batched", lambda qs: retriever_agent.retrieve_documents_batch(qs, args.top_k), queries)
+    print(f"   speed-up: {single / batched:.1f}x")
+
+    start = time.perf_counter()
+    retriever_agent.encode_queries(queries)
+    print(f"   memoized re-encode of all {len(queries)} queries: {(time.perf_counter() - start) * 1000:.2f}ms")
@@ -0,0 +1,81 @@
+"""
+Prompt size and LLM latency of the reasoning prompt: the old rendering (first 5 documents
+stringified whole) vs. the budgeted context builder in prose ("summaries") and table mode.
+
+Usage: python -m benchmarks.bench_context [--top-k 5 20] [--budget 600] [--duplicate-share 0.25]
+Latency is measured against the fake LLM server (started in-process, with a per-prompt-token
+prefill cost) unless --base-url points at a real OpenAI-compatible endpoint (key: OPENROUTER_API_KEY).
+"""
+import argparse
+import os
+import statistics
+import time
+
+import requests
+
+from agents.context_builder import build_context, estimate_tokens
+from agents.reasoning_agent import reasoning_prompt
+from benchmarks.synthetic import make_telemetry
+from master_store import row_ids
+from summaries import generate_summaries
+
+QUERY = "Why were high risk shipments delayed last month?"
+RUNS = 5
+
+
+def documents_for(k: int, duplicate_share: float) -> tuple[list[dict], list[dict]]:
+    """k retrieved docs (and their rows); a share of them repeat an earlier row's profile at another time."""
+    df = make_telemetry(k, seed=k)
+    n_dupes = int(k * duplicate_share)
+    for column in df.columns.drop("timestamp") if n_dupes else []:
+        df.loc[df.index[k - n_dupes:], column] = df[column].iloc[:n_dupes].to_numpy()
+    df["summary"] = generate_summaries(df)
+    docs = [{"id": i, "summary": s} for i, s in zip(row_ids(df), df["summary"])]
+    return docs, df.to_dict(orient="records")
+
+
+def legacy_prompt(docs: list[dict]) -> str:
+    # The old build_prompt: dicts had no "document" key, so each was stringified whole
+    return reasoning_prompt.format(query=QUERY, documents="\n".join(str(d) for d in docs[:5]))
+
+
+def llm_latency_ms(base_url: str, model: str, prompt: str) -> float:
+    headers = {"Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY', 'fake')}"}
+    body = {"model": model, "messages": [{"role": "user", "content": prompt}]}
+    latencies = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        requests.post(f"{base_url}/chat/completions", json=body, headers=headers, timeout=120).raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--budget", type=int, default=600)
+    parser.add_argument("--duplicate-share", type=float, default=0.25)
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint, e.g. https://openrouter.ai/api/v1")
+    parser.add_argument("--model", default="mistralai/mistral-7b-instruct")
+    parser.add_argument("--prompt-token-ms", type=float, default=0.5, help="fake server prefill cost per token")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    if base_url is None:
+        from benchmarks.fake_llm_server import CONFIG, serve
+        CONFIG.update(first_token_ms=150, token_ms=5, tokens=60, prompt_token_ms=args.prompt_token_ms)
+        serve(9101)
+        base_url = "http://127.0.0.1:9101/v1"
+
+    print(f"{'top_k':>5} | {'rendering':<22} {'docs':>9} {'dupes':>5} {'prompt tok':>10} {'LLM ms':>8}")
+    for k in args.top_k:
+        docs, rows = documents_for(k, args.duplicate_share)
+        variants = {"legacy (first 5, str)": (legacy_prompt(docs), {"docs_used": min(5, k), "duplicates": 0})}
+        for mode in ("summaries", "table"):
+            context, stats = build_context(docs, budget=args.budget, mode=mode, rows=rows)
+            variants[f"{mode} (budget {args.budget})"] = (reasoning_prompt.format(query=QUERY, documents=context), stats)
+
+        for name, (prompt, stats) in variants.items():
+            latency = llm_latency_ms(base_url, args.model, prompt)
+            print(f"{k:>5} | {name:<22} {stats['docs_used']:>4}/{k:<4} {stats['duplicates']:>5} "
+                  f"{estimate_tokens(prompt):>10,} {latency:>8.0f}")
@@ -0,0 +1,84 @@
+"""
+Latency of the serial (route -> documents) vs. parallel (route || documents) graph,
+with the LLM calls and retrieval replaced by fixed-latency stubs.
+
+Usage: python -m benchmarks.bench_graph_parallel [router_ms] [retrieval_ms] [reasoning_ms]
+"""
+import asyncio
+import sys
+import time
+
+import graph
+
+RUNS = 5
+
+
+def install_stubs(router_s: float, retrieval_s: float, reasoning_s: float):
+    docs = [{"id": f"doc{i}", "summary": f"stub summary {i}"} for i in range(5)]
+
+    def classify_query(query):
+        time.sleep(router_s)
+        return "DELAY"
+
+    async def aclassify_query(query):
+        await asyncio.sleep(router_s)
+        return "DELAY"
+
+    def retrieve_documents(query, top_k=5, time_range=None):
+        time.sleep(retrieval_s)
+        return docs
+
+    async def aretrieve_documents(query, top_k=5, time_range=None):
+        await asyncio.sleep(retrieval_s)
+        return docs
+
+    def answer_with_analytics(query):
+        return None
+
+    async def aanswer_with_analytics(query):
+        return None
+
+    def analyze_documents(query, documents):
+        time.sleep(reasoning_s)
+        return "stub answer"
+
+    async def aanalyze_documents(query, documents):
+        await asyncio.sleep(reasoning_s)
+        return "stub answer"
+
+    for name, fn in list(locals().items()):
+        if callable(fn):
+            setattr(graph, name, fn)
+
+
+def time_sync(compiled) -> tuple[float, dict]:
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        state = compiled.invoke({"query": "Top reasons for delay"})
+    return (time.perf_counter() - start) / RUNS, state
+
+
+def time_async(compiled) -> float:
+    async def run():
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            await compiled.ainvoke({"query": "Top reasons for delay"})
+        return (time.perf_counter() - start) / RUNS
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    router_ms, retrieval_ms, reasoning_ms = ([float(a) for a in sys.argv[1:4]] + [400, 150, 800][len(sys.argv[1:4]):])
+    install_stubs(router_ms / 1000, retrieval_ms / 1000, reasoning_ms / 1000)
+
+    serial = graph.build_graph(parallel=False).compile()
+    parallel = graph.build_graph(parallel=True).compile()
+
+    serial_sync, serial_state = time_sync(serial)
+    parallel_sync, parallel_state = time_sync(parallel)
+    assert serial_state == parallel_state, "❌ Parallel graph produced a different state"
+
+    print(f"🧪 Stubs: router {router_ms:.0f}ms, retrieval {retrieval_ms:.0f}ms, reasoning {reasoning_ms:.0f}ms")
+    print(f"   invoke : serial {serial_sync * 1000:7.1f}ms | parallel {parallel_sync * 1000:7.1f}ms | saved {(serial_sync - parallel_sync) * 1000:6.1f}ms")
+    serial_async, parallel_async = time_async(serial), time_async(parallel)
+    print(f"   ainvoke: serial {serial_async * 1000:7.1f}ms | parallel {parallel_async * 1000:7.1f}ms | saved {(serial_async - parallel_async) * 1000:6.1f}ms")
@@ -0,0 +1,78 @@
+"""
+Map generation time and HTML size: one folium.Marker per row (the old path) vs. the
+vectorized FastMarkerCluster / heatmap path in agents.spatial_agent.
+
+Usage: python -m benchmarks.bench_maps [points ...]   (default 1000 10000 100000)
+The per-marker baseline is skipped above --legacy-max points (default 10000).
+Also times a dataset-wide hotspot map rendered from the geo grid index.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import folium
+from folium.plugins import MarkerCluster
+
+from agents import spatial_agent
+from agents.spatial_agent import MAP_COLUMNS, build_map, map_frame
+from geo_index import GeoIndex
+from benchmarks.synthetic import make_telemetry
+from config import MAP_HEATMAP_THRESHOLD
+
+
+def legacy_map(df) -> folium.Map:
+    m = folium.Map(location=[df["lat"].mean(), df["lon"].mean()], zoom_start=5)
+    cluster = MarkerCluster().add_to(m)
+    for _, row in df.iterrows():
+        popup = (f"📅 <b>Date:</b> {row['date']}<br>😴 <b>Fatigue:</b> {row['fatigue']}<br>"
+                 f"🕒 <b>Delay Prob:</b> {row['delay_prob']}<br>⚠️ <b>Risk:</b> {row['risk']}")
+        folium.Marker(
+            location=[row["lat"], row["lon"]],
+            popup=folium.Popup(popup, max_width=300),
+            icon=folium.Icon(color="red" if row["delay_prob"] > 0.5 else "green"),
+        ).add_to(cluster)
+    return m
+
+
+def timed_save(build, path: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    build().save(path)
+    return time.perf_counter() - start, os.path.getsize(path) / 2**20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("points", nargs="*", type=int, default=[1_000, 10_000, 100_000])
+    parser.add_argument("--legacy-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'points':>8} | {'mode':<22} {'seconds':>8} {'MiB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.points:
+            df = map_frame(make_telemetry(n)[MAP_COLUMNS])
+            path = os.path.join(tmp, f"map-{n}.html")
+
+            if n <= args.legacy_max:
+                secs, size = timed_save(lambda: legacy_map(df), path)
+                print(f"{n:>8,} | {'per-marker (old)':<22} {secs:>8.2f} {size:>8.2f}")
+
+            mode = "heatmap" if n > MAP_HEATMAP_THRESHOLD else "fast marker cluster"
+            secs, size = timed_save(lambda: build_map(df), path)
+            print(f"{n:>8,} | {mode:<22} {secs:>8.2f} {size:>8.2f}")
+
+            if n > MAP_HEATMAP_THRESHOLD:
+                secs, size = timed_save(lambda: build_map(df, heatmap_threshold=n), path)
+                print(f"{n:>8,} | {'fast marker cluster':<22} {secs:>8.2f} {size:>8.2f}")
+
+            # Dataset-wide hotspots: aggregate once (ingest time), then render from the cells only
+            grid = GeoIndex(os.path.join(tmp, f"geo-{n}"))
+            start = time.perf_counter()
+            grid.update(added=make_telemetry(n))
+            aggregate_secs = time.perf_counter() - start
+            spatial_agent.get_geo_index = lambda: grid
+            start = time.perf_counter()
+            spatial_agent.plot_hotspots("fatigue", output_path=path)
+            secs = time.perf_counter() - start
+            print(f"{n:>8,} | {'hotspots (grid)':<22} {secs:>8.2f} {os.path.getsize(path) / 2**20:>8.2f}"
+                  f"   ({len(grid):,} cells, aggregated in {aggregate_secs:.2f}s)")
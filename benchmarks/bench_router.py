@@ -0,0 +1,54 @@
+"""
+Accuracy vs. latency of the local embedding router against the LLM router on a labelled set.
+
+Usage: python -m benchmarks.bench_router [--no-llm]
+The LLM router uses LLM_BASE_URL / OPENROUTER_API_KEY (point it at the fake server to test offline).
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from agents import router_agent
+from agents.retriever_agent import encode_query
+from answer_cache import get_answer_cache
+
+EVAL_PATH = "benchmarks/router_eval.csv"
+
+
+def evaluate(name: str, classify, queries: list[str], labels: list[str]) -> dict:
+    predictions, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        predictions.append(classify(query))
+        latencies.append(time.perf_counter() - start)
+    lat = np.array(latencies) * 1000
+    accuracy = float(np.mean([p == l for p, l in zip(predictions, labels)]))
+    print(f"🧭 {name:<14} accuracy {accuracy:6.1%} | p50 {np.percentile(lat, 50):8.2f}ms | p95 {np.percentile(lat, 95):8.2f}ms")
+    return {"router": name, "accuracy": accuracy, "p50_ms": float(np.percentile(lat, 50))}
+
+
+def local_only(query: str) -> str:
+    return router_agent.score_routes(encode_query(query))[0]
+
+
+def hybrid(query: str) -> str:
+    route, confidence = router_agent.score_routes(encode_query(query))
+    return route if confidence >= router_agent.ROUTER_CONFIDENCE_THRESHOLD else router_agent.llm_classify_query(query)
+
+
+if __name__ == "__main__":
+    df = pd.read_csv(EVAL_PATH)
+    queries, labels = df["query"].tolist(), df["label"].tolist()
+
+    router_agent.get_centroids()  # exclude model load from the timings
+    results = [evaluate("local", local_only, queries, labels)]
+    if "--no-llm" not in sys.argv:
+        results.append(evaluate("llm", router_agent.llm_classify_query, queries, labels))
+        get_answer_cache().routes.clear()  # the llm run above would otherwise answer every fallback
+        results.append(evaluate("local+fallback", hybrid, queries, labels))
+
+    confidences = [router_agent.score_routes(encode_query(q))[1] for q in queries]
+    below = sum(c < router_agent.ROUTER_CONFIDENCE_THRESHOLD for c in confidences)
+    print(f"   {below}/{len(queries)} queries fall below the confidence threshold ({router_agent.ROUTER_CONFIDENCE_THRESHOLD})")
@@ -0,0 +1,60 @@
+"""
+Query latency vs. history length with monthly shards: recent-window search vs. full-history search.
+
+Usage: python -m benchmarks.bench_shards [--rows-per-month 20000] [--months 3,12,36] [--queries 200]
+Uses the mmap backend in a temporary directory (no Chroma needed).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_vector_backends import make_vectors
+from vector_backends import MmapBackend, ShardedBackend, _normalize
+import vector_backends
+
+BATCH = 16
+
+
+def month_keys(n: int) -> list[str]:
+    return [f"{2020 + i // 12}-{i % 12 + 1:02d}" for i in range(n)]
+
+
+def latency_ms(backend: ShardedBackend, queries: np.ndarray, months) -> float:
+    backend.search(queries[:BATCH], 5, months=months)
+    start = time.perf_counter()
+    for i in range(0, len(queries), BATCH):
+        backend.search(queries[i:i + BATCH], 5, months=months)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows-per-month", type=int, default=20_000)
+    parser.add_argument("--months", default="3,12,36")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    queries = _normalize(rng.normal(size=(args.queries, args.dim)))
+
+    print(f"{'months':>7} {'rows':>10} {'last month ms/q':>16} {'all shards ms/q':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_backends.VECTOR_INDEX_PATH = tmp
+        built = 0
+        for n in sorted(int(m) for m in args.months.split(",")):
+            keys = month_keys(n)
+            for i, month in enumerate(keys[built:], start=built):
+                shard = MmapBackend(os.path.join(tmp, f"month={month}"), writable=True)
+                shard.upsert([f"{month}-{j}" for j in range(args.rows_per_month)],
+                             make_vectors(args.rows_per_month, args.dim, seed=i))
+                shard.flush()
+            built = n
+
+            backend = ShardedBackend("mmap")
+            recent = latency_ms(backend, queries, [keys[-1]])
+            full = latency_ms(backend, queries, None)
+            print(f"{n:>7} {n * args.rows_per_month:>10,} {recent:>16.2f} {full:>16.2f}")
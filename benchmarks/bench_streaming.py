@@ -0,0 +1,60 @@
+"""
+Time-to-first-byte and total latency of /query vs /query/stream for growing answer lengths.
+
+Start the fake LLM and the API first:
+    python -m benchmarks.fake_llm_server --port 9000 &
+    LLM_BASE_URL=http://127.0.0.1:9000/v1 OPENROUTER_API_KEY=fake uvicorn main:app --port 8000 &
+Then: python -m benchmarks.bench_streaming [--api http://127.0.0.1:8000] [--llm http://127.0.0.1:9000]
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+QUERY = "Which shipments were delayed by weather?"
+ANSWER_TOKENS = [20, 100, 400]
+RUNS = 3
+
+
+def time_blocking(api: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    with requests.post(f"{api}/query", json={"query": QUERY}, stream=True) as r:
+        r.raise_for_status()
+        next(r.iter_content(chunk_size=1))
+        ttfb = time.perf_counter() - start
+        for _ in r.iter_content(chunk_size=65536):
+            pass
+    return ttfb, time.perf_counter() - start
+
+
+def time_streaming(api: str) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    ttfb = first_token = None
+    with requests.post(f"{api}/query/stream", json={"query": QUERY}, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines(decode_unicode=True):
+            now = time.perf_counter() - start
+            if ttfb is None and line:
+                ttfb = now
+            if first_token is None and line == "event: token":
+                first_token = now
+    return ttfb, first_token or float("nan"), time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api", default="http://127.0.0.1:8000")
+    parser.add_argument("--llm", default="http://127.0.0.1:9000")
+    args = parser.parse_args()
+
+    print(f"{'tokens':>7} | {'/query ttfb':>12} {'total':>8} | {'/stream ttfb':>12} {'1st token':>10} {'total':>8}")
+    for tokens in ANSWER_TOKENS:
+        requests.post(f"{args.llm}/admin/config", json={"tokens": tokens}).raise_for_status()
+        blocking = [time_blocking(args.api) for _ in range(RUNS)]
+        streaming = [time_streaming(args.api) for _ in range(RUNS)]
+        med = lambda rows, i: statistics.median(r[i] for r in rows) * 1000
+        print(
+            f"{tokens:>7} | {med(blocking, 0):>10.0f}ms {med(blocking, 1):>6.0f}ms | "
+            f"{med(streaming, 0):>10.0f}ms {med(streaming, 1):>8.0f}ms {med(streaming, 2):>6.0f}ms"
+        )
@@ -0,0 +1,40 @@
+"""
+Compares row-wise `generate_summary` against the column-wise `generate_summaries`.
+
+Usage: python -m benchmarks.bench_summary [rows ...]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import make_telemetry
+from summaries import generate_summary, generate_summaries
+
+
+def bench(rows: int) -> dict:
+    df = make_telemetry(rows)
+
+    start = time.perf_counter()
+    expected = df.apply(generate_summary, axis=1)
+    apply_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = generate_summaries(df)
+    vector_secs = time.perf_counter() - start
+
+    assert expected.tolist() == actual.tolist(), "❌ Column-wise summaries differ from generate_summary"
+    return {
+        "rows": rows,
+        "apply_rows_per_sec": rows / apply_secs,
+        "vectorized_rows_per_sec": rows / vector_secs,
+        "speedup": apply_secs / vector_secs,
+    }
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for size in sizes:
+        r = bench(size)
+        print(
+            f"📝 {r['rows']:>9,} rows | apply: {r['apply_rows_per_sec']:>10,.0f} rows/s | "
+            f"vectorized: {r['vectorized_rows_per_sec']:>10,.0f} rows/s | {r['speedup']:.1f}x"
+        )
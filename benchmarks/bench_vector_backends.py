@@ -0,0 +1,114 @@
+"""
+Chroma vs. the mmap float16 index (exact and IVF): recall@k against exact float32 search, QPS and RSS.
+
+Usage: python -m benchmarks.bench_vector_backends [--rows 50000] [--dim 384] [--queries 500] [--nlist 256]
+Each backend is searched in its own process so the RSS numbers don't mix.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from vector_backends import ChromaBackend, MmapBackend, _normalize
+
+BATCH = 32
+INSERT_BATCH = 5000
+
+
+def make_vectors(rows: int, dim: int, seed: int = 0, clusters: int = 200) -> np.ndarray:
+    """Clustered unit vectors, roughly like sentence embeddings of templated summaries."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    return _normalize(centers[rng.integers(clusters, size=rows)] + 0.6 * rng.normal(size=(rows, dim)).astype(np.float32))
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def _measure(kind: str, path: str, queries: np.ndarray, top_k: int, nprobe: int, out):
+    before = rss_mb()
+    if kind == "chroma":
+        backend = ChromaBackend.open(path=path, name="bench")
+    else:
+        backend = MmapBackend(path, nprobe=nprobe)
+    backend.search(queries[:1], top_k)  # exclude open / first-touch from the timing
+    start = time.perf_counter()
+    hits = []
+    for i in range(0, len(queries), BATCH):
+        hits.extend([doc_id for doc_id, _ in pairs] for pairs in backend.search(queries[i:i + BATCH], top_k))
+    elapsed = time.perf_counter() - start
+    out.put({"hits": hits, "qps": len(queries) / elapsed, "rss_mb": rss_mb() - before})
+
+
+def measure(kind: str, path: str, queries: np.ndarray, top_k: int, nprobe: int = 0) -> dict:
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(kind, path, queries, top_k, nprobe, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return result
+
+
+def recall(hits: list[list[str]], truth: list[list[str]]) -> float:
+    return float(np.mean([len(set(h) & set(t)) / len(t) for h, t in zip(hits, truth)]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--no-chroma", action="store_true")
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.rows, args.dim)
+    ids = [f"doc{i:08d}" for i in range(args.rows)]
+    rng = np.random.default_rng(1)
+    queries = _normalize(vectors[rng.integers(args.rows, size=args.queries)]
+                         + 0.3 * rng.normal(size=(args.queries, args.dim)).astype(np.float32))
+
+    # Ground truth: exact float32 cosine search
+    truth = [[ids[j] for j in np.argsort(-(vectors @ q))[:args.top_k]] for q in queries]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        index = MmapBackend(os.path.join(tmp, "mmap"), writable=True)
+        for i in range(0, args.rows, INSERT_BATCH):
+            index.upsert(ids[i:i + INSERT_BATCH], vectors[i:i + INSERT_BATCH])
+        index.flush()
+        print(f"🗂️ mmap index built in {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(os.path.join(tmp, 'mmap', 'vectors.f16')) / 2**20:.1f} MiB of vectors)")
+
+        results = {"mmap exact": measure("mmap", os.path.join(tmp, "mmap"), queries, args.top_k)}
+
+        start = time.perf_counter()
+        index.build_ivf(args.nlist)
+        index.flush()
+        print(f"🗂️ IVF ({args.nlist} lists) built in {time.perf_counter() - start:.2f}s")
+        results[f"mmap ivf/{args.nprobe}"] = measure("mmap", os.path.join(tmp, "mmap"), queries, args.top_k, args.nprobe)
+
+        if not args.no_chroma:
+            start = time.perf_counter()
+            chroma = ChromaBackend.open(path=os.path.join(tmp, "chroma"), name="bench", create=True)
+            # Default L2 space: on unit vectors it ranks exactly like cosine
+            for i in range(0, args.rows, INSERT_BATCH):
+                chroma.upsert(ids[i:i + INSERT_BATCH], vectors[i:i + INSERT_BATCH].tolist(),
+                              documents=None, metadatas=None)
+            print(f"🗂️ Chroma collection built in {time.perf_counter() - start:.2f}s")
+            results["chroma"] = measure("chroma", os.path.join(tmp, "chroma"), queries, args.top_k)
+
+    print(f"\n{'backend':<14} {'recall@' + str(args.top_k):>9} {'QPS':>10} {'ΔRSS MiB':>10}")
+    for name, r in results.items():
+        print(f"{name:<14} {recall(r['hits'], truth):>9.3f} {r['qps']:>10.1f} {r['rss_mb']:>10.1f}")
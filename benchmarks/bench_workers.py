@@ -0,0 +1,171 @@
+"""
+Per-worker memory and throughput scaling of the API: `uvicorn --workers N` (every worker loads
+the encoder, index and analytics frame itself) vs. serve.py (loaded once, workers forked from it).
+
+Usage: python -m benchmarks.bench_workers [--rows 20000] [--workers 1,2,4] [--requests 200] [--output FILE]
+Runs offline like run_all (synthetic rows, fake LLM with a short latency so the encoder and the
+search dominate, throwaway working directory). Memory is read from /proc/<pid>/smaps_rollup,
+so Linux only: RSS counts shared pages in every worker, PSS splits them between the sharers,
+USS (private pages) is what one more worker really costs.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.run_all import REPO, bench_ingest, configure, eval_queries, git_commit, percentiles
+
+MODES = {
+    "uvicorn": lambda n, port: [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(n),
+                                "--port", str(port), "--log-level", "warning"],
+    "prefork": lambda n, port: [sys.executable, str(REPO / "serve.py"), "--workers", str(n),
+                                "--host", "127.0.0.1", "--port", str(port)],
+}
+
+
+# === Memory ===
+def smaps(pid: int) -> dict:
+    """Rss / Pss / Uss (private clean + dirty) of `pid` in MB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss_mb": fields.get("Rss", 0.0), "pss_mb": fields.get("Pss", 0.0),
+            "uss_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0)}
+
+
+def children(pid: int) -> list[int]:
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        # ppid is the 2nd field after the parenthesized command name
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid and b"resource_tracker" not in cmdline:
+            found.append(int(entry))
+    return found
+
+
+def memory(server: subprocess.Popen) -> dict:
+    workers = [smaps(pid) for pid in children(server.pid)]
+    parent = smaps(server.pid)
+    mean = lambda key: sum(w[key] for w in workers) / max(1, len(workers))  # noqa: E731
+    return {
+        "workers_found": len(workers),
+        "worker_rss_mb": mean("rss_mb"),
+        "worker_pss_mb": mean("pss_mb"),
+        "worker_uss_mb": mean("uss_mb"),
+        "parent_rss_mb": parent["rss_mb"],
+        "total_pss_mb": parent["pss_mb"] + sum(w["pss_mb"] for w in workers),
+    }
+
+
+# === One server run ===
+def wait_ready(api: str, server: subprocess.Popen, workers: int, timeout: float = 600):
+    """Until several /ready calls in a row succeed, so every worker (not just the first) is warm."""
+    deadline, streak = time.time() + timeout, 0
+    while streak < 3 * workers:
+        try:
+            streak = streak + 1 if requests.get(f"{api}/ready", timeout=2).status_code == 200 else 0
+        except requests.ConnectionError:
+            streak = 0
+        if time.time() > deadline or server.poll() is not None:
+            raise RuntimeError("API did not become ready")
+        if streak == 0:
+            time.sleep(0.25)
+
+
+def run(mode: str, workers: int, port: int, n_requests: int, concurrency: int, workdir: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(REPO), os.environ.get("PYTHONPATH", "")]),
+           "MAX_CONCURRENT_QUERIES": str(concurrency), "MAX_QUEUED_QUERIES": str(4 * concurrency)}
+    start = time.perf_counter()
+    server = subprocess.Popen(MODES[mode](workers, port), cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    api = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(api, server, workers)
+        result = {"startup_seconds": time.perf_counter() - start}
+
+        def one(query: str) -> tuple[float, int]:
+            t = time.perf_counter()
+            status = requests.post(f"{api}/query", json={"query": query}, timeout=120).status_code
+            return time.perf_counter() - t, status
+
+        texts = eval_queries(n_requests)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, texts[:concurrency]))  # first request per worker loads lazy state
+            t = time.perf_counter()
+            outcomes = list(pool.map(one, texts))
+            wall = time.perf_counter() - t
+        ok = [latency for latency, status in outcomes if status == 200]
+        result.update(percentiles(ok) if ok else {})
+        result["throughput_rps"] = len(ok) / wall
+        result["errors"] = sum(status != 200 for _, status in outcomes)
+        # Measured after the load: pages the workers dirtied while serving count as private
+        result.update(memory(server))
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    default_levels = sorted({n for n in (1, 2, 4, 8, 16, 32) if n <= cores} | {cores})
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--backend", default="mmap", choices=["mmap", "chroma"])
+    parser.add_argument("--workers", default=",".join(map(str, default_levels)))
+    parser.add_argument("--modes", default="uvicorn,prefork")
+    parser.add_argument("--requests", type=int, default=200, help="/query requests per run")
+    parser.add_argument("--concurrency-per-worker", type=int, default=8)
+    parser.add_argument("--llm-port", type=int, default=9102)
+    parser.add_argument("--api-port", type=int, default=8102)
+    parser.add_argument("--llm-first-token-ms", type=float, default=20.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    from benchmarks.fake_llm_server import CONFIG as LLM_CONFIG, serve
+
+    LLM_CONFIG.update(first_token_ms=args.llm_first_token_ms, token_ms=1, tokens=20)
+    llm = serve(args.llm_port)
+    configure(args.llm_port, args.backend)
+    report = {"commit": git_commit(), "cores": cores, "settings": vars(args), "results": {}}
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="logisense-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            print(f"📦 ingest: {args.rows:,} synthetic rows into {args.backend}")
+            bench_ingest(args.rows)
+            print(f"{'mode':<8} {'workers':>7} {'start s':>7} {'rps':>7} {'p50 ms':>7} {'p99 ms':>7} "
+                  f"{'RSS/w':>7} {'PSS/w':>7} {'USS/w':>7} {'PSS tot':>8}")
+            for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+                for n in [int(w) for w in args.workers.split(",")]:
+                    r = run(mode, n, args.api_port, args.requests, n * args.concurrency_per_worker, workdir)
+                    report["results"][f"{mode}.w{n}"] = r
+                    print(f"{mode:<8} {n:>7} {r['startup_seconds']:>7.1f} {r['throughput_rps']:>7.1f} "
+                          f"{r.get('p50_ms', 0):>7.0f} {r.get('p99_ms', 0):>7.0f} {r['worker_rss_mb']:>7.0f} "
+                          f"{r['worker_pss_mb']:>7.0f} {r['worker_uss_mb']:>7.0f} {r['total_pss_mb']:>8.0f}")
+        finally:
+            os.chdir(cwd)
+            llm.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
@@ -0,0 +1,133 @@
+"""
+Minimal OpenAI-compatible chat completions server with configurable latency, for offline benchmarks.
+
+Usage: python -m benchmarks.fake_llm_server [--port 9000] [--first-token-ms 300] [--token-ms 20] [--tokens 120]
+                                           [--prompt-token-ms 0]
+Then point the app at it:  LLM_BASE_URL=http://localhost:9000/v1 OPENROUTER_API_KEY=fake uvicorn main:app
+
+Runtime reconfiguration: POST /admin/config with any of the JSON keys below.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONFIG = {
+    "first_token_ms": 300.0,  # time to first token (or to the full body when not streaming)
+    "token_ms": 20.0,         # per generated token
+    "tokens": 120,            # answer length in tokens
+    "prompt_token_ms": 0.0,   # prefill cost per prompt token (~4 characters), added before the first token
+    "jitter": 0.0,            # fraction of random slowdown, e.g. 0.5 -> up to +50%
+}
+STATS = {"requests": 0, "streamed": 0, "prompt_tokens": 0}
+_lock = threading.Lock()
+
+ROUTER_MARKER = "Classify the logistics query"
+
+
+def _delay(ms: float):
+    time.sleep(ms / 1000 * (1 + random.random() * CONFIG["jitter"]))
+
+
+def _answer(prompt: str, max_tokens: int | None) -> list[str]:
+    if ROUTER_MARKER in prompt:
+        return ["GENERAL"]
+    n = min(CONFIG["tokens"], max_tokens or CONFIG["tokens"])
+    return [f"token{i} " for i in range(n)]
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            with _lock:
+                return self._json(200, {**STATS, "config": CONFIG})
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        if self.path.rstrip("/").endswith("/admin/config"):
+            with _lock:
+                CONFIG.update({k: v for k, v in body.items() if k in CONFIG})
+            return self._json(200, CONFIG)
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._json(404, {"error": "not found"})
+
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        tokens = _answer(prompt, body.get("max_tokens"))
+        prompt_tokens = max(1, len(prompt) // 4)
+        with _lock:
+            STATS["requests"] += 1
+            STATS["prompt_tokens"] += prompt_tokens
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        base = {"id": completion_id, "created": int(time.time()), "model": body.get("model", "fake")}
+
+        prefill_ms = CONFIG["first_token_ms"] + CONFIG["prompt_token_ms"] * prompt_tokens
+        if not body.get("stream"):
+            _delay(prefill_ms + CONFIG["token_ms"] * len(tokens))
+            return self._json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                          "total_tokens": prompt_tokens + len(tokens)},
+            })
+
+        with _lock:
+            STATS["streamed"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(payload):
+            self.wfile.write(f"data: {payload}\n\n".encode())
+            self.wfile.flush()
+
+        _delay(prefill_ms)
+        for i, token in enumerate(tokens):
+            if i:
+                _delay(CONFIG["token_ms"])
+            send(json.dumps({**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}))
+        send(json.dumps({**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        send("[DONE]")
+
+
+def serve(port: int = 9000) -> ThreadingHTTPServer:
+    """Starts the server on a background thread and returns it (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--first-token-ms", type=float, default=CONFIG["first_token_ms"])
+    parser.add_argument("--token-ms", type=float, default=CONFIG["token_ms"])
+    parser.add_argument("--tokens", type=int, default=CONFIG["tokens"])
+    parser.add_argument("--jitter", type=float, default=CONFIG["jitter"])
+    parser.add_argument("--prompt-token-ms", type=float, default=CONFIG["prompt_token_ms"])
+    args = parser.parse_args()
+    CONFIG.update(first_token_ms=args.first_token_ms, token_ms=args.token_ms, tokens=args.tokens, jitter=args.jitter,
+                  prompt_token_ms=args.prompt_token_ms)
+
+    print(f"🤖 Fake LLM server on http://127.0.0.1:{args.port}/v1 ({CONFIG})")
+    ThreadingHTTPServer(("127.0.0.1", args.port), Handler).serve_forever()
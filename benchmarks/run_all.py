@@ -0,0 +1,297 @@
+"""
+Offline end-to-end benchmark suite: synthetic telemetry, the fake LLM server and a throwaway
+working directory, so nothing touches the real stores or the network.
+
+Usage:
+    python -m benchmarks.run_all [--rows 20000] [--scenarios retrieval,query,maps] [--output FILE]
+    python -m benchmarks.run_all --compare BASELINE.json CANDIDATE.json [--tolerance 0.10]
+
+Scenarios (ingest always runs first: it builds the data the others use):
+    ingest     rows/sec of ingest.py (seed master store -> summaries -> embeddings -> vector store)
+    retrieval  per-query and batched QPS, known-item recall@k (a row's own summary must retrieve it)
+    query      /query p50/p99 latency and throughput per concurrency level (uvicorn + fake LLM)
+    maps       marker / heatmap / hotspot map generation time
+Results go to JSON (default benchmarks/results/<commit>-<timestamp>.json). --compare prints the
+relative change of every metric and exits with status 1 if one regressed beyond --tolerance.
+The embedding model must be available locally (it is loaded from the sentence-transformers cache).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+EVAL_PATH = REPO / "benchmarks" / "router_eval.csv"
+RESULTS_DIR = REPO / "benchmarks" / "results"
+
+# Metric name suffixes and which direction is better (anything else is informational)
+LOWER_IS_BETTER = ("_ms", "_seconds", "errors", "rejected")
+HIGHER_IS_BETTER = ("_per_sec", "qps", "recall", "_rps")
+
+
+def configure(llm_port: int, backend: str):
+    """Points every component at the fake LLM and keeps caches from hiding the work being measured."""
+    os.environ.update({
+        "VECTOR_BACKEND": backend,
+        "LLM_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "OPENROUTER_API_KEY": "fake",
+        "ROUTER_MODE": "local",
+        "ANSWER_CACHE_TTL_SECONDS": "0",   # every answer entry is already expired
+        "SEMANTIC_CACHE_THRESHOLD": "2",   # cosine similarity never reaches it
+        "ANSWER_CACHE_PATH": "",
+        "SLOW_QUERY_SECONDS": "inf",
+    })
+    if str(REPO) not in sys.path:
+        sys.path.insert(0, str(REPO))
+
+
+def eval_queries(n: int) -> list[str]:
+    import pandas as pd
+    pool = pd.read_csv(EVAL_PATH)["query"].tolist()
+    # Distinct strings, so the query-embedding LRU can't hide the encode cost
+    return [f"{pool[i % len(pool)]} (report {i})" for i in range(n)]
+
+
+def percentiles(latencies: list[float]) -> dict:
+    import numpy as np
+    ms = np.array(latencies) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99))}
+
+
+# === Scenarios ===
+def bench_ingest(rows: int) -> dict:
+    import ingest
+    from benchmarks.synthetic import make_telemetry
+    from summaries import generate_summaries
+
+    df = make_telemetry(rows)
+    df["summary"] = generate_summaries(df)
+    os.makedirs(os.path.dirname(ingest.DATA_PATH), exist_ok=True)
+    df.to_csv(ingest.DATA_PATH, index=False)
+
+    start = time.perf_counter()
+    ingest.ingest(rebuild=True)
+    seconds = time.perf_counter() - start
+    # Second run: nothing changed, so this is the cost of the fingerprint diff alone
+    start = time.perf_counter()
+    ingest.ingest()
+    resync = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds, "resync_seconds": resync}
+
+
+def bench_retrieval(queries: int, top_k: int) -> dict:
+    import numpy as np
+    from agents import retriever_agent
+
+    texts = eval_queries(queries)
+    quiet = contextlib.redirect_stdout(io.StringIO())  # retrieve_documents prints every query
+    retriever_agent.retrieve_documents_batch(texts[:2], top_k)  # model / index load
+
+    retriever_agent.clear_query_embeddings()
+    start = time.perf_counter()
+    with quiet:
+        for text in texts:
+            retriever_agent.retrieve_documents(text, top_k)
+    single = time.perf_counter() - start
+
+    retriever_agent.clear_query_embeddings()
+    start = time.perf_counter()
+    retriever_agent.retrieve_documents_batch(texts, top_k)
+    batched = time.perf_counter() - start
+
+    # Known-item recall: each sampled row's own summary should bring that row back
+    rows = retriever_agent.get_store().read(columns=["doc_id", "summary"])
+    sample = rows.sample(min(queries, len(rows)), random_state=0)
+    hits = retriever_agent.retrieve_documents_batch(sample["summary"].tolist(), top_k)
+    recall = np.mean([doc_id in {d["id"] for d in found} for doc_id, found in zip(sample["doc_id"], hits)])
+    return {"queries": queries, "per_query_qps": queries / single, "batched_qps": queries / batched,
+            "known_item_recall": float(recall)}  # at settings.top_k; the name must end in "recall" for --compare
+
+
+def bench_query(levels: list[int], requests_per_level: int, port: int, workdir: str) -> dict:
+    import requests
+
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(REPO), os.environ.get("PYTHONPATH", "")])}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    api = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 300
+        while True:
+            try:
+                if requests.get(f"{api}/ready", timeout=2).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                pass
+            if time.time() > deadline or server.poll() is not None:
+                raise RuntimeError("API did not become ready")
+            time.sleep(0.5)
+
+        def one(query: str) -> tuple[float, int]:
+            start = time.perf_counter()
+            status = requests.post(f"{api}/query", json={"query": query}, timeout=120).status_code
+            return time.perf_counter() - start, status
+
+        results = {}
+        texts = eval_queries(requests_per_level * len(levels))
+        for i, concurrency in enumerate(levels):
+            batch = texts[i * requests_per_level:(i + 1) * requests_per_level]
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(one, batch))
+            wall = time.perf_counter() - start
+            ok = [latency for latency, status in outcomes if status == 200]
+            results[f"c{concurrency}"] = {
+                **(percentiles(ok) if ok else {}),
+                "throughput_rps": len(ok) / wall,
+                "rejected": sum(status == 429 for _, status in outcomes),
+                "errors": sum(status not in (200, 429) for _, status in outcomes),
+            }
+            print(f"   concurrency {concurrency:>3}: {results[f'c{concurrency}']}")
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def bench_maps(points: list[int]) -> dict:
+    from agents.spatial_agent import MAP_COLUMNS, plot_delay_clusters, plot_hotspots
+    from benchmarks.synthetic import make_telemetry
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        path = os.path.join(tmp, "map.html")
+        for n in points:
+            records = make_telemetry(n)[MAP_COLUMNS].to_dict(orient="records")
+            start = time.perf_counter()
+            plot_delay_clusters(records, output_path=path)
+            results[f"points_{n}_seconds"] = time.perf_counter() - start
+        # Hotspots read the geo grid index the ingest step built
+        start = time.perf_counter()
+        if plot_hotspots("fatigue", output_path=path):
+            results["hotspots_seconds"] = time.perf_counter() - start
+    return results
+
+
+# === Results ===
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline_path: str, candidate_path: str, tolerance: float) -> int:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    old, new = flatten(baseline["results"]), flatten(candidate["results"])
+
+    print(f"📊 {baseline.get('commit')} -> {candidate.get('commit')} (tolerance {tolerance:.0%})")
+    print(f"{'metric':<40} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        a, b = old[name], new[name]
+        change = (b - a) / abs(a) if a else (float("inf") if b > 0 else 0.0)
+        worse = (change > tolerance if name.endswith(LOWER_IS_BETTER)
+                 else -change > tolerance if name.endswith(HIGHER_IS_BETTER) else False)
+        if worse:
+            regressions.append(name)
+        print(f"{name:<40} {a:>12.4g} {b:>12.4g} {change:>+8.1%}{'  ❌' if worse else ''}")
+    for name in sorted(old.keys() ^ new.keys()):
+        print(f"{name:<40} only in {'baseline' if name in old else 'candidate'}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"))
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--scenarios", default="retrieval,query,maps")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--backend", default="mmap", choices=["mmap", "chroma"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=64, help="/query requests per concurrency level")
+    parser.add_argument("--map-points", default="1000,10000")
+    parser.add_argument("--llm-port", type=int, default=9100)
+    parser.add_argument("--api-port", type=int, default=8100)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0)
+    parser.add_argument("--llm-tokens", type=int, default=60)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.tolerance))
+
+    from benchmarks.fake_llm_server import CONFIG as LLM_CONFIG, serve
+
+    LLM_CONFIG.update(first_token_ms=args.llm_first_token_ms, token_ms=args.llm_token_ms, tokens=args.llm_tokens)
+    llm = serve(args.llm_port)
+    configure(args.llm_port, args.backend)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    output = Path(args.output).resolve() if args.output else None
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {**vars(args), "fake_llm": dict(LLM_CONFIG)},
+        "results": {},
+    }
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="logisense-bench-") as workdir:
+        # Every relative store path (data/, embedding_cache, static/maps, ...) now lands in the throwaway dir
+        os.chdir(workdir)
+        try:
+            print(f"📦 ingest: {args.rows:,} synthetic rows into {args.backend}")
+            report["results"]["ingest"] = bench_ingest(args.rows)
+            if "retrieval" in scenarios:
+                print("🔍 retrieval")
+                report["results"]["retrieval"] = bench_retrieval(args.queries, args.top_k)
+            if "query" in scenarios:
+                print("🌐 /query under concurrency")
+                levels = [int(c) for c in args.concurrency.split(",")]
+                report["results"]["query"] = bench_query(levels, args.requests, args.api_port, workdir)
+            if "maps" in scenarios:
+                print("🗺️ maps")
+                report["results"]["maps"] = bench_maps([int(p) for p in args.map_points.split(",")])
+        finally:
+            os.chdir(cwd)
+            llm.shutdown()
+
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"{report['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"💾 Results written to {output}")
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+# === Telemetry schema (column -> (low, high) uniform range) ===
+NUMERIC_RANGES = {
+    "vehicle_gps_latitude": (30.0, 50.0),
+    "vehicle_gps_longitude": (-120.0, -70.0),
+    "fuel_consumption_rate": (5.0, 20.0),
+    "eta_variation_hours": (-2.0, 5.0),
+    "traffic_congestion_level": (0.0, 10.0),
+    "warehouse_inventory_level": (0.0, 1000.0),
+    "loading_unloading_time": (0.5, 5.0),
+    "handling_equipment_availability": (0.0, 1.0),
+    "order_fulfillment_status": (0.0, 1.0),
+    "weather_condition_severity": (0.0, 1.0),
+    "port_congestion_level": (0.0, 10.0),
+    "shipping_costs": (100.0, 1000.0),
+    "supplier_reliability_score": (0.0, 1.0),
+    "lead_time_days": (1.0, 15.0),
+    "historical_demand": (100.0, 10000.0),
+    "iot_temperature": (-10.0, 40.0),
+    "cargo_condition_status": (0.0, 1.0),
+    "route_risk_level": (0.0, 10.0),
+    "customs_clearance_time": (0.5, 5.0),
+    "driver_behavior_score": (0.0, 1.0),
+    "fatigue_monitoring_score": (0.0, 1.0),
+    "disruption_likelihood_score": (0.0, 1.0),
+    "delay_probability": (0.0, 1.0),
+    "delivery_time_deviation": (-2.0, 10.0),
+}
+RISK_CLASSES = np.array(["Low Risk", "Moderate Risk", "High Risk"], dtype=object)
+
+
+def make_telemetry(rows: int, seed: int = 0, start: str = "2021-01-01", freq: str = "h") -> pd.DataFrame:
+    """
+    Generates `rows` synthetic telemetry records with the columns `generate_summary` expects.
+    """
+    rng = np.random.default_rng(seed)
+    data = {"timestamp": pd.date_range(start, periods=rows, freq=freq).strftime("%Y-%m-%d %H:%M:%S")}
+    for column, (low, high) in NUMERIC_RANGES.items():
+        data[column] = rng.uniform(low, high, rows)
+    data["risk_classification"] = RISK_CLASSES[rng.integers(0, len(RISK_CLASSES), rows)]
+    return pd.DataFrame(data)
@@ -1,16 +1,18 @@
-import re
 import pandas as pd
 from graph import supply_chain_graph
+from agents.retriever_agent import fetch_records
 from agents.spatial_agent import plot_delay_clusters
-from session_context import load_session, save_session
+from session_context import followup_top_n, load_session, save_session
+from startup import warm_up, print_report
+import deadline
+import metrics
 
-print("✅ Available collections: ['telemetry_docs']")
+# Load everything up front so the first question isn't slow
+warm_up()
+print_report()
 print("🧠 Multi-Agent RAG Chatbot Ready")
 print("💬 Type your query (or 'exit' to quit)")
 
-# Load session if any
-session = load_session()
-
 while True:
     user_input = input("\n🧑 You: ").strip()
     if user_input.lower() in ("exit", "quit"):
@@ -18,21 +20,20 @@ while True:
         break
 
     # ===== Check for record-related query =====
-    record_match = re.search(r"\b(top|show|give)\b.*\b(record|row|shipment|entry)\b", user_input.lower())
-    number_match = re.search(r"\btop\s*(\d+)", user_input.lower())
-    top_n = int(number_match.group(1)) if number_match else 5
+    top_n = followup_top_n(user_input)
 
-    if record_match:
-        last_docs = session.get("last_documents", [])
-        if last_docs:
-            # ✅ Context exists — treat as follow-up
-            df = pd.DataFrame(last_docs[:top_n])
+    if top_n is not None:
+        last_ids = load_session()["last_doc_ids"]
+        if last_ids:
+            # ✅ Context exists — treat as follow-up (rows rehydrated from the master store by ID)
+            rows = fetch_records(last_ids[:top_n])
+            df = pd.DataFrame(rows)
             if df.empty:
                 print("⚠️ No records found in previous response.")
             else:
                 print(f"\n📄 Top {top_n} Supporting Records:\n")
                 print(df.to_markdown(index=False))
-                plot_delay_clusters(last_docs[:top_n])
+                plot_delay_clusters(rows)
             continue
         else:
             # ❌ No context — treat as new primary query
@@ -41,7 +42,9 @@ while True:
     # ===== Normal LangGraph execution =====
     input_state = {"query": user_input}
     try:
-        result = supply_chain_graph.invoke(input_state)
+        # Logs the stage breakdown if the answer was slow; LLM calls fall back once the budget is spent
+        with metrics.trace("cli", user_input), deadline.budget():
+            result = supply_chain_graph.invoke(input_state)
     except Exception as e:
         print(f"❌ LangGraph error: {e}")
         continue
@@ -51,15 +54,14 @@ while True:
     if response:
         print("\n✅ Final Response:\n" + response)
 
-    # 💾 Save documents in session
+    # 💾 Save document IDs in session
     docs = result.get("documents", [])
-    rows = [doc["metadata"]["row"] for doc in docs if isinstance(doc, dict) and "metadata" in doc and "row" in doc["metadata"]]
-    save_session(user_input, rows)
+    save_session(user_input, docs)
 
     # 🗺️ Plot map if prompt requests it
     if "map" in user_input.lower() or "plot" in user_input.lower():
         if docs:
             try:
-                plot_delay_clusters([doc["summary"] for doc in docs])
+                plot_delay_clusters(fetch_records(docs))
             except Exception as e:
                 print(f"⚠️ Map generation error: {e}")
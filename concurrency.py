@@ -0,0 +1,53 @@
+# concurrency.py
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight requests and the queue in front of them.
+
+    Requests beyond `max_concurrent` wait for a slot; once `max_waiting` are already
+    waiting (or a slot doesn't free up within `timeout` seconds) the request is
+    rejected with 429 instead of queuing without bound.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int, timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        raise HTTPException(status_code=429, detail=f"Server busy: {reason}", headers={"Retry-After": "1"})
+
+    async def acquire(self):
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self._reject("too many queued requests")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._reject("timed out waiting for a slot")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
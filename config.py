@@ -0,0 +1,89 @@
+# config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# === Vector store / embeddings ===
+CHROMA_PATH = os.getenv("CHROMA_PATH", "chroma_store")
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "telemetry_docs")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# === Vector backend ===
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # "chroma" or "mmap" (in-process float16 index)
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "data/vector_index")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))     # mmap only: >0 builds a coarse quantizer with this many lists
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))   # lists scanned per query when the quantizer exists
+VECTOR_SHARDING = os.getenv("VECTOR_SHARDING", "month")  # "month" (one shard per YYYY-MM) or "none"
+SHARD_SEARCH_WORKERS = int(os.getenv("SHARD_SEARCH_WORKERS", "4"))  # shards searched in parallel
+
+# === Records ===
+# Columns returned as top_records (comma-separated); empty -> every raw telemetry column
+RECORD_COLUMNS = [c.strip() for c in os.getenv("RECORD_COLUMNS", "").split(",") if c.strip()]
+
+# === Maps ===
+MAP_HEATMAP_THRESHOLD = int(os.getenv("MAP_HEATMAP_THRESHOLD", "5000"))  # more points -> heatmap instead of markers
+MAP_CACHE_DIR = os.getenv("MAP_CACHE_DIR", "static/maps")  # served under /maps
+MAP_CACHE_MAX_BYTES = int(os.getenv("MAP_CACHE_MAX_BYTES", str(256 * 2**20)))
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")  # used in returned map URLs
+GEO_INDEX_PATH = os.getenv("GEO_INDEX_PATH", "data/geo_index")
+GEO_GRID_DEGREES = float(os.getenv("GEO_GRID_DEGREES", "0.1"))  # grid cell size (~11 km of latitude)
+
+# === Reasoning context ===
+CONTEXT_MODE = os.getenv("CONTEXT_MODE", "table")  # "table" (compact key fields per row) or "summaries" (prose)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))  # estimated tokens for the retrieved context
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.9"))  # word-shingle Jaccard for near-duplicate prose
+
+# === LLM (OpenRouter-compatible) ===
+LLM_MODEL = os.getenv("LLM_MODEL", "mistralai/mistral-7b-instruct")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+
+# === Deadlines (see deadline.py) ===
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "20"))    # per query, across every LLM call
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "15"))          # cap for one reasoning call
+ROUTER_LLM_TIMEOUT_SECONDS = float(os.getenv("ROUTER_LLM_TIMEOUT_SECONDS", "3"))  # routing falls back quickly
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))                     # client-level retries on errors
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))        # hedge past this latency; 0 disables
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))        # calls observed before hedging starts
+
+# === Startup ===
+# Warm every component when the API starts instead of on the first request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+
+# === Serving ===
+MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "8"))   # graph runs in flight
+MAX_QUEUED_QUERIES = int(os.getenv("MAX_QUEUED_QUERIES", "16"))          # waiting beyond this -> 429
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "10"))  # max wait for a slot -> 429
+ENCODE_WORKERS = int(os.getenv("ENCODE_WORKERS", "2"))                   # threads for CPU-bound encoding
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))  # memoized query vectors
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "256"))           # per /query/batch request
+# Prefork serving (serve.py): components loaded once in the parent and shared with the forked workers
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "0"))                     # worker processes; 0 -> one per CPU core
+SERVE_PRELOAD = os.getenv("SERVE_PRELOAD", "embedding_model,router_centroids,vector_store,analytics_engine")
+SERVE_TORCH_THREADS = int(os.getenv("SERVE_TORCH_THREADS", "0"))         # encoder threads per worker; 0 -> cores / workers
+
+# === Sessions (follow-up "show top N records" context) ===
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory" (per process) or "sqlite" (persistent, shared)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sessions.sqlite")
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))  # least recently used beyond this are dropped
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))   # idle sessions expire
+SESSION_MAX_DOC_IDS = int(os.getenv("SESSION_MAX_DOC_IDS", "50"))        # doc IDs kept per session
+
+# === Observability ===
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "5"))           # requests at least this slow are logged
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "logs/slow_queries.jsonl")   # JSON lines with the stage breakdown; empty -> stdout only
+INGEST_METRICS_PATH = os.getenv("INGEST_METRICS_PATH", "logs/ingest_metrics.prom")  # last ingest run, served by /metrics
+METRICS_SHARED_DIR = os.getenv("METRICS_SHARED_DIR", "logs/worker_metrics")  # serve.py workers' histograms, summed by /metrics
+
+# === Routing ===
+ROUTER_MODE = os.getenv("ROUTER_MODE", "local")  # "local" (embedding centroids) or "llm"
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.35"))  # cosine similarity
+ROUTER_LLM_FALLBACK = os.getenv("ROUTER_LLM_FALLBACK", "1") == "1"  # ask the LLM below the threshold
+
+# === Answer cache ===
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "")  # set to a file path to persist across restarts
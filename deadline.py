@@ -0,0 +1,154 @@
+# deadline.py
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Awaitable, Callable
+
+from config import LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_PERCENTILE, LLM_TIMEOUT_SECONDS, REQUEST_BUDGET_SECONDS
+
+LATENCY_WINDOW = 200       # recent successful calls per LLM kept for the hedge threshold
+MIN_CALL_SECONDS = 0.05    # less budget than this left -> don't even start the call
+
+_budget: contextvars.ContextVar["Budget | None"] = contextvars.ContextVar("budget", default=None)
+_latencies: dict[str, deque] = {}
+_latencies_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+
+class DeadlineExceeded(Exception):
+    """The request's latency budget ran out before (or while) calling the LLM."""
+
+
+class Budget:
+    """Absolute deadline of one request, plus why its answer was degraded (if it was)."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+        self.degraded: list[str] = []
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+@contextmanager
+def budget(seconds: float | None = None):
+    """
+    Runs the block under a latency budget (default REQUEST_BUDGET_SECONDS). Every LLM call
+    inside it, including those in graph nodes and worker threads started from it, is cut
+    off when the budget is spent.
+    """
+    current = Budget(REQUEST_BUDGET_SECONDS if seconds is None else seconds)
+    _budget.set(current)
+    try:
+        yield current
+    finally:
+        # Not reset via token: async generators may finish in a different context than they started
+        _budget.set(None)
+
+
+def current_budget() -> Budget | None:
+    return _budget.get()
+
+
+def degrade(reason: str):
+    """Records that a fallback replaced an LLM result for the current request."""
+    print(f"⏳ Degraded: {reason}")
+    current = _budget.get()
+    if current is not None:
+        current.degraded.append(reason)
+
+
+def call_timeout(cap: float = LLM_TIMEOUT_SECONDS) -> float:
+    """Seconds the next LLM call may take: `cap`, or less if the request budget ends sooner."""
+    current = _budget.get()
+    timeout = cap if current is None else min(cap, current.remaining())
+    if timeout < MIN_CALL_SECONDS:
+        raise DeadlineExceeded("request budget exhausted")
+    return timeout
+
+
+# === Hedging: a second identical request once the first is slower than usual ===
+def _record(name: str, seconds: float):
+    with _latencies_lock:
+        _latencies.setdefault(name, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def hedge_after(name: str) -> float | None:
+    """The LLM_HEDGE_PERCENTILE latency of recent `name` calls, or None (no hedging) until there are enough."""
+    if LLM_HEDGE_PERCENTILE <= 0:
+        return None
+    with _latencies_lock:
+        samples = sorted(_latencies.get(name, ()))
+    if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * LLM_HEDGE_PERCENTILE / 100))]
+
+
+async def acall(name: str, make_call: Callable[[], Awaitable], cap: float = LLM_TIMEOUT_SECONDS):
+    """
+    Awaits `make_call()` within the call timeout. If it hasn't answered after the hedge
+    threshold, an identical second call is started and the first successful answer wins (the
+    other is cancelled). Raises DeadlineExceeded, or the first call's error once every attempt
+    has failed, instead of hanging.
+    """
+    timeout = call_timeout(cap)
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(make_call())]
+    try:
+        threshold = hedge_after(name)
+        if threshold is not None and threshold < timeout:
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            if not done:
+                tasks.append(asyncio.ensure_future(make_call()))
+        pending, errors = set(tasks), []
+        # A failed attempt doesn't end the call while another one may still answer in time
+        while pending:
+            left = timeout - (time.perf_counter() - start)
+            done, pending = await asyncio.wait(pending, timeout=max(left, 0), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"{name} gave no answer within {timeout:.1f}s")
+            for task in done:
+                if task.exception() is None:
+                    _record(name, time.perf_counter() - start)
+                    return task.result()
+                errors.append(task.exception())
+        raise errors[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def call(name: str, make_call: Callable[[], object], cap: float = LLM_TIMEOUT_SECONDS):
+    """
+    Blocking `acall` for the sync graph (CLIs). A losing call can't be cancelled mid-request;
+    it finishes in the background, bounded by the client's own timeout.
+    """
+    timeout = call_timeout(cap)
+    start = time.perf_counter()
+    futures = [_executor.submit(contextvars.copy_context().run, make_call)]
+    threshold = hedge_after(name)
+    if threshold is not None and threshold < timeout:
+        done, _ = wait(futures, timeout=threshold)
+        if not done:
+            futures.append(_executor.submit(contextvars.copy_context().run, make_call))
+    try:
+        pending, errors = set(futures), []
+        while pending:
+            left = timeout - (time.perf_counter() - start)
+            done, pending = wait(pending, timeout=max(left, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"{name} gave no answer within {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    _record(name, time.perf_counter() - start)
+                    return future.result()
+                errors.append(future.exception())
+        raise errors[0]
+    finally:
+        for future in futures:
+            future.cancel()
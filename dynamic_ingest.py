@@ -1,91 +1,121 @@
 import os
+import time
 import pandas as pd
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
-from chromadb import PersistentClient
+
+from summaries import generate_summaries
+from config import EMBEDDING_MODEL, VECTOR_BACKEND
+from embedding_cache import CACHE_PATH, CachedEncoder
+from ingest_pipeline import CHUNK_SIZE, ENCODE_BATCH_SIZE, read_csv_chunks, run_pipeline, upsert_chunk, print_report
+from geo_index import GEO_COLUMNS, GeoIndex, sync_geo_index
+from master_store import STORE_PATH, MasterStore
+from vector_backends import open_backend
 
 # === Config ===
-MASTER_PATH = "data/master.csv"         
+MASTER_PATH = "data/master.csv"         # legacy CSV master, migrated into the store once
 NEW_DATA_PATH = "data/new_data.csv"     
-CHROMA_PATH = "chroma_store"
-COLLECTION_NAME = "telemetry_docs"
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-
-
-
-def classify(value, low=0.3, high=0.7):
-    if pd.isna(value):
-        return "unknown"
-    if value < low:
-        return "low"
-    elif value < high:
-        return "moderate"
-    else:
-        return "high"
-
-
-def generate_summary(row):
-    return (
-        f"On {row['timestamp']}, a shipment near GPS ({row['vehicle_gps_latitude']:.2f}, {row['vehicle_gps_longitude']:.2f}) "
-        f"experienced {classify(row['traffic_congestion_level'])} traffic congestion, "
-        f"{classify(row['fuel_consumption_rate'])} fuel consumption, and "
-        f"{classify(1 - row['fatigue_monitoring_score'])} driver fatigue. "
-        f"Supplier reliability was {classify(row['supplier_reliability_score'])}, "
-        f"with delay probability marked as {round(row['delay_probability'], 2)}. "
-        f"Warehouse inventory was {classify(row['warehouse_inventory_level'])}, and shipping costs were {classify(row['shipping_costs'])}. "
-        f"Weather conditions were {classify(row['weather_condition_severity'])}, and "
-        f"customs clearance took approximately {round(row['customs_clearance_time'], 1)} hours. "
-        f"Port congestion was {classify(row['port_congestion_level'])}, route risk level was {classify(row['route_risk_level'])}, and "
-        f"driver behavior score was {classify(row['driver_behavior_score'])}. "
-        f"The temperature was {round(row['iot_temperature'], 1)}°C and historical demand was {round(row['historical_demand'], 1)} units. "
-        f"Lead time was {round(row['lead_time_days'], 1)} days and order fulfillment was {classify(row['order_fulfillment_status'])}. "
-        f"The disruption likelihood was {classify(row['disruption_likelihood_score'])}. "
-        f"The cargo condition was {classify(row['cargo_condition_status'])}, and handling equipment availability was {classify(row['handling_equipment_availability'])}. "
-        f"Loading/unloading time was {classify(row['loading_unloading_time'])}. "
-        f"Overall, the risk classification was marked as {row['risk_classification']}."
-    )
-
-
-def update_data():
-    # Load new and master data
-    new_df = pd.read_csv(NEW_DATA_PATH)
-    if os.path.exists(MASTER_PATH):
-        master_df = pd.read_csv(MASTER_PATH)
-        combined_df = pd.concat([master_df, new_df]).drop_duplicates(subset=["timestamp"])
+DELETED_DATA_PATH = "data/deleted_data.csv"  # rows (or doc_ids) to tombstone
+EMBEDDING_CACHE_PATH = CACHE_PATH
+MASTER_STORE_PATH = STORE_PATH
+
+
+
+def read_deleted_ids(store: MasterStore, path: str = DELETED_DATA_PATH) -> list[str]:
+    """
+    Doc IDs of the rows listed in `path` (either a `doc_id` column or the ID columns).
+    """
+    if not os.path.exists(path):
+        return []
+    ids = []
+    for chunk in pd.read_csv(path, chunksize=CHUNK_SIZE):
+        ids.extend(chunk["doc_id"].astype(str) if "doc_id" in chunk.columns else store.row_ids(chunk))
+    return list(dict.fromkeys(ids))
+
+
+def delete_data(store: MasterStore, backend, ids: list[str], geo: GeoIndex | None = None) -> int:
+    """
+    Tombstones the live rows among `ids` in the master store and the vector store.
+    """
+    deleted = 0
+    for start in range(0, len(ids), CHUNK_SIZE):
+        batch = ids[start:start + CHUNK_SIZE]
+        if geo is not None:
+            geo.update(removed=store.fetch(batch, GEO_COLUMNS))
+        live = store.delete(batch)
+        backend.delete(live)
+        deleted += len(live)
+    return deleted
+
+
+def update_data(chunk_size: int = CHUNK_SIZE):
+    store = MasterStore(MASTER_STORE_PATH)
+    migrated = store.seed_from_csv(MASTER_PATH, chunk_size)
+    if migrated:
+        print(f"📦 Migrated {migrated} rows from {MASTER_PATH} into {MASTER_STORE_PATH}")
+
+    encoder = CachedEncoder(EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, batch_size=ENCODE_BATCH_SIZE)
+    # Grid aggregates are patched per chunk when they match the store; otherwise rebuilt at the end
+    geo = GeoIndex()
+    geo_incremental = geo.is_current(store)
+
+    print(f"📦 Updating {VECTOR_BACKEND} vector store...")
+    backend = open_backend(VECTOR_BACKEND, create=True)
+
+    # Deletes go first and win: a row listed in both files is tombstoned once and then skipped,
+    # instead of being re-embedded, re-upserted and tombstoned again on every run
+    doomed = read_deleted_ids(store)
+    deleted = delete_data(store, backend, doomed, geo=geo if geo_incremental else None)
+    doomed = set(doomed)
+
+    progress = tqdm(desc="📝 Ingesting new entries", unit="rows")
+
+    def prepare(chunk):
+        if doomed:
+            ids = chunk["doc_id"].astype(str) if "doc_id" in chunk.columns else store.row_ids(chunk)
+            chunk = chunk[~ids.isin(doomed).to_numpy()]
+        # Index lookup only: cost is O(chunk), not O(history); unchanged rows drop out here
+        chunk = store.diff(chunk).copy()
+        chunk["summary"] = generate_summaries(chunk)
+        return chunk
+
+    def write(chunk, embeddings):
+        try:
+            upsert_chunk(backend, chunk, embeddings)
+            # Old copies of updated rows leave the grid, the new ones enter it
+            previous = store.fetch(chunk["doc_id"].tolist(), GEO_COLUMNS) if geo_incremental else None
+            # Persist to master only after the vector store accepted the rows
+            store.append(chunk)
+        finally:
+            # A failed write must not leave its rows reserved: a retry would skip them as in flight
+            store.release(chunk["doc_id"])
+        if geo_incremental:
+            geo.update(added=chunk, removed=previous)
+        progress.update(len(chunk))
+
+    start = time.perf_counter()
+    try:
+        stats = run_pipeline(read_csv_chunks(NEW_DATA_PATH, chunk_size), prepare, encoder.encode, write)
+    finally:
+        # Chunks diffed but never written (a later stage failed) give back their reservations too
+        store.release()
+        progress.close()
+
+    backend.flush()
+    if geo_incremental:
+        geo.save(store.version)
     else:
-        combined_df = new_df
+        sync_geo_index(store, geo)
+    if deleted:
+        print(f"🪦 Tombstoned {deleted} deleted records.")
 
-    # Generate summaries only for new data
-    new_entries = combined_df[~combined_df["timestamp"].isin(master_df["timestamp"])] if 'master_df' in locals() else combined_df
-    if new_entries.empty:
-        print("⚠️ No new data found to ingest.")
+    if stats["write"].rows == 0:
+        print("⚠️ No new or changed data found to ingest.")
         return
 
-    print(f"📝 Generating summary for {len(new_entries)} new entries...")
-    new_entries["summary"] = new_entries.apply(generate_summary, axis=1)
-
-    # Update combined DataFrame
-    updated_df = pd.concat([master_df, new_entries]) if 'master_df' in locals() else new_entries
-    updated_df.to_csv(MASTER_PATH, index=False)
-    print(f"✅ Master file updated: {MASTER_PATH}")
-
-    # Generate embeddings
-    print("🧠 Generating sentence embeddings...")
-    model = SentenceTransformer(EMBEDDING_MODEL)
-    embeddings = model.encode(new_entries["summary"].tolist(), show_progress_bar=True, batch_size=32)
-
-    # Initialize Chroma
-    print("📦 Updating ChromaDB vector store...")
-    client = PersistentClient(path=CHROMA_PATH)
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
-
-    ids = [f"{row['timestamp']}" for _, row in new_entries.iterrows()]
-    collection.add(
-        documents=new_entries["summary"].tolist(),
-        embeddings=embeddings,
-        ids=ids
-    )
-    print(f"✅ Ingested {len(new_entries)} new records into ChromaDB.")
+    print(f"✅ Master store updated: {MASTER_STORE_PATH} (watermark {store.watermark})")
+    print(f"✅ Upserted {stats['write'].rows} new/changed records into {VECTOR_BACKEND}, skipped {stats['prepare'].rows - stats['write'].rows} unchanged.")
+    print_report(stats, time.perf_counter() - start)
+    print(encoder.cache.report())
 
 
 if __name__ == "__main__":
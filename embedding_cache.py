@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Iterable
+
+import numpy as np
+
+# === Config ===
+CACHE_PATH = "embedding_cache"
+KEY_BYTES = 16
+
+
+def cache_key(model_name: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{model_name}\x00{text}".encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of embeddings keyed by hash(model name + text).
+
+    Layout under `path`:
+        meta.json    -> {"dim": 384}
+        keys.bin     -> append-only KEY_BYTES digests, one per row
+        vectors.f32  -> append-only float32 matrix (rows x dim), opened with np.memmap
+
+    Both files only ever grow, so a crash mid-write leaves at most a torn tail,
+    which is ignored on the next load.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, model_name: str = ""):
+        self.path = path
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: set[bytes] = set()
+        self._mmap = None
+
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.json")
+        self._keys_path = os.path.join(path, "keys.bin")
+        self._vectors_path = os.path.join(path, "vectors.f32")
+
+        self.dim = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.dim = json.load(f).get("dim")
+        self._load_index()
+
+    # === Index ===
+    def _load_index(self):
+        self._rows: dict[bytes, int] = {}
+        if self.dim is None or not os.path.exists(self._keys_path):
+            self._count = 0
+            # Vectors without their keys (e.g. a crash inside compact) can't be matched to anything;
+            # keeping them would pair the next appended key with a stale row
+            if os.path.exists(self._vectors_path):
+                os.truncate(self._vectors_path, 0)
+            return
+        with open(self._keys_path, "rb") as f:
+            raw = f.read()
+        vector_rows = os.path.getsize(self._vectors_path) // (self.dim * 4) if os.path.exists(self._vectors_path) else 0
+        self._count = min(len(raw) // KEY_BYTES, vector_rows)
+        for i in range(self._count):
+            self._rows[raw[i * KEY_BYTES:(i + 1) * KEY_BYTES]] = i
+        # Drop any torn tail left by an interrupted append
+        self._truncate(self._count)
+
+    def _truncate(self, count: int):
+        if os.path.exists(self._keys_path):
+            os.truncate(self._keys_path, count * KEY_BYTES)
+        if os.path.exists(self._vectors_path) and self.dim:
+            os.truncate(self._vectors_path, count * self.dim * 4)
+
+    def _vectors(self) -> np.ndarray:
+        if self._mmap is None or len(self._mmap) != self._count:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._count, self.dim))
+        return self._mmap
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, text: str):
+        return cache_key(self.model_name, text) in self._rows
+
+    # === Lookup / fill ===
+    def encode(self, texts: list[str], encode_fn: Callable[[list[str]], np.ndarray]) -> np.ndarray:
+        """
+        Returns embeddings for `texts`, calling `encode_fn` only for texts never seen before.
+        """
+        keys = [cache_key(self.model_name, t) for t in texts]
+        with self._lock:
+            self._touched.update(keys)
+            missing: dict[bytes, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+            self.hits += len(keys) - sum(1 for k in keys if k in missing)
+            self.misses += sum(1 for k in keys if k in missing)
+
+        if missing:
+            fresh = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                self._append(list(missing.keys()), fresh)
+
+        with self._lock:
+            rows = np.fromiter((self._rows[k] for k in keys), dtype=np.int64, count=len(keys))
+            return np.array(self._vectors()[rows]) if len(rows) else np.empty((0, self.dim or 0), dtype=np.float32)
+
+    def _append(self, keys: list[bytes], vectors: np.ndarray):
+        new = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+        if not new:
+            return
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            with open(self._meta_path, "w") as f:
+                json.dump({"dim": self.dim}, f)
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(np.stack([v for _, v in new]), dtype=np.float32).tobytes())
+        with open(self._keys_path, "ab") as f:
+            f.write(b"".join(k for k, _ in new))
+        for k, _ in new:
+            self._rows[k] = self._count
+            self._count += 1
+
+    # === Maintenance ===
+    def compact(self, keep: Iterable[str] | None = None) -> int:
+        """
+        Rewrites the cache keeping only referenced entries and returns how many were evicted.
+
+        Entries are referenced if their text is in `keep`, or, by default, if they were
+        looked up through this instance (e.g. during a full rebuild).
+        """
+        with self._lock:
+            live = {cache_key(self.model_name, t) for t in keep} if keep is not None else set(self._touched)
+            survivors = [(k, r) for k, r in self._rows.items() if k in live]
+            evicted = self._count - len(survivors)
+            if not evicted:
+                return 0
+
+            survivors.sort(key=lambda kr: kr[1])
+            vectors = np.array(self._vectors()[[r for _, r in survivors]]) if survivors else np.empty((0, self.dim), np.float32)
+            self._mmap = None
+            vectors_tmp = os.path.join(self.path, ".vectors.tmp")
+            keys_tmp = os.path.join(self.path, ".keys.tmp")
+            with open(vectors_tmp, "wb") as f:
+                f.write(vectors.astype(np.float32).tobytes())
+            with open(keys_tmp, "wb") as f:
+                f.write(b"".join(k for k, _ in survivors))
+            # Keys go first: a crash in between leaves vectors without keys, which _load_index discards
+            os.remove(self._keys_path)
+            os.replace(vectors_tmp, self._vectors_path)
+            os.replace(keys_tmp, self._keys_path)
+
+            self._rows = {k: i for i, (k, _) in enumerate(survivors)}
+            self._count = len(survivors)
+            return evicted
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self) -> str:
+        return (
+            f"🗃️  Embedding cache: {self.hits:,} hits / {self.misses:,} misses "
+            f"({self.hit_rate:.1%} hit rate), {self._count:,} entries on disk"
+        )
+
+
+class CachedEncoder:
+    """
+    SentenceTransformer front-end that consults the cache first and loads the model only on a miss.
+    """
+
+    def __init__(self, model_name: str, cache_path: str = CACHE_PATH, batch_size: int = 32):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = EmbeddingCache(cache_path, model_name)
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            print(f"🧠 Loading sentence embedding model {self.model_name}...")
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        return self.cache.encode(texts, lambda missing: self.model.encode(missing, batch_size=self.batch_size))
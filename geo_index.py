@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import GEO_GRID_DEGREES, GEO_INDEX_PATH
+from summaries import classify_column
+
+# Raw columns the index reads (projection for store scans / fetches)
+GEO_COLUMNS = [
+    "vehicle_gps_latitude", "vehicle_gps_longitude",
+    "delay_probability", "fatigue_monitoring_score", "risk_classification",
+]
+CELL_KEYS = ["cell_lat", "cell_lon"]
+COUNT_COLUMNS = [
+    "count", "delay_sum", "delay_n",
+    "fatigue_low", "fatigue_moderate", "fatigue_high",
+    "risk_low", "risk_moderate", "risk_high",
+]
+RISK_LABELS = {"Low Risk": "risk_low", "Moderate Risk": "risk_moderate", "High Risk": "risk_high"}
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame({
+        **{k: pd.Series(dtype=np.int32) for k in CELL_KEYS},
+        **{c: pd.Series(dtype=np.float64 if c == "delay_sum" else np.int64) for c in COUNT_COLUMNS},
+    })
+
+
+def cell_aggregates(df: pd.DataFrame, degrees: float = GEO_GRID_DEGREES) -> pd.DataFrame:
+    """
+    Per-cell sums for a batch of raw rows (rows without coordinates are skipped).
+    Sums, not means, so batches can be added and subtracted.
+    """
+    lat = pd.to_numeric(df["vehicle_gps_latitude"], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df["vehicle_gps_longitude"], errors="coerce").to_numpy(dtype=float)
+    ok = ~(np.isnan(lat) | np.isnan(lon))
+    if not ok.any():
+        return _empty()
+
+    delay = pd.to_numeric(df["delay_probability"], errors="coerce").to_numpy(dtype=float)[ok]
+    fatigue = classify_column(1 - pd.to_numeric(df["fatigue_monitoring_score"], errors="coerce"))[ok]
+    risk = df["risk_classification"].astype(str).to_numpy()[ok]
+
+    parts = pd.DataFrame({
+        "cell_lat": np.floor(lat[ok] / degrees).astype(np.int32),
+        "cell_lon": np.floor(lon[ok] / degrees).astype(np.int32),
+        "count": 1,
+        "delay_sum": np.nan_to_num(delay),
+        "delay_n": (~np.isnan(delay)).astype(np.int64),
+        **{f"fatigue_{label}": (fatigue == label).astype(np.int64) for label in ("low", "moderate", "high")},
+        **{column: (risk == label).astype(np.int64) for label, column in RISK_LABELS.items()},
+    })
+    return parts.groupby(CELL_KEYS, sort=False).sum().reset_index()
+
+
+class GeoIndex:
+    """
+    Grid of GEO_GRID_DEGREES cells over the whole master dataset with per-cell counts,
+    delay sums and fatigue/risk class histograms, for dataset-wide hotspot maps.
+
+    Layout under `path`:
+        cells.parquet -> one row per non-empty cell (CELL_KEYS + COUNT_COLUMNS)
+        meta.json     -> grid size and the master store version the cells reflect
+    """
+
+    def __init__(self, path: str = GEO_INDEX_PATH, degrees: float = GEO_GRID_DEGREES):
+        self.path = path
+        self.degrees = degrees
+        self.store_version = None
+        self.cells = _empty()
+        self._cells_path = os.path.join(path, "cells.parquet")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._lock = threading.Lock()
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta.get("degrees") == degrees:
+                self.store_version = meta.get("store_version")
+                self.cells = pd.read_parquet(self._cells_path)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def is_current(self, store) -> bool:
+        return self.store_version is not None and self.store_version == store.version
+
+    # === Updates ===
+    def update(self, added: pd.DataFrame | None = None, removed: pd.DataFrame | None = None):
+        """Adds the contribution of `added` rows and subtracts that of `removed` (old copies / deletes)."""
+        frames = [self.cells.set_index(CELL_KEYS)]
+        if added is not None and len(added):
+            frames.append(cell_aggregates(added, self.degrees).set_index(CELL_KEYS))
+        if removed is not None and len(removed):
+            frames.append(-cell_aggregates(removed, self.degrees).set_index(CELL_KEYS))
+        if len(frames) == 1:
+            return
+        with self._lock:
+            cells = pd.concat(frames).groupby(level=CELL_KEYS).sum()
+            self.cells = cells[cells["count"] > 0].reset_index()
+
+    def rebuild(self, store):
+        """Full recompute from the master store (one projected scan)."""
+        with self._lock:
+            self.cells = _empty()
+        for frame in store.scan(columns=GEO_COLUMNS):
+            self.update(added=frame)
+        self.save(store.version)
+
+    def save(self, store_version: int):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            self.store_version = store_version
+            tmp = f"{self._cells_path}.tmp"
+            self.cells.to_parquet(tmp, index=False)
+            os.replace(tmp, self._cells_path)
+            tmp = f"{self._meta_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"degrees": self.degrees, "store_version": store_version, "cells": len(self.cells)}, f)
+            os.replace(tmp, self._meta_path)
+
+    # === Reads ===
+    def hotspots(self, metric: str = "delay", min_count: int = 1) -> pd.DataFrame:
+        """
+        Cell centers with a 0-1 `weight` for `metric`: "delay" (mean delay_probability),
+        "fatigue" / "risk" (share of high fatigue / high risk) or "count" (relative volume).
+        """
+        with self._lock:
+            cells = self.cells[self.cells["count"] >= min_count]
+        count = cells["count"].to_numpy(dtype=float)
+        if metric == "delay":
+            weight = cells["delay_sum"].to_numpy(dtype=float) / np.maximum(cells["delay_n"].to_numpy(dtype=float), 1)
+        elif metric == "fatigue":
+            weight = cells["fatigue_high"].to_numpy(dtype=float) / count
+        elif metric == "risk":
+            weight = cells["risk_high"].to_numpy(dtype=float) / count
+        else:
+            weight = count / count.max() if len(count) else count
+        return pd.DataFrame({
+            "lat": (cells["cell_lat"].to_numpy() + 0.5) * self.degrees,
+            "lon": (cells["cell_lon"].to_numpy() + 0.5) * self.degrees,
+            "count": cells["count"].to_numpy(),
+            "weight": weight,
+        })
+
+
+def sync_geo_index(store, index: GeoIndex | None = None) -> GeoIndex:
+    """Rebuilds the index if it doesn't reflect the store's current version."""
+    index = GeoIndex() if index is None else index
+    if not index.is_current(store):
+        print("🌍 Rebuilding geo grid index from the master store...")
+        index.rebuild(store)
+        print(f"🌍 Geo grid index: {len(index):,} cells at {index.degrees}°")
+    return index
@@ -1,60 +1,174 @@
-from langgraph.graph import StateGraph, END
-from agents.router_agent import classify_query
-from agents.retriever_agent import retrieve_documents
-from agents.reasoning_agent import analyze_documents
+import asyncio
+from langgraph.graph import StateGraph, START, END
+from langchain_core.runnables import RunnableLambda
+from agents.router_agent import classify_query, aclassify_query
+from agents.retriever_agent import retrieve_documents, aretrieve_documents, aretrieve_documents_batch
+from agents.reasoning_agent import analyze_documents, aanalyze_documents, astream_analysis
+from agents.analytics_agent import answer_with_analytics, aanswer_with_analytics
 from agents.response_agent import format_response
+import metrics
 
 from typing import TypedDict, List, Dict, Any
 
 # ✅ Define the state used across the graph
 class SupplyChainState(TypedDict, total=False):
     query: str
+    time_range: tuple        # optional (start, end); otherwise parsed from the query
     route: str
     documents: List[Dict[str, Any]]
     summary: str
     summaries: List[str]  # ✅ add this line
+    analytics: str        # compact analytics result (aggregate / top-N questions)
     response: str
 
 
+# Every node is timed into logisense_node_seconds{node=...} (see metrics.py)
+
 # 🧭 Step 1: Route tool
+@metrics.node("route")
 def route_tool(state: SupplyChainState) -> Dict[str, str]:
     route = classify_query(state["query"])
     return {"route": route}
 
+@metrics.node("route")
+async def aroute_tool(state: SupplyChainState) -> Dict[str, str]:
+    route = await aclassify_query(state["query"])
+    return {"route": route}
+
 # 📄 Step 2: Retrieve documents with summary and metadata
+# (aggregate / top-N questions are answered by the analytics engine over the whole dataset)
+@metrics.node("documents")
 def retrieve_tool(state: SupplyChainState) -> Dict[str, Any]:
-    documents = retrieve_documents(state["query"])
+    analytics = answer_with_analytics(state["query"])
+    if analytics is not None:
+        return analytics
+    documents = retrieve_documents(state["query"], time_range=state.get("time_range"))
     return {"documents": documents}
 
+@metrics.node("documents")
+async def aretrieve_tool(state: SupplyChainState) -> Dict[str, Any]:
+    analytics = await aanswer_with_analytics(state["query"])
+    if analytics is not None:
+        return analytics
+    documents = await aretrieve_documents(state["query"], time_range=state.get("time_range"))
+    return {"documents": documents}
+
+def _reasoning_input(state: SupplyChainState) -> list:
+    # The analytics table is already compact; otherwise reason over the retrieved docs
+    return [state["analytics"]] if state.get("analytics") else state["documents"]
+
 # 🧠 Step 3: Analyze summaries (pass only summary to LLM)
+@metrics.node("summary")
 def reasoning_tool(state: SupplyChainState) -> Dict[str, Any]:
     # Extract the summaries from the top documents
     summaries = [doc["summary"] for doc in state["documents"]]
-    summary = analyze_documents(state["query"], state["documents"])
+    summary = analyze_documents(state["query"], _reasoning_input(state))
     return {
         "summary": summary,
         "summaries": summaries  # ✅ add this for spatial plotting
     }
 
+@metrics.node("summary")
+async def areasoning_tool(state: SupplyChainState) -> Dict[str, Any]:
+    summaries = [doc["summary"] for doc in state["documents"]]
+    summary = await aanalyze_documents(state["query"], _reasoning_input(state))
+    return {
+        "summary": summary,
+        "summaries": summaries
+    }
+
 
 # 🗣️ Step 4: Format final response
+@metrics.node("response")
 def response_tool(state: SupplyChainState) -> Dict[str, str]:
     response = format_response(state["summary"])
     return {"response": response}
 
 # ✅ Build LangGraph flow
-graph = StateGraph(SupplyChainState)
+def build_graph(parallel: bool = True):
+    """
+    `route` and `documents` are independent (retrieval never reads the route), so by
+    default they fan out from START and join before `summary`. `parallel=False`
+    keeps the original route -> documents chain.
+    """
+    graph = StateGraph(SupplyChainState)
 
-graph.add_node("route", route_tool)
-graph.add_node("documents", retrieve_tool)
-graph.add_node("summary", reasoning_tool)
-graph.add_node("response", response_tool)
+    # Each node has a sync and an async implementation: invoke() for the CLIs, ainvoke() for the API
+    graph.add_node("route", RunnableLambda(route_tool, afunc=aroute_tool))
+    graph.add_node("documents", RunnableLambda(retrieve_tool, afunc=aretrieve_tool))
+    graph.add_node("summary", RunnableLambda(reasoning_tool, afunc=areasoning_tool))
+    graph.add_node("response", response_tool)
+
+    if parallel:
+        graph.add_edge(START, "route")
+        graph.add_edge(START, "documents")
+        graph.add_edge(["route", "documents"], "summary")
+    else:
+        graph.set_entry_point("route")
+        graph.add_edge("route", "documents")
+        graph.add_edge("documents", "summary")
+    graph.add_edge("summary", "response")
+    graph.add_edge("response", END)
+    return graph
 
-graph.set_entry_point("route")
-graph.add_edge("route", "documents")
-graph.add_edge("documents", "summary")
-graph.add_edge("summary", "response")
-graph.add_edge("response", END)
 
 # ✅ Compile graph
-supply_chain_graph = graph.compile()
+supply_chain_graph = build_graph().compile()
+
+
+# 🌊 Streaming variant of the same flow (used by /query/stream)
+async def astream_answer(query: str, time_range: tuple | None = None):
+    """
+    Yields ("retrieved", state) as soon as routing + retrieval are done, then
+    ("token", text) for each LLM chunk, then ("done", final_state) with the same
+    keys supply_chain_graph would return.
+    """
+    state: SupplyChainState = {"query": query}
+    if time_range:
+        state["time_range"] = time_range
+    routed, retrieved = await asyncio.gather(aroute_tool(state), aretrieve_tool(state))
+    state.update(routed)
+    state.update(retrieved)
+    yield "retrieved", state
+
+    parts = []
+    with metrics.stage("summary", "logisense_node_seconds", "node"):
+        async for token in astream_analysis(query, _reasoning_input(state)):
+            parts.append(token)
+            yield "token", token
+
+    state["summary"] = "".join(parts).strip()
+    state["summaries"] = [doc["summary"] for doc in state["documents"]]
+    state.update(response_tool(state))
+    yield "done", state
+
+
+# 📦 Batch variant (used by /query/batch): one encode pass + one vector query for every semantic question
+async def aanswer_batch(queries: List[str], max_concurrency: int = 8) -> List[SupplyChainState]:
+    """
+    Same final states as supply_chain_graph.ainvoke for each query, in order.
+    Analytic questions go to the analytics engine; the rest share one batched retrieval.
+    Routing then reuses the memoized query embeddings, and reasoning runs at most
+    `max_concurrency` LLM calls at a time.
+    """
+    states: List[SupplyChainState] = [{"query": q} for q in queries]
+    analytics = await asyncio.gather(*(aanswer_with_analytics(q) for q in queries))
+    semantic = [i for i, a in enumerate(analytics) if a is None]
+
+    for state, result in zip(states, analytics):
+        if result is not None:
+            state.update(result)
+    retrieved = await aretrieve_documents_batch([queries[i] for i in semantic])
+    for i, documents in zip(semantic, retrieved):
+        states[i]["documents"] = documents
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def finish(state: SupplyChainState):
+        state.update(await aroute_tool(state))
+        async with semaphore:
+            state.update(await areasoning_tool(state))
+        state.update(response_tool(state))
+        return state
+
+    return list(await asyncio.gather(*(finish(s) for s in states)))
@@ -1,43 +1,79 @@
-import os
-import pandas as pd
+import sys
+import time
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
-from chromadb import PersistentClient
+
+from config import EMBEDDING_MODEL, VECTOR_BACKEND
+from embedding_cache import CACHE_PATH, CachedEncoder
+from geo_index import sync_geo_index
+from master_store import STORE_PATH, MasterStore
+from ingest_pipeline import CHUNK_SIZE, ENCODE_BATCH_SIZE, run_pipeline, upsert_chunk, print_report
+from vector_backends import open_backend
 
 # === Config ===
-DATA_PATH = "data/master.csv"
-CHROMA_PATH = "/Users/shivanshusoni/Desktop/Bhawna/logisense/chroma_store"
-COLLECTION_NAME = "telemetry_docs"
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-
-# === Load Data ===
-df = pd.read_csv(DATA_PATH)
-assert "summary" in df.columns, "Missing 'summary' column in input file."
-
-# === Embeddings ===
-print("🧠 Generating sentence embeddings...")
-model = SentenceTransformer(EMBEDDING_MODEL)
-embeddings = model.encode(df["summary"].tolist(), show_progress_bar=True, batch_size=32)
-
-# === Initialize ChromaDB Persistent Client ===
-client = PersistentClient(path=CHROMA_PATH)
-
-# (Re)create collection
-if COLLECTION_NAME in [c.name for c in client.list_collections()]:
-    client.delete_collection(name=COLLECTION_NAME)
-collection = client.create_collection(name=COLLECTION_NAME)
-
-# === Upload in Batches ===
-print("📤 Uploading to ChromaDB...")
-batch_size = 5000
-for i in tqdm(range(0, len(df), batch_size)):
-    batch = df.iloc[i:i + batch_size]
-    # Add during ingestion
-collection.add(
-    documents=batch["summary"].tolist(),
-    embeddings=embeddings[i:i + batch_size],
-    ids=[str(idx) for idx in batch.index],
-    metadatas=batch.to_dict(orient="records")  # includes full row
-)
-
-print(f"✅ Ingested {len(df)} records into ChromaDB.")
+DATA_PATH = "data/master.csv"         # legacy CSV master, used to seed an empty store
+MASTER_STORE_PATH = STORE_PATH
+EMBEDDING_CACHE_PATH = CACHE_PATH
+PAGE_SIZE = 5000
+
+
+def ingest(data_path: str = DATA_PATH, chunk_size: int = CHUNK_SIZE, rebuild: bool = False):
+    """
+    Syncs the vector store (VECTOR_BACKEND) with the master store: rows whose fingerprint
+    already matches are skipped, new/changed rows are upserted and documents missing
+    from the store are deleted. `rebuild=True` drops the collection/index first.
+    """
+    # The master store is the source of truth; seed it from the CSV on first run
+    store = MasterStore(MASTER_STORE_PATH)
+    seeded = store.seed_from_csv(data_path, chunk_size)
+    if seeded:
+        print(f"📦 Seeded {MASTER_STORE_PATH} with {seeded} rows from {data_path}")
+    encoder = CachedEncoder(EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, batch_size=ENCODE_BATCH_SIZE)
+
+    # === Open the vector store (Chroma collection or mmap index) ===
+    backend = open_backend(VECTOR_BACKEND, create=True, rebuild=rebuild)
+
+    progress = tqdm(desc=f"📤 Upserting to {VECTOR_BACKEND}", unit="rows")
+
+    def prepare(chunk):
+        assert "summary" in chunk.columns, "Missing 'summary' column in master data."
+        # Diff against what the vector store already holds
+        indexed = backend.fingerprints(chunk["doc_id"].tolist())
+        return chunk[chunk["doc_id"].map(indexed) != chunk["fingerprint"]]
+
+    def write(chunk, embeddings):
+        upsert_chunk(backend, chunk, embeddings)
+        progress.update(len(chunk))
+
+    # === Stream: master partitions -> diff -> encode -> upsert, one chunk at a time ===
+    print(f"🧠 Streaming changed summaries through the embedding model into {VECTOR_BACKEND}...")
+    start = time.perf_counter()
+    stats = run_pipeline(store.scan(), prepare, encoder.encode, write)
+    progress.close()
+
+    # === Tombstones: drop documents the master store no longer has ===
+    stale = []
+    for page in backend.ids():
+        live = store.fingerprints(page)
+        stale.extend(i for i in page if i not in live)
+    for i in range(0, len(stale), PAGE_SIZE):
+        backend.delete(stale[i:i + PAGE_SIZE])
+
+    backend.optimize()
+    backend.flush()
+
+    # === Dataset-wide aggregates for hotspot maps ===
+    sync_geo_index(store)
+
+    print(f"✅ Upserted {stats['write'].rows} records, skipped {stats['prepare'].rows - stats['write'].rows} unchanged, deleted {len(stale)} stale.")
+    print_report(stats, time.perf_counter() - start)
+
+    # Only a rebuild encodes every live summary; a sync skips unchanged rows, so compacting then would evict them
+    if rebuild:
+        evicted = encoder.cache.compact()
+        if evicted:
+            print(f"🧹 Evicted {evicted:,} unreferenced cache entries.")
+    print(encoder.cache.report())
+
+
+if __name__ == "__main__":
+    ingest(rebuild="--rebuild" in sys.argv[1:])
@@ -0,0 +1,168 @@
+import threading
+import time
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Iterable
+
+import pandas as pd
+
+import metrics
+
+# === Config ===
+CHUNK_SIZE = 5000      # rows per CSV chunk (also the Chroma write batch)
+QUEUE_SIZE = 2         # max chunks buffered between two stages
+ENCODE_BATCH_SIZE = 32
+
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.chunks = 0
+        self.busy = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.busy if self.busy else 0.0
+
+    def __repr__(self):
+        return f"{self.name}: {self.rows:,} rows in {self.busy:.2f}s busy ({self.rows_per_sec:,.0f} rows/s)"
+
+
+def read_csv_chunks(path: str, chunk_size: int = CHUNK_SIZE, **kwargs) -> Iterable[pd.DataFrame]:
+    """
+    Streams a CSV in fixed-size chunks so only `chunk_size` rows are parsed at a time.
+    """
+    yield from pd.read_csv(path, chunksize=chunk_size, **kwargs)
+
+
+def _put(q: Queue, item, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except Full:
+            continue
+
+
+def _get(q: Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(
+    chunks: Iterable[pd.DataFrame],
+    prepare: Callable[[pd.DataFrame], pd.DataFrame | None],
+    encode: Callable[[list[str]], Any],
+    write: Callable[[pd.DataFrame, Any], None],
+    queue_size: int = QUEUE_SIZE,
+) -> dict[str, StageStats]:
+    """
+    Runs read -> prepare -> encode -> write as concurrent stages joined by bounded queues.
+
+    `prepare` returns the chunk with a `summary` column (or None/empty to drop it),
+    `encode` turns the summaries into embeddings and `write` persists chunk + embeddings.
+    At most `queue_size` chunks wait between two stages, so peak memory depends on
+    the chunk size and not on the size of the input.
+    """
+    stats = {name: StageStats(name) for name in ("read", "prepare", "encode", "write")}
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    queues = [Queue(maxsize=queue_size) for _ in range(3)]
+
+    def reader():
+        it = iter(chunks)
+        while not stop.is_set():
+            start = time.perf_counter()
+            chunk = next(it, _DONE)
+            if chunk is _DONE:
+                break
+            busy = time.perf_counter() - start
+            stats["read"].busy += busy
+            metrics.observe("logisense_ingest_stage_seconds", busy, stage="read")
+            stats["read"].rows += len(chunk)
+            stats["read"].chunks += 1
+            _put(queues[0], chunk, stop)
+
+    def preparer(chunk):
+        chunk = prepare(chunk)
+        return chunk if chunk is not None and not chunk.empty else None
+
+    def encoder(chunk):
+        return chunk, encode(chunk["summary"].tolist())
+
+    def writer(item):
+        write(*item)
+        return None
+
+    def stage(name, fn, inbox, outbox):
+        def run():
+            while True:
+                item = _get(inbox, stop)
+                if item is _DONE:
+                    break
+                start = time.perf_counter()
+                result = fn(item)
+                busy = time.perf_counter() - start
+                stats[name].busy += busy
+                metrics.observe("logisense_ingest_stage_seconds", busy, stage=name)
+                stats[name].rows += len(item[0] if isinstance(item, tuple) else item)
+                stats[name].chunks += 1
+                if outbox is not None and result is not None:
+                    _put(outbox, result, stop)
+        return run
+
+    def guarded(fn, outbox):
+        def run():
+            try:
+                fn()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                if outbox is not None:
+                    _put(outbox, _DONE, stop)
+        return run
+
+    threads = [
+        threading.Thread(target=guarded(reader, queues[0]), name="ingest-read"),
+        threading.Thread(target=guarded(stage("prepare", preparer, queues[0], queues[1]), queues[1]), name="ingest-prepare"),
+        threading.Thread(target=guarded(stage("encode", encoder, queues[1], queues[2]), queues[2]), name="ingest-encode"),
+        threading.Thread(target=guarded(stage("write", writer, queues[2], None), None), name="ingest-write"),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Per-chunk stage histograms for the API's /metrics (ingest runs in its own process)
+    metrics.write_ingest_metrics()
+
+    if errors:
+        raise errors[0]
+    return stats
+
+
+def upsert_chunk(backend, chunk: pd.DataFrame, embeddings):
+    """
+    Idempotent write of a diffed chunk: IDs are the stable `doc_id`s from the master store.
+    The vector store keeps only ID, summary, fingerprint and month (the shard key);
+    full rows live in the master store.
+    """
+    months = pd.to_datetime(chunk["timestamp"], errors="coerce").dt.strftime("%Y-%m").fillna("unknown")
+    backend.upsert(
+        ids=chunk["doc_id"].tolist(),
+        documents=chunk["summary"].tolist(),
+        embeddings=embeddings,
+        metadatas=[{"fingerprint": f, "month": m} for f, m in zip(chunk["fingerprint"], months)]
+    )
+
+
+def print_report(stats: dict[str, StageStats], wall: float):
+    print(f"⏱️  Pipeline finished in {wall:.2f}s")
+    for s in stats.values():
+        print(f"   • {s}")
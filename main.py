@@ -1,16 +1,52 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import threading
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List, Dict, Any
 
-from graph import supply_chain_graph
-from session_context import save_session
-from agents.spatial_agent import plot_delay_clusters
+from graph import supply_chain_graph, astream_answer, aanswer_batch
+from agents.retriever_agent import afetch_records, unknown_columns
+from session_context import followup_top_n, load_session, save_session
+from agents.spatial_agent import MAP_COLUMNS, cached_hotspot_map, cached_records_map, get_map_cache, hotspot_metric
+from concurrency import ConcurrencyLimiter
+from answer_cache import get_answer_cache
+import deadline
+import metrics
+from config import (
+    MAP_CACHE_DIR, PUBLIC_BASE_URL, MAX_BATCH_QUERIES, MAX_CONCURRENT_QUERIES, MAX_QUEUED_QUERIES, QUEUE_TIMEOUT_SECONDS, WARMUP_ON_STARTUP,
+)
+import startup
+
+# Bounded concurrency for graph runs: excess load gets a 429 instead of an unbounded queue
+limiter = ConcurrencyLimiter(MAX_CONCURRENT_QUERIES, MAX_QUEUED_QUERIES, QUEUE_TIMEOUT_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the model, vector store and LLM clients in the background; /ready reports progress
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=startup.warm_up, name="warm-up", daemon=True).start()
+    yield
+    # Keep cached answers across restarts (no-op unless ANSWER_CACHE_PATH is set)
+    await run_in_threadpool(get_answer_cache().save)
 
-app = FastAPI()
 
-# Serve static files (map.html)
+app = FastAPI(lifespan=lifespan)
+
+# Serve per-request map artifacts (content-addressed, see map_cache.py) and other static files
+os.makedirs(MAP_CACHE_DIR, exist_ok=True)
+app.mount("/maps", StaticFiles(directory=MAP_CACHE_DIR), name="maps")
+os.makedirs("static", exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Enable CORS
@@ -25,29 +61,200 @@ app.add_middleware(
 # Request/Response schemas
 class QueryRequest(BaseModel):
     query: str
+    columns: List[str] | None = None  # projection for top_records (default: RECORD_COLUMNS / all)
+    start: str | None = None          # optional time window (ISO dates); otherwise parsed from the query
+    end: str | None = None
+    session_id: str | None = None     # follow-ups ("show top 3 records") use this session's last results
+    budget_seconds: float | None = None  # latency budget for the LLM calls (default REQUEST_BUDGET_SECONDS)
+
+    def time_range(self):
+        if not (self.start or self.end):
+            return None
+        return (self.start or "1970-01-01", self.end or "2262-01-01")
 
 class QueryResponse(BaseModel):
     response: str
     top_records: List[Dict[str, Any]]
     map_url: str | None
+    session_id: str | None = None
+    degraded: bool = False            # an LLM call ran out of budget / failed and a fallback answered
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    columns: List[str] | None = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
+
+# Readiness probe: 503 until every component is loaded, with a per-component startup breakdown
+@app.get("/ready")
+def ready():
+    report = startup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+# Answer/route cache hit rates per tier, plus the map artifact cache
+@app.get("/cache/stats")
+def cache_stats():
+    return {**get_answer_cache().stats(), "maps": get_map_cache().stats()}
+
+# Prometheus scrape target: per-node / per-stage / per-request latency histograms (+ the last ingest run)
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus() + metrics.read_ingest_metrics(),
+                             media_type="text/plain; version=0.0.4")
+
+async def _check_columns(columns: List[str] | None):
+    # A typo in `columns` is a client error (400 listing the valid names), not a parquet failure (500)
+    unknown, valid = await run_in_threadpool(unknown_columns, columns)
+    if unknown:
+        raise HTTPException(status_code=400, detail={"unknown_columns": unknown, "valid_columns": valid})
+
+
+async def _rows(documents: list, columns: List[str] | None = None) -> list:
+    # Rows come from the master store (columnar sidecar), only for the returned docs and columns
+    return await afetch_records(documents, columns)
+
+
+async def _maybe_plot(query: str, documents: list) -> str | None:
+    # Check if map should be generated
+    if "map" in query.lower() or "plot" in query.lower():
+        metric = hotspot_metric(query)
+        if metric:
+            # "Map of fatigue hotspots": dataset-wide hotspots from the grid index, not just the top docs
+            with metrics.stage("map"):
+                name = await run_in_threadpool(cached_hotspot_map, metric)
+        else:
+            records = await afetch_records(documents, MAP_COLUMNS)
+            with metrics.stage("map"):
+                name = await run_in_threadpool(cached_records_map, records)
+        # One file per plotted record set: concurrent users never overwrite each other's map
+        if name:
+            return f"{PUBLIC_BASE_URL}/maps/{name}"
+    return None
+
 
-# API route
+async def _followup(query: str, session_id: str, columns: List[str] | None) -> List[Dict[str, Any]] | None:
+    # "Show top N records": rows of the session's last answer, rehydrated by ID (no graph run)
+    top_n = followup_top_n(query)
+    if top_n is None:
+        return None
+    session = await run_in_threadpool(load_session, session_id)
+    if not session["last_doc_ids"]:
+        return None
+    return await _rows(session["last_doc_ids"][:top_n], columns)
+
+
+# API route (send X-Trace-ID to correlate with the slow-query log; one is generated otherwise)
 @app.post("/query", response_model=QueryResponse)
-def process_query(req: QueryRequest):
+async def process_query(req: QueryRequest, http_response: Response, x_trace_id: str | None = Header(default=None)):
+    with metrics.trace("query", req.query, x_trace_id) as trace:
+        http_response.headers["X-Trace-ID"] = trace.trace_id
+        return await _answer(req)
+
+
+async def _answer(req: QueryRequest) -> QueryResponse:
     query = req.query
-    result = supply_chain_graph.invoke({"query": query})
+    session_id = req.session_id or uuid.uuid4().hex
+    await _check_columns(req.columns)
+    rows = await _followup(query, session_id, req.columns)
+    if rows is not None:
+        return QueryResponse(response=f"Top {len(rows)} records from your previous question.",
+                             top_records=rows, map_url=None, session_id=session_id)
+
+    async with limiter.slot():
+        state = {"query": query}
+        if req.time_range():
+            state["time_range"] = req.time_range()
+        # The budget starts once the request holds a slot; queueing has its own timeout
+        with deadline.budget(req.budget_seconds) as budget:
+            result = await supply_chain_graph.ainvoke(state)
 
     response = result.get("response", "")
     documents = result.get("documents", [])
-    rows = [doc["metadata"]["row"] for doc in documents if "metadata" in doc and "row" in doc["metadata"]]
+    rows = await _rows(documents, req.columns)
 
-    save_session(query, rows)
+    await run_in_threadpool(save_session, query, documents, session_id)
 
-    # Check if map should be generated
-    map_url = None
-    if "map" in query.lower() or "plot" in query.lower():
-        success = plot_delay_clusters([doc["summary"] for doc in documents], output_path="static/map.html")
-        if success:
-            map_url = "http://localhost:8000/static/map.html"
+    map_url = await _maybe_plot(query, documents)
+
+    return QueryResponse(response=response, top_records=rows, map_url=map_url, session_id=session_id,
+                         degraded=bool(budget.degraded))
+
+
+# Batch API route: for scheduled reports firing many questions at once (no maps, no session history,
+# no request budget: each LLM call is still capped by its own timeout)
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def process_batch(req: BatchQueryRequest, http_response: Response, x_trace_id: str | None = Header(default=None)):
+    if len(req.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    await _check_columns(req.columns)
+    with metrics.trace("batch", f"{len(req.queries)} queries", x_trace_id) as trace:
+        http_response.headers["X-Trace-ID"] = trace.trace_id
+        async with limiter.slot():
+            states = await aanswer_batch(req.queries, max_concurrency=MAX_CONCURRENT_QUERIES)
+
+        records = await asyncio.gather(*(_rows(s.get("documents", []), req.columns) for s in states))
+    return BatchQueryResponse(results=[
+        QueryResponse(response=s.get("response", ""), top_records=rows, map_url=None)
+        for s, rows in zip(states, records)
+    ])
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# Streaming API route (Server-Sent Events):
+#   records -> {"top_records": [...], "route": "..."}   as soon as retrieval is done
+#   token   -> "text"                                   for every LLM chunk
+#   done    -> {"response": "...", "map_url": ..., "session_id": "...", "trace_id": "...", "degraded": bool}
+#   error   -> {"detail": "..."}
+@app.post("/query/stream")
+async def stream_query(req: QueryRequest, x_trace_id: str | None = Header(default=None)):
+    query = req.query
+    trace_id = x_trace_id or uuid.uuid4().hex[:16]
+    session_id = req.session_id or uuid.uuid4().hex
+    await _check_columns(req.columns)
+    rows = await _followup(query, session_id, req.columns)
+    if rows is not None:
+        async def followup_events():
+            yield _sse("records", {"top_records": rows, "route": "followup"})
+            yield _sse("done", {"response": f"Top {len(rows)} records from your previous question.",
+                                "map_url": None, "session_id": session_id})
+        return StreamingResponse(followup_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    await limiter.acquire()  # 429 here, before the stream starts
+    released = False
+
+    def release():
+        # Called from the generator and as a background task (covers clients that vanish before the first byte)
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
+
+    async def events():
+        try:
+            with metrics.trace("stream", query, trace_id), deadline.budget(req.budget_seconds) as budget:
+                async for kind, payload in astream_answer(query, req.time_range()):
+                    if kind == "retrieved":
+                        documents = payload.get("documents", [])
+                        rows = await _rows(documents, req.columns)
+                        yield _sse("records", {"top_records": rows, "route": payload.get("route")})
+                    elif kind == "token":
+                        yield _sse("token", payload)
+                    else:
+                        await run_in_threadpool(save_session, query, documents, session_id)
+                        map_url = await _maybe_plot(query, documents)
+                        yield _sse("done", {"response": payload.get("response", ""), "map_url": map_url,
+                                            "session_id": session_id, "trace_id": trace_id,
+                                            "degraded": bool(budget.degraded)})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            release()
 
-    return QueryResponse(response=response, top_records=rows, map_url=map_url)
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Trace-ID": trace_id},
+        background=BackgroundTask(release),
+    )
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Callable
+
+from config import MAP_CACHE_DIR, MAP_CACHE_MAX_BYTES
+
+
+def map_key(kind: str, payload) -> str:
+    """Content hash of what a map shows: its kind/params plus the plotted data."""
+    raw = json.dumps([kind, payload], sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class MapCache:
+    """
+    Content-addressed map artifacts: <dir>/<key>.html, where the key hashes the plotted
+    record set. Identical requests reuse the file; concurrent requests never share one.
+    The directory is kept under `max_bytes` by evicting the least recently used maps
+    (file mtime is refreshed on every hit).
+    """
+
+    def __init__(self, directory: str = MAP_CACHE_DIR, max_bytes: int = MAP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.html")
+
+    def get_or_create(self, key: str, render: Callable[[str], bool]) -> str | None:
+        """
+        Returns the file name for `key`, calling `render(path)` only on a miss
+        (one render per key even under concurrent requests). None if rendering fails.
+        """
+        path = self.path(key)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                if os.path.exists(path):
+                    os.utime(path)
+                    with self._lock:
+                        self.hits += 1
+                    return os.path.basename(path)
+
+                # Render to a private temp file, then publish atomically
+                tmp = os.path.join(self.directory, f".{key}.{uuid.uuid4().hex[:8]}.html")
+                try:
+                    if not render(tmp) or not os.path.exists(tmp):
+                        return None
+                    os.replace(tmp, path)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                with self._lock:
+                    self.misses += 1
+        finally:
+            # A racing request may re-render the same key after this; os.replace makes that harmless
+            with self._lock:
+                if self._key_locks.get(key) is key_lock and not key_lock.locked():
+                    del self._key_locks[key]
+        self.evict()
+        return os.path.basename(path)
+
+    def evict(self) -> int:
+        """Deletes least recently used maps until the directory fits in `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".html") and not name.startswith("."):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self) -> dict:
+        files = [f for f in os.listdir(self.directory) if f.endswith(".html") and not f.startswith(".")]
+        size = sum(os.path.getsize(os.path.join(self.directory, f)) for f in files)
+        return {"files": len(files), "bytes": size, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
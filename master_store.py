@@ -0,0 +1,312 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+# === Config ===
+STORE_PATH = "data/master_store"
+# A record's identity: one shipment event at one place and time
+ID_COLUMNS = ["timestamp", "vehicle_gps_latitude", "vehicle_gps_longitude"]
+# Columns derived by ingest, excluded from the content fingerprint
+DERIVED_COLUMNS = ["doc_id", "fingerprint", "summary"]
+SQL_BATCH = 500  # max bound parameters per lookup
+
+
+# SQLite connections must not be used across fork() (prefork serving, see serve.py): a forked
+# child gives every store it inherited a fresh connection and lock
+_open_stores: "weakref.WeakSet[MasterStore]" = weakref.WeakSet()
+
+
+def _reopen_after_fork():
+    for store in list(_open_stores):
+        store._lock = threading.RLock()
+        store._db = store._connect()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+def _canonical(values: pd.Series) -> pd.Series:
+    # Same value, same hash whatever dtype this chunk inferred: a NaN turns an int column
+    # into float64 in one CSV chunk but not in the next
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime("%Y-%m-%d %H:%M:%S").fillna("")
+    return values.astype(str).where(values.notna(), "")
+
+
+def row_ids(df: pd.DataFrame, id_columns: list[str] = ID_COLUMNS) -> pd.Series:
+    """
+    Deterministic document IDs: a hash of the identity columns, stable across runs, files
+    and inferred dtypes (40 and 40.0 are the same latitude).
+    """
+    parts = [_canonical(df[column]) for column in id_columns]
+    parts = [p.astype(str).where(p.notna(), "") for p in parts]
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined + "|" + part
+    return joined.map(lambda s: hashlib.blake2b(s.encode("utf-8"), digest_size=12).hexdigest())
+
+
+def row_fingerprints(df: pd.DataFrame) -> pd.Series:
+    """
+    Content hash over every raw column (in name order, dtype-independent), used to skip unchanged rows.
+    """
+    columns = sorted(c for c in df.columns if c not in DERIVED_COLUMNS)
+    canonical = pd.DataFrame({c: _canonical(df[c]) for c in columns}, index=df.index)
+    hashed = pd.util.hash_pandas_object(canonical, index=False).to_numpy(dtype=np.uint64)
+    return pd.Series([f"{h:016x}" for h in hashed], index=df.index, dtype=object)
+
+
+class MasterStore:
+    """
+    Append-only master copy of the telemetry, partitioned by month as Parquet files.
+
+    A SQLite index maps each document ID to its current (partition, row) and content
+    fingerprint, plus a high-water-mark timestamp. A new batch is therefore diffed
+    and persisted in O(batch size), without ever re-reading the history. Updated
+    rows are appended again and the index moves to the new copy; deleted rows are
+    dropped from the index and recorded as tombstones.
+
+    Layout under `path`:
+        index.sqlite                          -> keys(key, part, row, fingerprint), tombstones, meta
+        month=YYYY-MM/part-<seq>-<id>.parquet -> one file per appended batch and month
+    """
+
+    def __init__(self, path: str = STORE_PATH, id_columns: list[str] = ID_COLUMNS):
+        self.path = path
+        self.id_columns = id_columns
+        self._lock = threading.RLock()
+        self._pending: dict[str, str] = {}
+
+        os.makedirs(path, exist_ok=True)
+        self._db = self._connect()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS keys ("
+            "key TEXT PRIMARY KEY, part TEXT NOT NULL, row INTEGER NOT NULL, fingerprint TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS keys_part ON keys (part)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS tombstones (key TEXT PRIMARY KEY, deleted_at REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+        _open_stores.add(self)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False)
+
+    # === Index ===
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def _meta(self, name: str) -> str | None:
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name: str, value: str):
+        self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    @property
+    def watermark(self) -> pd.Timestamp | None:
+        """Latest `timestamp` ever appended (NaT-safe)."""
+        with self._lock:
+            value = self._meta("watermark")
+        return pd.Timestamp(value) if value else None
+
+    @property
+    def version(self) -> int:
+        """Bumped on every append/delete, so readers can tell when their copy is stale."""
+        with self._lock:
+            return int(self._meta("version") or 0)
+
+    def _bump_version(self):
+        self._set_meta("version", str(int(self._meta("version") or 0) + 1))
+
+    def row_ids(self, df: pd.DataFrame) -> pd.Series:
+        return row_ids(df, self.id_columns)
+
+    def fingerprints(self, ids: Iterable[str]) -> dict[str, str]:
+        """Current fingerprint of each indexed ID (unknown IDs are omitted)."""
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), SQL_BATCH):
+                batch = ids[i:i + SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                found.update(self._db.execute(f"SELECT key, fingerprint FROM keys WHERE key IN ({marks})", batch))
+        return found
+
+    def ids(self) -> Iterable[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT key FROM keys").fetchall()
+        return (r[0] for r in rows)
+
+    def diff(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the new or changed rows of `df`, with `doc_id` and `fingerprint` columns.
+
+        Rows whose fingerprint matches the indexed copy are dropped, and repeated IDs in
+        `df` collapse to their last occurrence. Rows newer than the watermark cannot be
+        indexed yet and skip the lookup. Returned rows stay reserved until `append` (or
+        `release`, if writing them failed), so later chunks of the same run don't resend an
+        identical row.
+        """
+        df = df.assign(doc_id=self.row_ids(df), fingerprint=row_fingerprints(df))
+        df = df[~df["doc_id"].duplicated(keep="last")]
+
+        maybe_old = pd.Series(True, index=df.index)
+        watermark = self.watermark
+        if watermark is not None and "timestamp" in self.id_columns:
+            ts = pd.to_datetime(df["timestamp"], errors="coerce")
+            maybe_old = (ts <= watermark) | ts.isna()
+
+        with self._lock:
+            current = self.fingerprints(df.loc[maybe_old, "doc_id"])
+            batch_ids = set(df["doc_id"])
+            current.update({k: v for k, v in self._pending.items() if k in batch_ids})
+            unchanged = df["doc_id"].map(current) == df["fingerprint"]
+            changed = df[~unchanged]
+            self._pending.update(zip(changed["doc_id"], changed["fingerprint"]))
+        return changed
+
+    # === Writes ===
+    def append(self, df: pd.DataFrame):
+        """
+        Persists `df` (as returned by `diff`) as new Parquet partition(s) and points the
+        index at the new copies, all in one transaction.
+        """
+        if df.empty:
+            return
+        ts = pd.to_datetime(df["timestamp"], errors="coerce")
+        months = ts.dt.strftime("%Y-%m").fillna("unknown")
+
+        with self._lock:
+            try:
+                seq = int(self._meta("parts") or 0)
+                for month, rows in df.groupby(months.values, sort=False).indices.items():
+                    part = os.path.join(f"month={month}", f"part-{seq:06d}-{uuid.uuid4().hex[:8]}.parquet")
+                    os.makedirs(os.path.join(self.path, f"month={month}"), exist_ok=True)
+                    batch = df.iloc[rows]
+                    batch.to_parquet(os.path.join(self.path, part), index=False)
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO keys (key, part, row, fingerprint) VALUES (?, ?, ?, ?)",
+                        ((k, part, i, f) for i, (k, f) in enumerate(zip(batch["doc_id"], batch["fingerprint"])))
+                    )
+                    self._db.executemany("DELETE FROM tombstones WHERE key = ?", ((k,) for k in batch["doc_id"]))
+                    seq += 1
+                self._set_meta("parts", str(seq))
+                self._bump_version()
+                latest = ts.max()
+                watermark = self.watermark
+                if pd.notna(latest) and (watermark is None or latest > watermark):
+                    self._set_meta("watermark", latest.isoformat())
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+            finally:
+                self.release(df["doc_id"])
+
+    def release(self, ids: Iterable[str] | None = None):
+        """Drops the `diff` reservations of `ids` (default: all), e.g. after their write failed."""
+        with self._lock:
+            if ids is None:
+                self._pending.clear()
+            for k in ids if ids is not None else ():
+                self._pending.pop(k, None)
+
+    def delete(self, ids: Iterable[str]) -> list[str]:
+        """
+        Tombstones `ids`: they leave the index (and every scan) but stay on disk until rewritten.
+        Returns the IDs that were actually live.
+        """
+        ids = list(ids)
+        with self._lock:
+            live = list(self.fingerprints(ids))
+            now = time.time()
+            self._db.executemany("DELETE FROM keys WHERE key = ?", ((k,) for k in live))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO tombstones (key, deleted_at) VALUES (?, ?)", ((k, now) for k in live)
+            )
+            if live:
+                self._bump_version()
+            self._db.commit()
+        return live
+
+    def seed_from_csv(self, csv_path: str, chunk_size: int = 5000) -> int:
+        """
+        One-time migration of a legacy master CSV into an empty store.
+        """
+        if len(self) or not os.path.exists(csv_path):
+            return 0
+        added = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            chunk = self.diff(chunk)
+            self.append(chunk)
+            added += len(chunk)
+        return added
+
+    # === Reads ===
+    def partitions(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT part FROM keys ORDER BY part")]
+
+    def _live_rows(self, part: str) -> np.ndarray:
+        with self._lock:
+            rows = self._db.execute("SELECT row FROM keys WHERE part = ? ORDER BY row", (part,)).fetchall()
+        return np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+
+    def scan(self, columns: list[str] | None = None) -> Iterable[pd.DataFrame]:
+        """Yields the live rows one partition file at a time (superseded/deleted rows are skipped)."""
+        for part in self.partitions():
+            frame = pd.read_parquet(os.path.join(self.path, part), columns=columns)
+            live = self._live_rows(part)
+            yield frame if len(live) == len(frame) else frame.iloc[live].reset_index(drop=True)
+
+    def fetch(self, ids: list[str], columns: list[str] | None = None) -> pd.DataFrame:
+        """
+        Returns the current rows for `ids` (in that order, unknown IDs skipped), reading
+        only the partitions that hold them and only the requested columns.
+        """
+        with self._lock:
+            located = []
+            for i in range(0, len(ids), SQL_BATCH):
+                batch = ids[i:i + SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                located.extend(self._db.execute(f"SELECT key, part, row FROM keys WHERE key IN ({marks})", batch))
+        if not located:
+            return pd.DataFrame(columns=columns)
+
+        read_columns = None if columns is None else list(dict.fromkeys([*columns, "doc_id"]))
+        frames = []
+        by_part: dict[str, list[int]] = {}
+        for _, part, row in located:
+            by_part.setdefault(part, []).append(row)
+        for part, rows in by_part.items():
+            frame = pd.read_parquet(os.path.join(self.path, part), columns=read_columns)
+            frames.append(frame.iloc[rows])
+        found = pd.concat(frames, ignore_index=True).set_index("doc_id", drop=False)
+        order = [i for i in ids if i in found.index]
+        result = found.loc[order].reset_index(drop=True)
+        return result if columns is None else result[columns]
+
+    def columns(self) -> list[str]:
+        """Column names of the stored rows (from the newest partition's schema; empty store -> [])."""
+        parts = self.partitions()
+        if not parts:
+            return []
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(os.path.join(self.path, parts[-1])).names)
+
+    def read(self, columns: list[str] | None = None) -> pd.DataFrame:
+        frames = list(self.scan(columns))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
@@ -0,0 +1,269 @@
+# metrics.py
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from config import INGEST_METRICS_PATH, SLOW_QUERY_LOG, SLOW_QUERY_SECONDS
+
+# Upper bounds in seconds (+Inf is implicit): from a cached lookup up to a slow LLM call
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "logisense_node_seconds": "Wall time of each agent graph node (route, documents, summary, response).",
+    "logisense_stage_seconds": "Wall time of the stages inside the nodes (embedding, vector search, LLM calls, ...).",
+    "logisense_request_seconds": "End-to-end wall time of API requests.",
+    "logisense_ingest_stage_seconds": "Busy time per chunk of each ingest pipeline stage.",
+}
+
+SHARE_INTERVAL_SECONDS = 1.0  # how often a prefork worker publishes its histograms
+
+_lock = threading.Lock()
+_histograms: dict[tuple[str, tuple], "Histogram"] = {}
+_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("trace", default=None)
+_shared_dir: str | None = None  # set under prefork serving (serve.py), see share_across_processes
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram (one per metric name + label set)."""
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+def observe(name: str, seconds: float, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+    histogram.observe(seconds)
+
+
+class Trace:
+    """Per-request stage breakdown, shared by every node / stage that runs for the request."""
+
+    def __init__(self, trace_id: str, kind: str, query: str):
+        self.trace_id = trace_id
+        self.kind = kind
+        self.query = query
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def breakdown(self) -> dict:
+        with self._lock:
+            return {
+                "trace_id": self.trace_id,
+                "kind": self.kind,
+                "query": self.query,
+                "total_seconds": round(time.perf_counter() - self.start, 4),
+                "stages_seconds": {k: round(v, 4) for k, v in self.stages.items()},
+            }
+
+
+def current_trace() -> Trace | None:
+    return _trace.get()
+
+
+@contextmanager
+def stage(name: str, metric: str = "logisense_stage_seconds", label: str = "stage"):
+    """Times the block into `metric{label=name}` and the current request's trace (if any)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        observe(metric, seconds, **{label: name})
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(name, seconds)
+
+
+def node(name: str):
+    """Decorator for graph node functions (sync or async): records `logisense_node_seconds{node=name}`."""
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                with stage(name, "logisense_node_seconds", "node"):
+                    return await fn(*args, **kwargs)
+            return run_async
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with stage(name, "logisense_node_seconds", "node"):
+                return fn(*args, **kwargs)
+        return run
+    return wrap
+
+
+@contextmanager
+def trace(kind: str, query: str, trace_id: str | None = None):
+    """
+    Collects the stage breakdown of one request under `trace_id` (generated if missing),
+    records `logisense_request_seconds{endpoint=kind}` and logs the request if it was slow.
+    """
+    current = Trace(trace_id or uuid.uuid4().hex[:16], kind, query)
+    _trace.set(current)
+    try:
+        yield current
+    finally:
+        # Not reset via token: async generators may finish in a different context than they started
+        _trace.set(None)
+        breakdown = current.breakdown()
+        observe("logisense_request_seconds", breakdown["total_seconds"], endpoint=kind)
+        if breakdown["total_seconds"] >= SLOW_QUERY_SECONDS:
+            log_slow_query(breakdown)
+
+
+def log_slow_query(breakdown: dict):
+    stages = ", ".join(f"{k}={v:.2f}s" for k, v in breakdown["stages_seconds"].items())
+    print(f"🐢 Slow query [{breakdown['trace_id']}] {breakdown['total_seconds']:.2f}s: {breakdown['query']!r} ({stages})")
+    if SLOW_QUERY_LOG:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or ".", exist_ok=True)
+        with _lock, open(SLOW_QUERY_LOG, "a") as f:
+            f.write(json.dumps({"time": time.time(), **breakdown}) + "\n")
+
+
+def _labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{str(v)}"' for k, v in labels] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _snapshot() -> list:
+    """This process's histograms as [name, labels, buckets, counts, sum, count] rows."""
+    with _lock:
+        items = list(_histograms.items())
+    rows = []
+    for (name, labels), h in items:
+        with h._lock:
+            rows.append([name, [list(label) for label in labels], list(h.buckets), list(h.counts), h.sum, h.count])
+    return rows
+
+
+# === Prefork serving: workers publish their histograms to files, /metrics sums them ===
+def share_across_processes(path: str):
+    """
+    Called by the prefork parent before forking: any worker answering /metrics then reports
+    the sum over every worker (including ones that have exited, so counters never go back).
+    """
+    global _shared_dir
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):  # left over from the previous run
+        if name.endswith(".json"):
+            os.remove(os.path.join(path, name))
+    _shared_dir = path
+
+
+def publish():
+    if _shared_dir is None:
+        return
+    path = os.path.join(_shared_dir, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(_snapshot(), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def start_publishing(interval: float = SHARE_INTERVAL_SECONDS):
+    """Worker side: drops what was inherited from the parent, then publishes every `interval` seconds."""
+    reset()
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                publish()
+            except OSError as e:
+                print(f"⚠️ Could not publish metrics: {e}")
+
+    threading.Thread(target=loop, name="metrics-publish", daemon=True).start()
+
+
+def _collect() -> dict:
+    if _shared_dir is None:
+        rows = _snapshot()
+    else:
+        publish()  # this worker's numbers are current; the others' are at most SHARE_INTERVAL_SECONDS old
+        rows = []
+        for name in os.listdir(_shared_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(_shared_dir, name)) as f:
+                    rows.extend(json.load(f))
+            except (OSError, ValueError):
+                continue
+    merged = {}
+    for name, labels, buckets, counts, total, count in rows:
+        key = (name, tuple(tuple(label) for label in labels))
+        if key in merged:
+            m = merged[key]
+            m[1] = [a + b for a, b in zip(m[1], counts)]
+            m[2] += total
+            m[3] += count
+        else:
+            merged[key] = [buckets, counts, total, count]
+    return merged
+
+
+def render_prometheus(names: list[str] | None = None) -> str:
+    """Histograms (all, or only `names`) in the Prometheus text exposition format (version 0.0.4)."""
+    items = sorted((k, v) for k, v in _collect().items() if names is None or k[0] in names)
+    lines, seen = [], set()
+    for (name, labels), (buckets, counts, total, count) in items:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, n in zip([*buckets, "+Inf"], [*counts, count]):
+            le = 'le="%s"' % bound
+            lines.append(f"{name}_bucket{_labels(labels, le)} {n}")
+        lines.append(f"{name}_sum{_labels(labels)} {total}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+# === Ingest runs in its own process: hand its histograms to the API through a file ===
+def write_ingest_metrics(path: str = INGEST_METRICS_PATH):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus(["logisense_ingest_stage_seconds"]))
+    os.replace(tmp, path)
+
+
+def read_ingest_metrics(path: str = INGEST_METRICS_PATH) -> str:
+    """Histograms of the last ingest run (empty if none was recorded)."""
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path) as f:
+        return f.read()
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
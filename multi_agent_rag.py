@@ -1,13 +1,14 @@
 import sys
-import re
 import pandas as pd
 from dotenv import load_dotenv
 from pathlib import Path
 import webbrowser
 
-from session_context import load_session, save_session
+from session_context import followup_top_n, load_session, save_session
 from graph import supply_chain_graph
-from agents.spatial_agent import plot_delay_clusters
+import deadline
+from agents.retriever_agent import fetch_records
+from agents.spatial_agent import MAP_COLUMNS, cached_hotspot_map, cached_records_map, get_map_cache, hotspot_metric
 
 load_dotenv()
 
@@ -21,27 +22,17 @@ user_query = sys.argv[1].strip().replace("“", "\"").replace("”", "\"")
 print(f"\n🧠 Multi-Agent RAG System\n🔍 User Query: {user_query}")
 
 # === Handle Follow-up Queries ===
-if re.search(r"\bsupporting\b.*\b(records|rows)?\b", user_query.lower()) or \
-   re.search(r"\bshow\b.*\b(records|rows)?\b", user_query.lower()) or \
-   re.search(r"\btop\b.*\b(records|rows)?\b", user_query.lower()):
+# Each run is a new process, so the context lives in the persistent (SQLite) session store
+top_n = followup_top_n(user_query)
+if top_n is not None:
+    last_ids = load_session(backend="sqlite")["last_doc_ids"]
 
-    session = load_session()
-    last_query = session.get("last_query")
-    last_documents = session.get("last_documents", [])
-
-    if not last_documents:
+    if not last_ids:
         print("⚠️ No previous query context found. Please run a primary query first.")
         sys.exit(1)
 
-    # Extract number of records (default = 5)
-    match = re.search(r"\b(\d+)\b", user_query)
-    top_n = int(match.group(1)) if match else 5
-
-    # Collect metadata rows from documents
-    rows = []
-    for doc in last_documents[:top_n]:
-        if isinstance(doc, dict) and "metadata" in doc and "row" in doc["metadata"]:
-            rows.append(doc["metadata"]["row"])
+    # Look up the full rows in the master store
+    rows = fetch_records(last_ids[:top_n])
 
     if rows:
         df = pd.DataFrame(rows)
@@ -53,7 +44,8 @@ if re.search(r"\bsupporting\b.*\b(records|rows)?\b", user_query.lower()) or \
 
 # === LangGraph Execution ===
 print(f"🔍 Query: {user_query}")
-results = supply_chain_graph.invoke({"query": user_query})
+with deadline.budget():
+    results = supply_chain_graph.invoke({"query": user_query})
 
 route = results.get("route", "unknown")
 summary = results.get("summary", "")
@@ -63,15 +55,18 @@ documents = results.get("documents", [])
 print(f"🧭 Route: {route}")
 
 # Save context for follow-up queries
-save_session(user_query, documents)
+save_session(user_query, documents, backend="sqlite")
 
 # === Only plot map if user asks ===
 if "map" in user_query.lower():
-    map_output_path = Path(__file__).parent / "static" / "map.html"
-    plot_delay_clusters([doc["summary"] for doc in documents], output_path=str(map_output_path))
-
+    metric = hotspot_metric(user_query)
+    if metric:
+        map_name = cached_hotspot_map(metric)
+    else:
+        map_name = cached_records_map(fetch_records(documents, MAP_COLUMNS))
 
-    if map_output_path.exists():
+    if map_name:
+        map_output_path = Path(get_map_cache().directory) / map_name
         webbrowser.open(map_output_path.resolve().as_uri())
     else:
         print("⚠️ Map file could not be saved.")
@@ -0,0 +1,153 @@
+# serve.py
+"""
+Prefork serving for the API: the encoder, the router centroids, the mmap vector index and the
+analytics frame are loaded once in this parent process, then SERVE_WORKERS uvicorn workers are
+forked onto one shared listening socket. Workers share those pages copy-on-write (model weights
+and frames are never written after loading) and the index through the page cache, so adding a
+worker costs its private heap instead of another full copy, and starts in well under a second.
+
+Chroma clients and the LLM clients hold threads and connections that can't cross fork(): each
+worker opens its own in its lifespan warm-up. Each worker also keeps its own caches; set
+SESSION_BACKEND=sqlite so follow-ups work whichever worker answers. /metrics histograms are
+published by every worker to METRICS_SHARED_DIR and summed, so any worker can answer a scrape.
+
+Usage: python serve.py [--workers 4] [--host 0.0.0.0] [--port 8000]   (Linux / macOS only)
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+# Fork after the tokenizer ran in the parent: keep its Rust thread pool out of the children
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+from config import (
+    METRICS_SHARED_DIR, SERVE_PRELOAD, SERVE_TORCH_THREADS, SERVE_WORKERS, SESSION_BACKEND, VECTOR_BACKEND,
+)
+import metrics
+import startup
+
+RESTART_BACKOFF_SECONDS = 1.0  # a worker dying sooner than this after its start is restarted with a pause
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def set_torch_threads(n: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(n)
+
+
+def preload(components: list[str]) -> dict:
+    """
+    Loads the shared components in the parent. The encoder runs single-threaded here, so no
+    OpenMP pool is alive at fork time (children would deadlock on it).
+    """
+    if VECTOR_BACKEND == "chroma" and "vector_store" in components:
+        print("ℹ️ Chroma is opened per worker (its client can't be shared across fork)")
+        components = [c for c in components if c != "vector_store"]
+    set_torch_threads(1)
+    return startup.warm_up(components, mark_ready=False)
+
+
+def run_worker(sock: socket.socket, threads: int):
+    import uvicorn
+    from main import app
+
+    gc.enable()
+    set_torch_threads(threads)
+    metrics.start_publishing()
+    print(f"👷 Worker {os.getpid()} serving ({threads} encoder thread(s))")
+    uvicorn.Server(uvicorn.Config(app, log_level="info")).run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int):
+    # The GC would touch (and so copy) every shared object's page in every worker: keep it off
+    # while loading and move everything loaded so far out of its reach before forking
+    gc.disable()
+    sock = bind(host, port)
+    threads = SERVE_TORCH_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    if workers > 1 and SESSION_BACKEND == "memory":
+        print("⚠️ SESSION_BACKEND=memory keeps follow-up context per worker; use sqlite with several workers")
+
+    print(f"📦 Preloading {SERVE_PRELOAD} ...")
+    preload([c.strip() for c in SERVE_PRELOAD.split(",") if c.strip()])
+    startup.print_report()
+    import main  # noqa: F401  (app, graph and agent modules are shared too)
+    metrics.share_across_processes(METRICS_SHARED_DIR)
+    gc.freeze()
+
+    children: dict[int, float] = {}  # pid -> start time
+    stopping = False
+
+    def spawn():
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            # Drop the parent's stop handler first: it would signal this worker's siblings
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(sock, threads)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"🚀 Serving on http://{host}:{port} with {workers} worker(s) (parent {os.getpid()})")
+
+    # === Supervise: restart workers that exit until we're told to stop ===
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+        if time.monotonic() - started < RESTART_BACKOFF_SECONDS:
+            time.sleep(RESTART_BACKOFF_SECONDS)
+        if not stopping:
+            spawn()
+    sock.close()
+    print("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
@@ -1,13 +1,167 @@
 # session_context.py
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 
-last_query = None
-last_documents = []
+from config import (
+    SESSION_BACKEND, SESSION_DB_PATH, SESSION_MAX_DOC_IDS, SESSION_MAX_SESSIONS, SESSION_TTL_SECONDS,
+)
 
-def save_session(query, documents):
-    global last_query, last_documents
-    last_query = query
-    last_documents = documents
+DEFAULT_SESSION = "default"  # single-user callers (CLI chatbot / multi_agent_rag)
 
-def load_session():
-    return {"last_query": last_query, "last_documents": last_documents}
+# "show top 3 records", "give me the supporting rows", ... (not "top 3 high risk shipments": that is a new question)
+FOLLOWUP_PATTERN = re.compile(r"\b(top|show|give|supporting)\b.*\b(records?|rows?|entry|entries)\b")
 
+
+def doc_ids(documents: list) -> list[str]:
+    """Document IDs of retrieved docs ({"id", ...} dicts); rows are rehydrated from the master store."""
+    return [str(doc["id"]) for doc in documents if isinstance(doc, dict) and doc.get("id")]
+
+
+def followup_top_n(query: str, default: int = 5) -> int | None:
+    """N for a "show top N records" follow-up, or None if the query isn't one."""
+    q = query.lower()
+    if not FOLLOWUP_PATTERN.search(q):
+        return None
+    match = re.search(r"\b(\d+)\b", q)
+    return int(match.group(1)) if match else default
+
+
+class MemorySessionStore:
+    """
+    Sessions keyed by session ID, kept in process: LRU beyond `max_sessions`, expired
+    after `ttl` seconds idle. Only the last query and up to `max_doc_ids` doc IDs are
+    kept per session, so memory is bounded by max_sessions x max_doc_ids short strings.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, ttl: float = SESSION_TTL_SECONDS,
+                 max_doc_ids: int = SESSION_MAX_DOC_IDS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_doc_ids = max_doc_ids
+        self._sessions: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> dict | None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            now = time.time()
+            if now - session["updated"] > self.ttl:
+                del self._sessions[session_id]
+                return None
+            # Reads count as use for LRU eviction and expiry
+            session["updated"] = now
+            self._sessions.move_to_end(session_id)
+            return dict(session)
+
+    def save(self, session_id: str, query: str, ids: list[str]):
+        with self._lock:
+            self._sessions[session_id] = {"last_query": query, "last_doc_ids": list(ids[:self.max_doc_ids]),
+                                          "updated": time.time()}
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """
+    Same contract as MemorySessionStore, persisted in one SQLite file so sessions survive
+    restarts and are shared by every process on the host (CLI runs, API workers).
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, max_sessions: int = SESSION_MAX_SESSIONS,
+                 ttl: float = SESSION_TTL_SECONDS, max_doc_ids: int = SESSION_MAX_DOC_IDS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_doc_ids = max_doc_ids
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, last_query TEXT, doc_ids TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get(self, session_id: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_query, doc_ids, updated FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > self.ttl:
+                self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._db.commit()
+                return None
+            # Reads count as use for LRU eviction
+            self._db.execute("UPDATE sessions SET updated = ? WHERE session_id = ?", (now, session_id))
+            self._db.commit()
+        return {"last_query": row[0], "last_doc_ids": json.loads(row[1]), "updated": now}
+
+    def save(self, session_id: str, query: str, ids: list[str]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, last_query, doc_ids, updated) VALUES (?, ?, ?, ?)",
+                (session_id, query, json.dumps(list(ids[:self.max_doc_ids])), now),
+            )
+            self._db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl,))
+            self._db.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            self._db.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_session_store(backend: str | None = None):
+    """Shared store for `backend` ("memory" or "sqlite"; default SESSION_BACKEND)."""
+    backend = backend or SESSION_BACKEND
+    with _stores_lock:
+        if backend not in _stores:
+            if backend == "sqlite":
+                _stores[backend] = SQLiteSessionStore()
+            elif backend == "memory":
+                _stores[backend] = MemorySessionStore()
+            else:
+                raise ValueError(f"Unknown SESSION_BACKEND: {backend!r} (expected 'memory' or 'sqlite')")
+        return _stores[backend]
+
+
+def save_session(query: str, documents: list, session_id: str = DEFAULT_SESSION, backend: str | None = None):
+    """Remembers the query and the IDs of its retrieved documents (not the rows)."""
+    get_session_store(backend).save(session_id, query, doc_ids(documents))
+
+
+def load_session(session_id: str = DEFAULT_SESSION, backend: str | None = None) -> dict:
+    session = get_session_store(backend).get(session_id) or {}
+    return {"last_query": session.get("last_query"), "last_doc_ids": session.get("last_doc_ids", [])}
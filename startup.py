@@ -0,0 +1,96 @@
+# startup.py
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_timings: dict[str, float] = {}
+_errors: dict[str, str] = {}
+_ready = threading.Event()
+
+
+@contextmanager
+def timed(component: str):
+    """
+    Records how long `component` took to initialize. A successful load replaces the
+    time of an earlier failed attempt; a failure never overwrites a successful load.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        with _lock:
+            _errors[component] = f"{type(e).__name__}: {e}"
+            _timings.setdefault(component, time.perf_counter() - start)
+        raise
+    else:
+        with _lock:
+            _errors.pop(component, None)
+            _timings[component] = time.perf_counter() - start
+
+
+def _components() -> dict:
+    from agents import analytics_agent, reasoning_agent, retriever_agent, router_agent
+    return {
+        "analytics_engine": analytics_agent.get_engine,
+        "embedding_model": retriever_agent.get_model,
+        "vector_store": retriever_agent.get_backend,
+        "router_centroids": router_agent.get_centroids,
+        "router_llm": router_agent.get_llm,
+        "reasoning_llm": reasoning_agent.get_llm,
+    }
+
+
+def warm_up(components: list[str] | None = None, mark_ready: bool = True) -> dict:
+    """
+    Initializes the selected components (default: all) in parallel and returns the startup report.
+    Failures are recorded in the report instead of raised. `mark_ready=False` loads without
+    flagging the process ready (a prefork parent preloading for its workers, see serve.py).
+    """
+    loaders = _components()
+    names = components or list(loaders)
+    start = time.perf_counter()
+    # A misspelled name (e.g. in SERVE_PRELOAD) is a failed component, not a silently skipped one
+    with _lock:
+        for name in names:
+            if name not in loaders:
+                _errors[name] = f"unknown component (expected one of: {', '.join(loaders)})"
+    names = [n for n in names if n in loaders]
+
+    def load(name):
+        try:
+            loaders[name]()
+        except Exception:
+            traceback.print_exc()
+
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+        list(pool.map(load, names))
+
+    with _lock:
+        _timings["warm_up_total"] = time.perf_counter() - start
+        if mark_ready and not any(n in _errors for n in components or names):
+            _ready.set()
+    return report()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def report() -> dict:
+    with _lock:
+        return {
+            "ready": _ready.is_set(),
+            "components_seconds": {k: round(v, 4) for k, v in _timings.items()},
+            "errors": dict(_errors),
+        }
+
+
+def print_report():
+    r = report()
+    for name, secs in r["components_seconds"].items():
+        print(f"   ⏱️  {name}: {secs:.2f}s")
+    for name, err in r["errors"].items():
+        print(f"   ❌ {name}: {err}")
@@ -0,0 +1,104 @@
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+# === Classification thresholds ===
+LOW = 0.3
+HIGH = 0.7
+LABELS = np.array(["low", "moderate", "high"], dtype=object)
+
+
+def classify(value, low=LOW, high=HIGH):
+    if pd.isna(value):
+        return "unknown"
+    if value < low:
+        return "low"
+    elif value < high:
+        return "moderate"
+    else:
+        return "high"
+
+
+def generate_summary(row):
+    return (
+        f"On {row['timestamp']}, a shipment near GPS ({row['vehicle_gps_latitude']:.2f}, {row['vehicle_gps_longitude']:.2f}) "
+        f"experienced {classify(row['traffic_congestion_level'])} traffic congestion, "
+        f"{classify(row['fuel_consumption_rate'])} fuel consumption, and "
+        f"{classify(1 - row['fatigue_monitoring_score'])} driver fatigue. "
+        f"Supplier reliability was {classify(row['supplier_reliability_score'])}, "
+        f"with delay probability marked as {round(row['delay_probability'], 2)}. "
+        f"Warehouse inventory was {classify(row['warehouse_inventory_level'])}, and shipping costs were {classify(row['shipping_costs'])}. "
+        f"Weather conditions were {classify(row['weather_condition_severity'])}, and "
+        f"customs clearance took approximately {round(row['customs_clearance_time'], 1)} hours. "
+        f"Port congestion was {classify(row['port_congestion_level'])}, route risk level was {classify(row['route_risk_level'])}, and "
+        f"driver behavior score was {classify(row['driver_behavior_score'])}. "
+        f"The temperature was {round(row['iot_temperature'], 1)}°C and historical demand was {round(row['historical_demand'], 1)} units. "
+        f"Lead time was {round(row['lead_time_days'], 1)} days and order fulfillment was {classify(row['order_fulfillment_status'])}. "
+        f"The disruption likelihood was {classify(row['disruption_likelihood_score'])}. "
+        f"The cargo condition was {classify(row['cargo_condition_status'])}, and handling equipment availability was {classify(row['handling_equipment_availability'])}. "
+        f"Loading/unloading time was {classify(row['loading_unloading_time'])}. "
+        f"Overall, the risk classification was marked as {row['risk_classification']}."
+    )
+
+
+# === Column-wise summary builder ===
+def classify_column(values, low=LOW, high=HIGH) -> np.ndarray:
+    """
+    Vectorized `classify`: buckets a whole column into low/moderate/high/unknown labels.
+    """
+    arr = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    labels = LABELS[np.searchsorted([low, high], arr, side="right")]
+    labels[np.isnan(arr)] = "unknown"
+    return labels
+
+
+def _fmt(values, spec: str) -> list[str]:
+    return [format(v, spec) for v in values]
+
+
+def _rounded(values, digits: int) -> list[str]:
+    # Python's round() is kept so the text stays byte-identical to generate_summary
+    return [str(round(v, digits)) for v in values]
+
+
+def generate_summaries(df: pd.DataFrame) -> pd.Series:
+    """
+    Builds the same text as `df.apply(generate_summary, axis=1)`, one column at a time.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+
+    col = lambda name: df[name].tolist()
+    c = lambda name: classify_column(df[name])
+
+    parts = [
+        "On ", [str(v) for v in col("timestamp")],
+        ", a shipment near GPS (", _fmt(col("vehicle_gps_latitude"), ".2f"),
+        ", ", _fmt(col("vehicle_gps_longitude"), ".2f"),
+        ") experienced ", c("traffic_congestion_level"),
+        " traffic congestion, ", c("fuel_consumption_rate"),
+        " fuel consumption, and ", classify_column(1 - df["fatigue_monitoring_score"]),
+        " driver fatigue. Supplier reliability was ", c("supplier_reliability_score"),
+        ", with delay probability marked as ", _rounded(col("delay_probability"), 2),
+        ". Warehouse inventory was ", c("warehouse_inventory_level"),
+        ", and shipping costs were ", c("shipping_costs"),
+        ". Weather conditions were ", c("weather_condition_severity"),
+        ", and customs clearance took approximately ", _rounded(col("customs_clearance_time"), 1),
+        " hours. Port congestion was ", c("port_congestion_level"),
+        ", route risk level was ", c("route_risk_level"),
+        ", and driver behavior score was ", c("driver_behavior_score"),
+        ". The temperature was ", _rounded(col("iot_temperature"), 1),
+        "°C and historical demand was ", _rounded(col("historical_demand"), 1),
+        " units. Lead time was ", _rounded(col("lead_time_days"), 1),
+        " days and order fulfillment was ", c("order_fulfillment_status"),
+        ". The disruption likelihood was ", c("disruption_likelihood_score"),
+        ". The cargo condition was ", c("cargo_condition_status"),
+        ", and handling equipment availability was ", c("handling_equipment_availability"),
+        ". Loading/unloading time was ", c("loading_unloading_time"),
+        ". Overall, the risk classification was marked as ", [str(v) for v in col("risk_classification")],
+        ".",
+    ]
+
+    columns = [repeat(part) if isinstance(part, str) else part for part in parts]
+    return pd.Series(["".join(pieces) for pieces in zip(*columns)], index=df.index, dtype=object)
@@ -0,0 +1,18 @@
+import numpy as np
+
+from answer_cache import AnswerCache
+
+
+def test_semantic_hit_requires_same_documents(tmp_path):
+    cache = AnswerCache(path="", store_path=str(tmp_path / "store"))
+    january = [{"id": "a1"}, {"id": "a2"}, {"id": "a3"}]
+    february = [{"id": "b1"}, {"id": "b2"}, {"id": "b3"}]
+    embedding = np.ones(8, dtype=np.float32)
+    near = embedding + np.float32(0.01)
+
+    cache.put_answer("top 3 delayed shipments in 2024-01", january, "v", "January answer", embedding)
+
+    # Near-identical wording over other records must not reuse the answer
+    assert cache.get_answer("top 3 delayed shipments in 2024-02", february, "v", near) is None
+    # A paraphrase over the same records may
+    assert cache.get_answer("the top 3 delayed shipments for 2024-01", january, "v", near) == "January answer"
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+import deadline
+from config import LLM_HEDGE_MIN_SAMPLES
+
+
+@pytest.fixture(autouse=True)
+def fresh_latencies():
+    deadline._latencies.clear()
+    yield
+    deadline._latencies.clear()
+
+
+def seed(name, seconds=0.05):
+    for _ in range(LLM_HEDGE_MIN_SAMPLES):
+        deadline._record(name, seconds)
+
+
+def attempts(*behaviours):
+    """make_call whose n-th attempt sleeps, then returns its label or raises."""
+    calls = []
+
+    async def make_call():
+        delay, outcome = behaviours[len(calls)]
+        calls.append(outcome)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return make_call, calls
+
+
+def test_slow_call_raises_deadline_exceeded():
+    make_call, _ = attempts((5, "late"))
+    start = time.perf_counter()
+    with pytest.raises(deadline.DeadlineExceeded):
+        asyncio.run(deadline.acall("llm", make_call, cap=0.2))
+    assert time.perf_counter() - start < 1
+
+
+def test_request_budget_bounds_the_call():
+    make_call, _ = attempts((5, "late"))
+    with deadline.budget(0.2):
+        with pytest.raises(deadline.DeadlineExceeded):
+            asyncio.run(deadline.acall("llm", make_call, cap=10))
+    with deadline.budget(0):
+        with pytest.raises(deadline.DeadlineExceeded):
+            asyncio.run(deadline.acall("llm", make_call, cap=10))
+
+
+def test_no_hedge_without_enough_samples():
+    make_call, calls = attempts((0.2, "first"), (0, "hedge"))
+    assert asyncio.run(deadline.acall("llm", make_call, cap=2)) == "first"
+    assert calls == ["first"]
+
+
+def test_hedge_answers_when_the_first_attempt_is_slow():
+    seed("llm")
+    make_call, calls = attempts((2, "first"), (0, "hedge"))
+    start = time.perf_counter()
+    assert asyncio.run(deadline.acall("llm", make_call, cap=5)) == "hedge"
+    assert calls == ["first", "hedge"]
+    assert time.perf_counter() - start < 1
+
+
+def test_hedge_still_answers_after_the_first_attempt_fails():
+    seed("llm")
+    make_call, _ = attempts((0.1, RuntimeError("boom")), (0.3, "hedge"))
+    assert asyncio.run(deadline.acall("llm", make_call, cap=5)) == "hedge"
+
+
+def test_first_error_is_raised_once_every_attempt_failed():
+    seed("llm")
+    make_call, _ = attempts((0.1, RuntimeError("first")), (0.1, ValueError("hedge")))
+    with pytest.raises(RuntimeError, match="first"):
+        asyncio.run(deadline.acall("llm", make_call, cap=5))
+
+
+def test_blocking_call_hedges_too():
+    seed("llm")
+    behaviours = iter([(1, "first"), (0, "hedge")])
+
+    def make_call():
+        delay, outcome = next(behaviours)
+        time.sleep(delay)
+        return outcome
+
+    assert deadline.call("llm", make_call, cap=5) == "hedge"
@@ -0,0 +1,27 @@
+import os
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def fake_encode(texts):
+    return np.array([[float(len(t)), float(i + 1), 1.0] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_crash_inside_compact_does_not_pair_keys_with_stale_vectors(tmp_path):
+    path = str(tmp_path / "cache")
+    cache = EmbeddingCache(path, "model")
+    cache.encode(["old one", "old two", "old three"], fake_encode)
+
+    # Crash right after compact removed keys.bin, before the new files were moved in
+    os.remove(os.path.join(path, "keys.bin"))
+
+    reopened = EmbeddingCache(path, "model")
+    assert len(reopened) == 0
+    fresh = reopened.encode(["new text"], fake_encode)
+    np.testing.assert_array_equal(fresh, fake_encode(["new text"]))
+
+    # And the pairing holds after another reopen (read back from disk)
+    again = EmbeddingCache(path, "model")
+    np.testing.assert_array_equal(again.encode(["new text"], lambda t: 1 / 0), fake_encode(["new text"]))
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from master_store import MasterStore
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=["timestamp", "vehicle_gps_latitude", "vehicle_gps_longitude", "delay"])
+
+
+ROWS = [
+    ("2024-01-05 10:00:00", 40.0, -73.0, 1.5),
+    ("2024-01-20 11:00:00", 41.0, -74.0, 0.0),
+    ("2024-02-02 12:00:00", 42.0, -75.0, 3.0),
+]
+
+
+def test_diff_append_delete_and_re_add(tmp_path):
+    store = MasterStore(str(tmp_path / "store"))
+    new = store.diff(frame(ROWS))
+    assert len(new) == 3
+    store.append(new)
+    assert len(store) == 3
+    assert store.diff(frame(ROWS)).empty
+
+    # A changed value is a new version of the same document
+    changed = store.diff(frame([(*ROWS[0][:3], 9.0)]))
+    assert list(changed["doc_id"]) == [new["doc_id"].iloc[0]]
+    store.append(changed)
+    assert len(store) == 3
+    assert store.fetch([new["doc_id"].iloc[0]], ["delay"])["delay"].tolist() == [9.0]
+
+    gone = new["doc_id"].iloc[1]
+    assert store.delete([gone, "unknown"]) == [gone]
+    assert store.delete([gone]) == []
+    assert len(store) == 2
+    assert store.fetch([gone]).empty
+
+    # Deleted rows come back as new when they show up again
+    again = store.diff(frame([ROWS[1]]))
+    assert list(again["doc_id"]) == [gone]
+    store.append(again)
+    assert len(store) == 3
+    assert sorted(store.read()["doc_id"]) == sorted(new["doc_id"])
+
+
+def test_fetch_keeps_order_and_projects_columns(tmp_path):
+    store = MasterStore(str(tmp_path / "store"))
+    new = store.diff(frame(ROWS))
+    store.append(new)
+    ids = list(new["doc_id"])[::-1] + ["unknown"]
+    fetched = store.fetch(ids, ["delay"])
+    assert list(fetched.columns) == ["delay"]
+    assert fetched["delay"].tolist() == [3.0, 0.0, 1.5]
+    assert set(store.columns()) >= {"timestamp", "delay", "doc_id", "fingerprint"}
+
+
+def test_ids_and_fingerprints_ignore_inferred_dtypes(tmp_path):
+    store = MasterStore(str(tmp_path / "store"))
+    as_int = pd.DataFrame({"timestamp": ["2024-01-05 10:00:00"], "vehicle_gps_latitude": [40],
+                           "vehicle_gps_longitude": [-73], "delay": [1]})
+    as_float = as_int.astype({"vehicle_gps_latitude": float, "vehicle_gps_longitude": float, "delay": float})
+    store.append(store.diff(as_int))
+    assert store.diff(as_float).empty
+
+
+def test_reserved_rows_until_append_or_release(tmp_path):
+    store = MasterStore(str(tmp_path / "store"))
+    assert len(store.diff(frame(ROWS))) == 3
+    assert store.diff(frame(ROWS)).empty  # reserved by the first diff
+    store.release()
+    assert len(store.diff(frame(ROWS))) == 3
@@ -0,0 +1,64 @@
+import types
+
+import pytest
+
+import session_context
+from session_context import MemorySessionStore, SQLiteSessionStore, followup_top_n
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(t=1_000_000.0)
+    monkeypatch.setattr(session_context, "time", types.SimpleNamespace(time=lambda: now.t))
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemorySessionStore(**kwargs)
+        return SQLiteSessionStore(str(tmp_path / "sessions.sqlite"), **kwargs)
+    return make
+
+
+def test_save_get_delete_keeps_at_most_max_doc_ids(make_store, clock):
+    store = make_store(max_sessions=10, ttl=60, max_doc_ids=2)
+    store.save("a", "delays in March", ["d1", "d2", "d3"])
+    session = store.get("a")
+    assert (session["last_query"], session["last_doc_ids"]) == ("delays in March", ["d1", "d2"])
+    store.delete("a")
+    assert store.get("a") is None
+    assert store.get("never") is None
+
+
+def test_idle_sessions_expire(make_store, clock):
+    store = make_store(max_sessions=10, ttl=60, max_doc_ids=5)
+    store.save("a", "q", ["d1"])
+    clock.t += 59
+    assert store.get("a") is not None  # a read counts as use
+    clock.t += 59
+    assert store.get("a") is not None
+    clock.t += 61
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def test_least_recently_used_session_is_evicted(make_store, clock):
+    store = make_store(max_sessions=2, ttl=60, max_doc_ids=5)
+    store.save("a", "q", ["d1"])
+    clock.t += 1
+    store.save("b", "q", ["d2"])
+    clock.t += 1
+    store.get("a")
+    clock.t += 1
+    store.save("c", "q", ["d3"])
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+
+def test_followup_top_n():
+    assert followup_top_n("show me the top 3 records") == 3
+    assert followup_top_n("give me the supporting rows") == 5
+    assert followup_top_n("why are trucks late?") is None
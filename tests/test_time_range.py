@@ -0,0 +1,40 @@
+import pandas as pd
+
+from time_range import months_between, parse_time_range
+
+NOW = pd.Timestamp("2024-03-15 12:00:00")
+
+
+def test_relative_windows():
+    assert parse_time_range("delays in the last 2 weeks", NOW) == (NOW - pd.DateOffset(weeks=2), NOW)
+    assert parse_time_range("past month", NOW) == (NOW - pd.DateOffset(months=1), NOW)
+    assert parse_time_range("what happened today", NOW) == (pd.Timestamp("2024-03-15"), NOW)
+    assert parse_time_range("yesterday", NOW) == (pd.Timestamp("2024-03-14"), pd.Timestamp("2024-03-15"))
+    assert parse_time_range("this year", NOW) == (pd.Timestamp("2024-01-01"), NOW)
+
+
+def test_calendar_windows():
+    march = (pd.Timestamp("2024-03-01"), pd.Timestamp("2024-04-01") - pd.Timedelta(1, "ns"))
+    assert parse_time_range("delays in March 2024", NOW) == march
+    assert parse_time_range("delays in 2024-03", NOW) == march
+    assert parse_time_range("since 2024-01-15", NOW) == (pd.Timestamp("2024-01-15"), NOW)
+    start, end = parse_time_range("in 2023", NOW)
+    assert (start, end.year) == (pd.Timestamp("2023-01-01"), 2023)
+
+
+def test_quantities_and_impossible_dates_are_not_windows():
+    assert parse_time_range("orders in 5000 units", NOW) is None
+    assert parse_time_range("shipments in 1850", NOW) is None
+    assert parse_time_range("delays in 2024-13", NOW) is None
+    assert parse_time_range("since 9999-01", NOW) is None
+    assert parse_time_range("average delay per route", NOW) is None
+
+
+def test_huge_counts_are_capped_instead_of_overflowing():
+    start, end = parse_time_range("last 100000000 days", NOW)
+    assert end == NOW
+    assert start >= NOW - pd.DateOffset(years=101)
+
+
+def test_months_between_any_order():
+    assert months_between(pd.Timestamp("2024-03-02"), pd.Timestamp("2024-01-31")) == ["2024-01", "2024-02", "2024-03"]
@@ -0,0 +1,91 @@
+import numpy as np
+
+from vector_backends import MmapBackend
+
+
+def make_index(path, n=4096, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    backend = MmapBackend(str(path), writable=True)
+    ids = [f"d{i}" for i in range(n)]
+    backend.upsert(ids, rng.normal(size=(n, dim)).astype(np.float32))
+    return backend, rng
+
+
+def brute_force(backend, queries, top_k):
+    backend.nprobe = 0
+    try:
+        return backend.search(queries, top_k)
+    finally:
+        backend.nprobe = len(backend._ivf["centroids"]) if backend._ivf is not None else 0
+
+
+def test_ivf_finds_rows_rewritten_after_the_build(tmp_path):
+    backend, rng = make_index(tmp_path / "index")
+    backend.delete(["d5"])  # not live at build time: in no inverted list
+    backend.build_ivf(nlist=16)
+    query = rng.normal(size=(1, 16)).astype(np.float32)
+
+    # Re-upserted into its old slot with the query's own vector
+    backend.upsert(["d5"], query)
+    backend.nprobe = 16  # every list: IVF must agree with exact search
+    ivf = backend.search(query, 3)[0]
+    assert [i for i, _ in ivf] == [i for i, _ in brute_force(backend, query, 3)[0]]
+    assert ivf[0][0] == "d5"
+
+    # Updated in place: its old list is probably not the one the new vector probes
+    moved = -query
+    backend.upsert(["d7"], moved)
+    backend.nprobe = 1
+    assert backend.search(moved, 1)[0][0][0] == "d7"
+
+    # Readers in other processes see the same rows as dirty
+    backend.flush()
+    reader = MmapBackend(str(tmp_path / "index"), nprobe=1)
+    assert reader.search(moved, 1)[0][0][0] == "d7"
+
+
+def test_ivf_batch_matches_single_queries(tmp_path):
+    backend, rng = make_index(tmp_path / "index")
+    backend.build_ivf(nlist=16)
+    backend.nprobe = 4
+    queries = rng.normal(size=(100, 16)).astype(np.float32)
+    batched = backend.search(queries, 5)
+    single = [backend.search(q[None], 5)[0] for q in queries]
+    assert [[i for i, _ in hits] for hits in batched] == [[i for i, _ in hits] for hits in single]
+
+
+def stored(vectors):
+    """What the index keeps: unit vectors in float16."""
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float16).astype(np.float32)
+
+
+def test_search_matches_numpy_after_deletes_and_re_upserts(tmp_path):
+    n, dim = 512, 16
+    rng = np.random.default_rng(1)
+    backend = MmapBackend(str(tmp_path / "index"), writable=True)
+    initial = rng.normal(size=(n, dim)).astype(np.float32)
+    backend.upsert([f"d{i}" for i in range(n)], initial)
+    vectors = dict(zip([f"d{i}" for i in range(n)], stored(initial)))
+
+    deleted = [f"d{i}" for i in range(0, n, 7)]
+    backend.delete(deleted)
+    for k in deleted:
+        del vectors[k]
+    # Updates in place, re-adds of deleted IDs (d7, d21, d35) and one new ID
+    rewritten = [f"d{i}" for i in range(1, 41, 2)] + ["new"]
+    moved = rng.normal(size=(len(rewritten), dim)).astype(np.float32)
+    backend.upsert(rewritten, moved)
+    vectors.update(zip(rewritten, stored(moved)))
+
+    queries = rng.normal(size=(10, dim)).astype(np.float32)
+    ids = list(vectors)
+    scores = stored(queries) @ np.vstack([vectors[k] for k in ids]).T
+    expected = [{ids[j] for j in np.argsort(-row)[:5]} for row in scores]
+    for nlist in (0, 8):
+        if nlist:
+            backend.build_ivf(nlist=nlist)
+            backend.nprobe = nlist  # every list: must agree with exact search
+        found = [{i for i, _ in hits} for hits in backend.search(queries, 5)]
+        assert found == expected
+        assert not set().union(*found) & (set(deleted) - set(rewritten))
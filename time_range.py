@@ -0,0 +1,92 @@
+import re
+
+import pandas as pd
+
+MONTH_NAMES = ["january", "february", "march", "april", "may", "june", "july",
+               "august", "september", "october", "november", "december"]
+MONTH_PATTERN = "|".join(MONTH_NAMES + [m[:3] for m in MONTH_NAMES] + ["sept"])
+UNITS = {"day": "D", "week": "W", "month": "M", "year": "Y"}
+WORD_NUMBERS = {"a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "six": 6, "twelve": 12}
+# A 4-digit number outside these years is a quantity ("in 5000 units"), not a date
+MIN_YEAR, MAX_YEAR = 1900, 2100
+# "last N <unit>" is capped at ~100 years back
+MAX_COUNT = {"D": 36_500, "W": 5_200, "M": 1_200, "Y": 100}
+
+TimeRange = tuple[pd.Timestamp, pd.Timestamp]
+
+
+def _offset(n: int, unit: str) -> pd.DateOffset:
+    return {
+        "D": pd.DateOffset(days=n), "W": pd.DateOffset(weeks=n),
+        "M": pd.DateOffset(months=n), "Y": pd.DateOffset(years=n),
+    }[unit]
+
+
+def _plausible_year(year: str) -> bool:
+    return MIN_YEAR <= int(year) <= MAX_YEAR
+
+
+def parse_time_range(query: str, now: pd.Timestamp) -> TimeRange | None:
+    """
+    Extracts an explicit time window from a question, e.g. "last 2 weeks", "this month",
+    "yesterday", "in March 2024", "2024-03", "since 2024-01-15". Relative phrases are
+    anchored at `now` (callers pass the newest ingested timestamp, not the wall clock).
+    Returns None when the question doesn't mention a time window (or names one pandas
+    can't represent: no filter rather than an error).
+    """
+    try:
+        return _parse(query, now)
+    except (ValueError, OverflowError):  # includes OutOfBoundsDatetime
+        return None
+
+
+def _parse(query: str, now: pd.Timestamp) -> TimeRange | None:
+    q = query.lower()
+    now = pd.Timestamp(now)
+    today = now.normalize()
+
+    m = re.search(r"\b(?:last|past|previous)\s+(\d+|a|one|two|three|four|six|twelve)?\s*(day|week|month|year)s?\b", q)
+    if m:
+        n = int(m.group(1)) if (m.group(1) or "").isdigit() else WORD_NUMBERS.get(m.group(1), 1)
+        unit = UNITS[m.group(2)]
+        return now - _offset(min(n, MAX_COUNT[unit]), unit), now
+
+    if re.search(r"\btoday\b", q):
+        return today, now
+    if re.search(r"\byesterday\b", q):
+        return today - pd.DateOffset(days=1), today
+
+    m = re.search(r"\bthis\s+(week|month|year)\b", q)
+    if m:
+        start = {"week": today - pd.DateOffset(days=today.dayofweek),
+                 "month": today.replace(day=1),
+                 "year": today.replace(month=1, day=1)}[m.group(1)]
+        return start, now
+
+    m = re.search(r"\bsince\s+(\d{4}-\d{2}(?:-\d{2})?)\b", q)
+    if m and _plausible_year(m.group(1)[:4]):
+        return pd.Timestamp(m.group(1)), now
+
+    m = re.search(r"\b(\d{4})-(\d{2})\b(?!-\d)", q)
+    if m and _plausible_year(m.group(1)) and 1 <= int(m.group(2)) <= 12:
+        start = pd.Timestamp(year=int(m.group(1)), month=int(m.group(2)), day=1)
+        return start, start + pd.DateOffset(months=1) - pd.Timedelta(1, "ns")
+
+    m = re.search(rf"\b({MONTH_PATTERN})\.?\s+(\d{{4}})\b", q)
+    if m and _plausible_year(m.group(2)):
+        month = [n[:3] for n in MONTH_NAMES].index(m.group(1)[:3]) + 1
+        start = pd.Timestamp(year=int(m.group(2)), month=month, day=1)
+        return start, start + pd.DateOffset(months=1) - pd.Timedelta(1, "ns")
+
+    m = re.search(r"\bin\s+(\d{4})\b(?!-\d)", q)
+    if m and _plausible_year(m.group(1)):
+        start = pd.Timestamp(year=int(m.group(1)), month=1, day=1)
+        return start, start + pd.DateOffset(years=1) - pd.Timedelta(1, "ns")
+    return None
+
+
+def months_between(start: pd.Timestamp, end: pd.Timestamp) -> list[str]:
+    """YYYY-MM shard keys overlapping [start, end]."""
+    if end < start:
+        start, end = end, start
+    return [p.strftime("%Y-%m") for p in pd.period_range(start.to_period("M"), end.to_period("M"), freq="M")]
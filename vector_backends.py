@@ -0,0 +1,626 @@
+import json
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+import numpy as np
+
+from config import (
+    CHROMA_PATH, COLLECTION_NAME, IVF_NLIST, IVF_NPROBE, SHARD_SEARCH_WORKERS, VECTOR_INDEX_PATH, VECTOR_SHARDING,
+)
+
+# === Config ===
+PAGE_SIZE = 5000        # ids per page when listing a backend
+SEARCH_BLOCK = 16384    # rows converted to float32 at a time during exact search
+ID_WIDTH = 32           # max bytes per document ID in the mmap index
+FINGERPRINT_WIDTH = 16
+RELOAD_CHECK_SECONDS = 1.0
+SHARD_SEPARATOR = "__"  # Chroma shard collections are named <COLLECTION_NAME>__<YYYY-MM>
+UNKNOWN_MONTH = "unknown"
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class VectorBackend(ABC):
+    """
+    What the retriever and the ingest scripts need from a vector store.
+
+    `search` returns (id, score) pairs, best first; `query` returns (id, summary, score).
+    Both take a batch of embeddings and return one list per query. Scores are only
+    comparable within one backend (higher is better). `months` restricts a sharded
+    backend to those YYYY-MM shards and is ignored by the others. A backend missing one of
+    the abstract methods fails when it is opened, not halfway through an ingest.
+    """
+
+    @abstractmethod
+    def search(self, embeddings, top_k: int, months: list[str] | None = None) -> list[list[tuple[str, float]]]:
+        ...
+
+    @abstractmethod
+    def query(self, embeddings, top_k: int, months: list[str] | None = None) -> list[list[tuple[str, str, float]]]:
+        ...
+
+    @abstractmethod
+    def upsert(self, ids: list[str], embeddings, documents: list[str], metadatas: list[dict]):
+        ...
+
+    @abstractmethod
+    def delete(self, ids: list[str]):
+        ...
+
+    @abstractmethod
+    def fingerprints(self, ids: list[str]) -> dict[str, str]:
+        """Stored content fingerprint of each known ID (unknown IDs are omitted)."""
+
+    @abstractmethod
+    def ids(self) -> Iterable[list[str]]:
+        """All stored IDs, one page at a time."""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    def flush(self):
+        """Makes pending writes visible to other processes."""
+
+    def optimize(self):
+        """Rebuilds secondary search structures if they are stale (called at the end of ingest)."""
+
+
+class ChromaBackend(VectorBackend):
+    def __init__(self, collection):
+        self.collection = collection
+
+    @classmethod
+    def open(cls, path: str = CHROMA_PATH, name: str = COLLECTION_NAME, create: bool = False, rebuild: bool = False):
+        from chromadb import PersistentClient
+        client = PersistentClient(path=path)
+        available_collections = [c.name for c in client.list_collections()]
+        if rebuild and name in available_collections:
+            client.delete_collection(name=name)
+        if create:
+            return cls(client.get_or_create_collection(name=name))
+
+        print("✅ Available collections:", available_collections)
+        # === Error if collection missing ===
+        if name not in available_collections:
+            raise ValueError(f"❌ Collection '{name}' not found in ChromaDB. Found: {available_collections}")
+        return cls(client.get_collection(name=name))
+
+    def search(self, embeddings, top_k: int, months=None):
+        results = self.collection.query(query_embeddings=list(embeddings), n_results=top_k, include=["distances"])
+        return [[(i, -d) for i, d in zip(ids, dists)] for ids, dists in zip(results["ids"], results["distances"])]
+
+    def query(self, embeddings, top_k: int, months=None):
+        # Metadata is just the fingerprint; skip deserializing it
+        results = self.collection.query(
+            query_embeddings=list(embeddings), n_results=top_k, include=["documents", "distances"]
+        )
+        return [
+            [(i, doc, -d) for i, doc, d in zip(ids, documents, dists)]
+            for ids, documents, dists in zip(results["ids"], results["documents"], results["distances"])
+        ]
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def fingerprints(self, ids):
+        existing = self.collection.get(ids=list(ids), include=["metadatas"])
+        return {i: (m or {}).get("fingerprint") for i, m in zip(existing["ids"], existing["metadatas"])}
+
+    def ids(self):
+        for offset in range(0, self.collection.count(), PAGE_SIZE):
+            yield self.collection.get(include=[], limit=PAGE_SIZE, offset=offset)["ids"]
+
+    def count(self):
+        return self.collection.count()
+
+
+class MmapBackend(VectorBackend):
+    """
+    In-process exact (or IVF) search over normalized float16 embeddings in a memory-mapped file.
+
+    Layout under `path`:
+        meta.json     -> dim, count, capacity
+        vectors.f16   -> capacity x dim float16 matrix (rows past `count` are unused)
+        ids.npy       -> doc ID per row (fixed-width bytes)
+        fingerprints.npy / live.npy -> content fingerprint and not-deleted flag per row
+        ivf.npz       -> optional coarse quantizer (see build_ivf)
+        dirty.npy     -> rows the quantizer covers that were rewritten since it was built
+
+    Only vectors are stored here; hits get their summary from the master store. Writers update rows in place or append, then `flush()`;
+    readers in other processes pick up the new `meta.json` within a second.
+    """
+
+    def __init__(self, path: str = VECTOR_INDEX_PATH, store=None, writable: bool = False, nprobe: int = IVF_NPROBE):
+        self.path = path
+        self.writable = writable
+        self.nprobe = nprobe
+        self._store = store
+        self._lock = threading.RLock()
+        self._meta_path = os.path.join(path, "meta.json")
+        self._vectors_path = os.path.join(path, "vectors.f16")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+        self._row: dict[str, int] | None = None  # doc ID -> row, built on first write
+        self._checked_at = 0.0
+        self._loaded_mtime = None
+        if writable:
+            os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def open(cls, path: str = VECTOR_INDEX_PATH, create: bool = False, rebuild: bool = False, store=None):
+        if rebuild and os.path.exists(path):
+            shutil.rmtree(path)
+        if not create and not os.path.exists(os.path.join(path, "meta.json")):
+            raise ValueError(f"❌ Vector index not found at '{path}'. Run ingest.py with VECTOR_BACKEND=mmap first.")
+        return cls(path, store=store, writable=create)
+
+    # === Files ===
+    def _load(self):
+        self.dim, self._count, self._capacity = None, 0, 0
+        self._vectors = None
+        self._ids = np.empty(0, dtype=f"S{ID_WIDTH}")
+        self._fingerprints = np.empty(0, dtype=f"S{FINGERPRINT_WIDTH}")
+        self._live = np.empty(0, dtype=bool)
+        self._dirty = np.empty(0, dtype=bool)
+        self._ivf = None
+        if not os.path.exists(self._meta_path):
+            return
+        self._loaded_mtime = os.stat(self._meta_path).st_mtime_ns
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self.dim, self._count, self._capacity = meta["dim"], meta["count"], meta["capacity"]
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float16, mode="r+" if self.writable else "r",
+                                  shape=(self._capacity, self.dim))
+        self._ids = np.load(os.path.join(self.path, "ids.npy"))
+        self._fingerprints = np.load(os.path.join(self.path, "fingerprints.npy"))
+        self._live = np.load(os.path.join(self.path, "live.npy"))
+        dirty_path = os.path.join(self.path, "dirty.npy")
+        self._dirty = np.load(dirty_path) if os.path.exists(dirty_path) else np.empty(0, dtype=bool)
+        self._pad_rows()
+        if os.path.exists(self._ivf_path):
+            with np.load(self._ivf_path) as ivf:
+                self._ivf = {k: ivf[k] for k in ivf.files}
+        self._row = None
+
+    def _maybe_reload(self):
+        """Readers follow a writer in another process (e.g. dynamic_ingest) via meta.json."""
+        if self.writable or time.time() - self._checked_at < RELOAD_CHECK_SECONDS:
+            return
+        with self._lock:
+            self._checked_at = time.time()
+            try:
+                mtime = os.stat(self._meta_path).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime != self._loaded_mtime:
+                self._load()
+
+    def _save_array(self, name: str, array: np.ndarray):
+        tmp = os.path.join(self.path, f"{name}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, os.path.join(self.path, name))
+
+    def flush(self):
+        if not self.writable or self.dim is None:
+            return
+        with self._lock:
+            self._vectors.flush()
+            n = self._count
+            self._save_array("ids.npy", self._ids[:n])
+            self._save_array("fingerprints.npy", self._fingerprints[:n])
+            self._save_array("live.npy", self._live[:n])
+            self._save_array("dirty.npy", self._dirty[:n])
+            # meta.json goes last: readers never see a count the other files don't cover
+            tmp = f"{self._meta_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"dim": self.dim, "count": n, "capacity": self._capacity}, f)
+            os.replace(tmp, self._meta_path)
+
+    # === Writes ===
+    def _rows(self) -> dict[str, int]:
+        if self._row is None:
+            self._row = {k.decode(): i for i, k in enumerate(self._ids[:self._count])}
+        return self._row
+
+    def _pad_rows(self):
+        # Per-row arrays are saved up to `count`; in memory they span `capacity`
+        for name in ("_ids", "_fingerprints", "_live", "_dirty"):
+            old = getattr(self, name)
+            grown = np.zeros(self._capacity, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def _grow(self, needed: int):
+        capacity = max(needed, self._capacity * 2, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 2)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+        self._pad_rows()
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        if not self.writable:
+            raise RuntimeError("MmapBackend opened read-only")
+        vectors = _normalize(embeddings).astype(np.float16)
+        fingerprints = [(m or {}).get("fingerprint") or "" for m in metadatas] if metadatas else [""] * len(ids)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            rows = self._rows()
+            positions = []
+            for doc_id in ids:
+                if doc_id not in rows:
+                    if len(doc_id.encode()) > ID_WIDTH:
+                        raise ValueError(f"Document ID longer than {ID_WIDTH} bytes: {doc_id!r}")
+                    rows[doc_id] = self._count
+                    self._count += 1
+                positions.append(rows[doc_id])
+            if self._count > self._capacity:
+                self._grow(self._count)
+            positions = np.asarray(positions, dtype=np.int64)
+            self._vectors[positions] = vectors
+            self._ids[positions] = np.asarray(ids, dtype=f"S{ID_WIDTH}")
+            self._fingerprints[positions] = np.asarray(fingerprints, dtype=f"S{FINGERPRINT_WIDTH}")
+            self._live[positions] = True
+            if self._ivf is not None:
+                # Rewritten (or revived) rows may no longer sit in the list they were assigned to,
+                # or in none at all: search them exhaustively, like the tail, until the next build
+                self._dirty[positions[positions < int(self._ivf["covered"])]] = True
+
+    def delete(self, ids):
+        with self._lock:
+            rows = self._rows()
+            positions = [rows[i] for i in ids if i in rows]
+            self._live[positions] = False
+
+    def fingerprints(self, ids):
+        with self._lock:
+            rows = self._rows()
+            return {
+                i: self._fingerprints[rows[i]].decode() for i in ids
+                if i in rows and self._live[rows[i]]
+            }
+
+    def ids(self):
+        self._maybe_reload()
+        live = np.flatnonzero(self._live[:self._count])
+        for start in range(0, len(live), PAGE_SIZE):
+            yield [k.decode() for k in self._ids[live[start:start + PAGE_SIZE]]]
+
+    def count(self):
+        self._maybe_reload()
+        return int(self._live[:self._count].sum())
+
+    # === Coarse quantizer (IVF) ===
+    def build_ivf(self, nlist: int = IVF_NLIST, iterations: int = 10, sample: int = 256, seed: int = 0):
+        """
+        Spherical k-means over a sample of the live rows, then one inverted list per
+        centroid. Rows appended or rewritten later are searched exhaustively until the next build.
+        """
+        with self._lock:
+            live = np.flatnonzero(self._live[:self._count])
+            if len(live) < nlist * 4:
+                self._ivf = None
+                if os.path.exists(self._ivf_path):
+                    os.remove(self._ivf_path)
+                return
+            rng = np.random.default_rng(seed)
+            train = np.sort(rng.choice(live, size=min(len(live), nlist * sample), replace=False))
+            data = np.asarray(self._vectors[train], dtype=np.float32)
+            centroids = data[rng.choice(len(data), size=nlist, replace=False)]
+            for _ in range(iterations):
+                assign = np.argmax(data @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, data)
+                empty = np.bincount(assign, minlength=nlist) == 0
+                sums[empty] = centroids[empty]
+                centroids = _normalize(sums)
+
+            assign = np.empty(len(live), dtype=np.int32)
+            for start in range(0, len(live), SEARCH_BLOCK):
+                block = np.asarray(self._vectors[live[start:start + SEARCH_BLOCK]], dtype=np.float32)
+                assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+            self._ivf = {"centroids": centroids, "rows": live[order], "offsets": offsets,
+                         "covered": np.int64(self._count)}
+            tmp = os.path.join(self.path, "ivf.tmp.npz")
+            np.savez(tmp, **self._ivf)
+            os.replace(tmp, self._ivf_path)
+            # After the new lists: a reader between the two files sees too many dirty rows, never too few
+            self._dirty[:] = False
+            self._save_array("dirty.npy", self._dirty[:self._count])
+
+    def optimize(self):
+        if IVF_NLIST and self.ivf_stale():
+            print(f"🗂️ Building IVF quantizer for {self.path} ({IVF_NLIST} lists)...")
+            self.build_ivf(IVF_NLIST)
+
+    def ivf_stale(self, max_tail: float = 0.2) -> bool:
+        """True when enough rows were appended or rewritten since the last build to warrant a rebuild."""
+        if self._ivf is None:
+            return True
+        covered = int(self._ivf["covered"])
+        changed = self._count - covered + int(self._dirty[:covered].sum())
+        return changed > max_tail * max(covered, 1)
+
+    # === Search ===
+    def _exact(self, queries: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        m = len(queries)
+        best_scores = np.full((m, 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((m, 0), dtype=np.int64)
+        for start in range(0, self._count, SEARCH_BLOCK):
+            end = min(start + SEARCH_BLOCK, self._count)
+            scores = np.asarray(self._vectors[start:end], dtype=np.float32) @ queries.T  # rows x m
+            scores[~self._live[start:end]] = -np.inf
+            k = min(top_k, end - start)
+            part = np.argpartition(-scores, k - 1, axis=0)[:k]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=0).T], axis=1)
+            best_rows = np.concatenate([best_rows, (part + start).T], axis=1)
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _probe(self, queries: np.ndarray, top_k: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        IVF search for a batch of queries, one inverted list at a time: each probed list is
+        read once and scored against just the queries that probe it. Rows the lists don't
+        cover (appended or rewritten since the build) are scored against every query.
+        """
+        ivf = self._ivf
+        centroids, offsets, covered = ivf["centroids"], ivf["offsets"], int(ivf["covered"])
+        m, nprobe = len(queries), min(self.nprobe, len(centroids))
+        best_scores = np.full((m, top_k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((m, top_k), dtype=np.int64)
+
+        def merge(qs: np.ndarray, rows: np.ndarray):
+            scores = np.asarray(self._vectors[rows], dtype=np.float32) @ queries[qs].T  # rows x qs
+            k = min(top_k, len(rows))
+            part = np.argpartition(-scores, k - 1, axis=0)[:k]
+            cand_scores = np.concatenate([best_scores[qs], np.take_along_axis(scores, part, axis=0).T], axis=1)
+            cand_rows = np.concatenate([best_rows[qs], rows[part].T], axis=1)
+            keep = np.argpartition(-cand_scores, top_k - 1, axis=1)[:, :top_k]
+            best_scores[qs] = np.take_along_axis(cand_scores, keep, axis=1)
+            best_rows[qs] = np.take_along_axis(cand_rows, keep, axis=1)
+
+        # Group the (query, list) probes by list
+        probed = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe].ravel()
+        owners = np.repeat(np.arange(m), nprobe)
+        order = np.argsort(probed, kind="stable")
+        probed, owners = probed[order], owners[order]
+        bounds = np.searchsorted(probed, np.arange(len(centroids) + 1))
+        for c in np.unique(probed):
+            rows = ivf["rows"][offsets[c]:offsets[c + 1]]
+            rows = rows[self._live[rows] & ~self._dirty[rows]]
+            if len(rows):
+                merge(owners[bounds[c]:bounds[c + 1]], rows)
+
+        extra = np.concatenate([np.flatnonzero(self._dirty[:covered]), np.arange(covered, self._count)])
+        extra = extra[self._live[extra]]
+        for start in range(0, len(extra), SEARCH_BLOCK):
+            merge(np.arange(m), extra[start:start + SEARCH_BLOCK])
+
+        ranked = np.argsort(-best_scores, axis=1)
+        best_rows = np.take_along_axis(best_rows, ranked, axis=1)
+        best_scores = np.take_along_axis(best_scores, ranked, axis=1)
+        return [(r[np.isfinite(sc)], sc[np.isfinite(sc)]) for r, sc in zip(best_rows, best_scores)]
+
+    def search_rows(self, embeddings, top_k: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        """(rows, cosine scores) per query, best first."""
+        self._maybe_reload()
+        queries = _normalize(embeddings)
+        with self._lock:
+            if self._count == 0 or top_k <= 0:
+                return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+            if self._ivf is not None and self.nprobe > 0:
+                return self._probe(queries, top_k)
+            rows, scores = self._exact(queries, top_k)
+            # Fewer than top_k live rows: drop the -inf padding
+            return [(r[np.isfinite(s)], s[np.isfinite(s)]) for r, s in zip(rows, scores)]
+
+    def search(self, embeddings, top_k: int, months=None):
+        return [
+            [(k.decode(), float(score)) for k, score in zip(self._ids[rows], scores)]
+            for rows, scores in self.search_rows(embeddings, top_k)
+        ]
+
+    def _get_store(self):
+        if self._store is None:
+            from master_store import STORE_PATH, MasterStore
+            self._store = MasterStore(STORE_PATH)
+        return self._store
+
+    def query(self, embeddings, top_k: int, months=None):
+        hits = self.search(embeddings, top_k)
+        # One store read (summary column only) for every query's winners
+        wanted = list(dict.fromkeys(i for pairs in hits for i, _ in pairs))
+        summaries = {}
+        if wanted:
+            found = self._get_store().fetch(wanted, columns=["doc_id", "summary"])
+            summaries = dict(zip(found["doc_id"], found["summary"]))
+        return [[(i, summaries[i], score) for i, score in pairs if i in summaries] for pairs in hits]
+
+
+class ShardedBackend(VectorBackend):
+    """
+    One backend per month of `timestamp`: Chroma collections named
+    <COLLECTION_NAME>__YYYY-MM, or mmap indexes under <VECTOR_INDEX_PATH>/month=YYYY-MM.
+
+    Writes are routed by each row's "month" metadata. Searches fan out in parallel
+    over the shards for the requested months (all shards when `months` is None) and
+    merge the per-shard top-k by score, so a query over recent weeks costs the same
+    however much history is stored.
+    """
+
+    def __init__(self, kind: str, create: bool = False, workers: int = SHARD_SEARCH_WORKERS):
+        self.kind = kind
+        self.create = create
+        self._shards: dict[str, VectorBackend] = {}
+        self._names: set[str] = set()
+        self._lock = threading.RLock()
+        self._listed_at = 0.0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-search")
+        self._client = None
+        if kind == "chroma":
+            from chromadb import PersistentClient
+            self._client = PersistentClient(path=CHROMA_PATH)
+        elif kind != "mmap":
+            raise ValueError(f"❌ Unknown vector backend '{kind}' (expected 'chroma' or 'mmap')")
+
+    @classmethod
+    def open(cls, kind: str, create: bool = False, rebuild: bool = False) -> "ShardedBackend":
+        backend = cls(kind, create=create)
+        if rebuild:
+            backend.drop_all()
+        if not create and not backend.months():
+            raise ValueError(f"❌ No {kind} shards found. Run ingest.py (VECTOR_SHARDING=month) first.")
+        return backend
+
+    # === Shards ===
+    def _list(self) -> set[str]:
+        if self.kind == "chroma":
+            prefix = f"{COLLECTION_NAME}{SHARD_SEPARATOR}"
+            return {c.name[len(prefix):] for c in self._client.list_collections() if c.name.startswith(prefix)}
+        if not os.path.isdir(VECTOR_INDEX_PATH):
+            return set()
+        return {
+            d[len("month="):] for d in os.listdir(VECTOR_INDEX_PATH)
+            if d.startswith("month=") and os.path.exists(os.path.join(VECTOR_INDEX_PATH, d, "meta.json"))
+        }
+
+    def months(self) -> list[str]:
+        """Known shards (re-listed at most once a second, so new months from ingest show up)."""
+        with self._lock:
+            if time.time() - self._listed_at >= RELOAD_CHECK_SECONDS:
+                self._names = self._list() | set(self._shards)
+                self._listed_at = time.time()
+            return sorted(self._names)
+
+    def shard(self, month: str) -> VectorBackend:
+        with self._lock:
+            if month not in self._shards:
+                if self.kind == "chroma":
+                    name = f"{COLLECTION_NAME}{SHARD_SEPARATOR}{month}"
+                    collection = (self._client.get_or_create_collection(name=name) if self.create
+                                  else self._client.get_collection(name=name))
+                    self._shards[month] = ChromaBackend(collection)
+                else:
+                    path = os.path.join(VECTOR_INDEX_PATH, f"month={month}")
+                    self._shards[month] = MmapBackend(path, writable=self.create)
+                self._names.add(month)
+            return self._shards[month]
+
+    def drop_all(self):
+        with self._lock:
+            if self.kind == "chroma":
+                for c in self._client.list_collections():
+                    # The pre-sharding single collection goes too
+                    if c.name == COLLECTION_NAME or c.name.startswith(f"{COLLECTION_NAME}{SHARD_SEPARATOR}"):
+                        self._client.delete_collection(name=c.name)
+            elif os.path.exists(VECTOR_INDEX_PATH):
+                shutil.rmtree(VECTOR_INDEX_PATH)
+            self._shards.clear()
+            self._names.clear()
+            self._listed_at = 0.0
+
+    # === Search ===
+    def _targets(self, months: list[str] | None) -> list[VectorBackend]:
+        known = self.months()
+        wanted = known if months is None else [m for m in known if m in set(months)]
+        return [self.shard(m) for m in wanted]
+
+    def _fan_out(self, method: str, embeddings, top_k: int, months, score_at: int) -> list[list[tuple]]:
+        embeddings = list(embeddings)
+        shards = self._targets(months)
+        if not shards:
+            return [[] for _ in embeddings]
+        per_shard = list(self._pool.map(lambda s: getattr(s, method)(embeddings, top_k), shards))
+        merged = []
+        for i in range(len(embeddings)):
+            hits = [hit for results in per_shard for hit in results[i]]
+            hits.sort(key=lambda h: h[score_at], reverse=True)
+            merged.append(hits[:top_k])
+        return merged
+
+    def search(self, embeddings, top_k: int, months=None):
+        return self._fan_out("search", embeddings, top_k, months, score_at=1)
+
+    def query(self, embeddings, top_k: int, months=None):
+        return self._fan_out("query", embeddings, top_k, months, score_at=2)
+
+    # === Writes ===
+    def upsert(self, ids, embeddings, documents, metadatas):
+        by_month: dict[str, list[int]] = {}
+        for i, meta in enumerate(metadatas):
+            by_month.setdefault((meta or {}).get("month") or UNKNOWN_MONTH, []).append(i)
+        embeddings = np.asarray(embeddings)
+        for month, rows in by_month.items():
+            self.shard(month).upsert(
+                [ids[i] for i in rows], embeddings[rows],
+                [documents[i] for i in rows] if documents is not None else None,
+                [metadatas[i] for i in rows],
+            )
+
+    def delete(self, ids):
+        # IDs don't encode their month; deleting an unknown ID is a no-op on every backend
+        for month in self.months():
+            self.shard(month).delete(ids)
+
+    def fingerprints(self, ids):
+        found, remaining = {}, list(ids)
+        for month in self.months():
+            if not remaining:
+                break
+            found.update(self.shard(month).fingerprints(remaining))
+            remaining = [i for i in remaining if i not in found]
+        return found
+
+    def ids(self):
+        for month in self.months():
+            yield from self.shard(month).ids()
+
+    def count(self):
+        return sum(self.shard(m).count() for m in self.months())
+
+    def flush(self):
+        with self._lock:
+            shards = list(self._shards.values())
+        for shard in shards:
+            shard.flush()
+
+    def optimize(self):
+        with self._lock:
+            shards = list(self._shards.values())
+        for shard in shards:
+            shard.optimize()
+
+
+def open_backend(kind: str, create: bool = False, rebuild: bool = False) -> VectorBackend:
+    """`kind` is "chroma" or "mmap" (see VECTOR_BACKEND), sharded per month unless VECTOR_SHARDING=none."""
+    if VECTOR_SHARDING == "month":
+        return ShardedBackend.open(kind, create=create, rebuild=rebuild)
+    if kind == "chroma":
+        return ChromaBackend.open(create=create, rebuild=rebuild)
+    if kind == "mmap":
+        return MmapBackend.open(create=create, rebuild=rebuild)
+    raise ValueError(f"❌ Unknown vector backend '{kind}' (expected 'chroma' or 'mmap')")